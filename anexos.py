@@ -0,0 +1,255 @@
+# anexos.py
+"""Texto dos anexos para a busca: conteúdo de PDFs e lista de arquivos de ZIPs.
+
+A extração é uma tarefa da fila (jobs.py) agendada quando um projeto recebe
+arquivo novo. O resultado vai para ``attachment_text``, chaveado pelo sha256
+do conteúdo (storage.py): um arquivo já lido nunca é lido de novo, mesmo que
+outro projeto envie o mesmo PDF. A busca chega ao projeto por
+``project.file_path`` -> ``stored_file`` -> ``attachment_text`` (search.py).
+
+Cada extração roda num processo separado, morto depois de ``ANEXOS_TIMEOUT``
+segundos: um PDF malformado pode travar ou derrubar o pdfium, e nenhum dos
+dois pode levar o worker junto. Processos daemon (que não podem ter filhos)
+extraem numa thread, só com o prazo. Arquivos acima de ``ANEXOS_MAX_BYTES`` não são
+lidos e o texto é cortado em ``ANEXOS_MAX_CARACTERES``. Falhas também são
+gravadas (com ``error``), para não serem tentadas a cada agendamento;
+``flask anexos extrair --refazer-erros`` as tenta de novo.
+
+Só arquivos endereçados por conteúdo (``<sha256>.<ext>``) são extraídos.
+"""
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+import jobs
+import search
+import storage
+from models import db, AttachmentText, StoredFile
+
+EXTRAIVEIS = {'pdf', 'zip'}
+
+
+def _tipo(filename):
+    return storage.extensao(filename).lstrip('.')
+
+
+def suporta(filename):
+    return storage.digest_de(filename) is not None and _tipo(filename) in EXTRAIVEIS
+
+
+# ============================
+#   EXTRAÇÃO (PROCESSO FILHO)
+# ============================
+
+def _texto_pdf(path, limite):
+    import pypdfium2 as pdfium  # dependência só do caminho de PDF
+
+    partes, total = [], 0
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                texto = textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+            partes.append(texto)
+            total += len(texto)
+            if total >= limite:
+                break
+    finally:
+        pdf.close()
+    return '\n'.join(partes)
+
+
+def _listagem_zip(path, limite):
+    partes, total = [], 0
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            partes.append(info.filename)
+            total += len(info.filename) + 1
+            if total >= limite:
+                break
+    return '\n'.join(partes)
+
+
+EXTRATORES = {'pdf': _texto_pdf, 'zip': _listagem_zip}
+
+
+def _rodar(conexao, kind, path, limite):
+    try:
+        texto = EXTRATORES[kind](path, limite)
+        conexao.send(('ok', texto))
+    except Exception as e:
+        conexao.send(('erro', f'{type(e).__name__}: {e}'))
+    finally:
+        conexao.close()
+
+
+def _extrair_em_thread(kind, path, limite, timeout):
+    # processo daemon não pode ter filhos: sem isolamento, e a thread não tem como ser morta
+    resultado = []
+
+    def rodar():
+        try:
+            resultado.append(('ok', EXTRATORES[kind](path, limite)))
+        except Exception as e:
+            resultado.append(('erro', f'{type(e).__name__}: {e}'))
+
+    thread = threading.Thread(target=rodar, name='extracao', daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if not resultado:
+        return '', f'tempo esgotado ({timeout}s)'
+    status, valor = resultado[0]
+    return (valor, None) if status == 'ok' else ('', valor[:255])
+
+
+def extrair_arquivo(kind, path, limite, timeout):
+    """Devolve (texto, erro) da extração de ``path``, feita num processo filho com prazo."""
+    if multiprocessing.current_process().daemon:
+        return _extrair_em_thread(kind, path, limite, timeout)
+    # spawn: não herda as threads (despachante de tarefas, pool do banco) do processo web
+    ctx = multiprocessing.get_context('spawn')
+    receber, enviar = ctx.Pipe(duplex=False)
+    filho = ctx.Process(target=_rodar, args=(enviar, kind, path, limite), daemon=True)
+    filho.start()
+    enviar.close()
+    try:
+        # o texto precisa sair do pipe antes do join, senão o filho trava no send de um texto grande
+        if not receber.poll(timeout):
+            return '', f'tempo esgotado ({timeout}s)'
+        status, valor = receber.recv()
+    except EOFError:
+        return '', f'processo de extração terminou sem resposta (código {filho.exitcode})'
+    finally:
+        receber.close()
+        if filho.is_alive():
+            filho.kill()
+        filho.join()
+    return (valor, None) if status == 'ok' else ('', valor[:255])
+
+
+# ============================
+#        TAREFA E GRAVAÇÃO
+# ============================
+
+def _ler(sha256, filename):
+    """Extrai o texto de ``filename`` respeitando os limites; devolve os campos de AttachmentText."""
+    cfg = current_app.config
+    kind = _tipo(filename)
+    path = storage.localizar(filename)
+    limite = cfg['ANEXOS_MAX_CARACTERES']
+    if path is None:
+        texto, erro = '', 'arquivo ausente'
+    elif os.path.getsize(path) > cfg['ANEXOS_MAX_BYTES']:
+        texto, erro = '', f'arquivo maior que {cfg["ANEXOS_MAX_BYTES"]} bytes'
+    else:
+        texto, erro = extrair_arquivo(kind, path, limite, cfg['ANEXOS_TIMEOUT'])
+    texto = texto.replace('\x00', '')
+    return {'sha256': sha256, 'kind': kind, 'text': texto[:limite],
+            'truncated': len(texto) >= limite, 'error': erro}
+
+
+def _gravar(campos):
+    """Grava (ou substitui, ao refazer um erro) o texto de um arquivo e o coloca na busca."""
+    antigo = db.session.execute(select(AttachmentText).where(AttachmentText.sha256 == campos['sha256'])).scalar()
+    if antigo is not None:
+        search.remover_anexo(antigo.id)
+        db.session.delete(antigo)
+        db.session.flush()
+    anexo = AttachmentText(**campos)
+    db.session.add(anexo)
+    db.session.flush()
+    search.indexar_anexo(anexo)
+    return anexo
+
+
+@jobs.tarefa('extrair_texto')
+def extrair(sha256, filename, refazer=False):
+    existente = db.session.execute(
+        select(AttachmentText.error).where(AttachmentText.sha256 == sha256)
+    ).first()
+    if existente is not None and not (refazer and existente.error):
+        return  # conteúdo já lido
+    if storage.localizar(filename) is None:
+        return  # arquivo já substituído e apagado
+    _gravar(_ler(sha256, filename))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # outra tarefa gravou o mesmo conteúdo ao mesmo tempo
+
+
+def agendar(filename):
+    """Enfileira a extração de ``filename`` (antes do commit), a não ser que o conteúdo já tenha sido lido."""
+    if not suporta(filename):
+        return None
+    sha256 = storage.digest_de(filename)
+    if db.session.execute(select(AttachmentText.id).where(AttachmentText.sha256 == sha256)).first():
+        return None
+    return jobs.enfileirar('extrair_texto', sha256=sha256, filename=filename)
+
+
+def pendentes(refazer_erros=False):
+    """(sha256, filename) dos arquivos extraíveis ainda sem texto (ou com erro, se ``refazer_erros``)."""
+    consulta = (select(StoredFile.sha256, StoredFile.filename)
+                .outerjoin(AttachmentText, AttachmentText.sha256 == StoredFile.sha256))
+    if refazer_erros:
+        consulta = consulta.where((AttachmentText.id.is_(None)) | (AttachmentText.error.isnot(None)))
+    else:
+        consulta = consulta.where(AttachmentText.id.is_(None))
+    return [(sha256, filename) for sha256, filename in db.session.execute(consulta)
+            if _tipo(filename) in EXTRAIVEIS]
+
+
+def init_app(app):
+    app.config.setdefault('ANEXOS_MAX_BYTES', 100 * 1024 * 1024)
+    app.config.setdefault('ANEXOS_MAX_CARACTERES', 500_000)  # ~150 páginas de texto corrido
+    app.config.setdefault('ANEXOS_TIMEOUT', 60)
+
+    @app.cli.group('anexos')
+    def anexos_cli():
+        """Texto dos anexos para a busca."""
+
+    @anexos_cli.command('extrair')
+    @click.option('--processos', type=int, default=os.cpu_count() or 1, help='extrações simultâneas')
+    @click.option('--refazer-erros', is_flag=True, help='tenta de novo os arquivos que falharam')
+    @click.option('--fila', is_flag=True, help='enfileira as extrações em vez de rodar agora')
+    def anexos_extrair(processos, refazer_erros, fila):
+        """Extrai o texto dos PDFs/ZIPs que ainda não foram lidos."""
+        lista = pendentes(refazer_erros)
+        if fila:
+            for sha256, filename in lista:
+                jobs.enfileirar('extrair_texto', sha256=sha256, filename=filename, refazer=refazer_erros)
+            db.session.commit()
+            click.echo(f'{len(lista)} extrações enfileiradas.')
+            return
+
+        # cada extração já é um processo; as threads só esperam por eles e o banco fica nesta thread
+        def ler(item):
+            with app.app_context():
+                return _ler(*item)
+
+        feitos = erros = 0
+        with ThreadPoolExecutor(max(1, processos)) as pool:
+            for campos in pool.map(ler, lista):
+                _gravar(campos)
+                feitos += 1
+                erros += bool(campos['error'])
+                if feitos % 50 == 0:
+                    db.session.commit()
+                    click.echo(f'{feitos}/{len(lista)}')
+        db.session.commit()
+        click.echo(f'{feitos} arquivos lidos, {erros} com erro.')
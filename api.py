@@ -0,0 +1,217 @@
+# api.py
+"""API JSON somente leitura (``/api/v1``) para integrações.
+
+- ``fields=id,title,...`` escolhe as colunas (só elas vão para o SELECT);
+- ``ids=1,2,3`` busca vários recursos de uma vez, na ordem pedida;
+- listagens por cursor (``cursor``/``limit``), na mesma ordenação do site;
+- ETag em toda resposta e 304 com ``If-None-Match``.
+
+As respostas são montadas a partir de tuplas (``Row``) e não de objetos do
+ORM, então exportar milhares de projetos não cria milhares de instâncias.
+"""
+from flask import Blueprint, abort, current_app, jsonify, request, url_for
+from werkzeug.exceptions import HTTPException
+
+from models import db, Project, User, author_project
+from pagination import decode_cursor, keyset_paginate
+from query_budget import query_budget
+from thumbnails import thumb_url
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+MAX_IDS = 500
+MAX_LIMIT = 500
+LIMIT_PADRAO = 50
+
+# campo público -> coluna; campos derivados listam as colunas de que dependem
+CAMPOS_PROJETO = {
+    'id': Project.id,
+    'title': Project.title,
+    'description': Project.description,
+    'authors_text': Project.authors_text,
+    'created_at': Project.created_at,
+    'favorite_count': Project.favorite_count,
+    'author_count': Project.author_count,
+    'file_url': Project.file_path,
+    'thumbnail_url': Project.preview_hash,
+    'author_ids': None,  # uma consulta extra em author_project para a página toda
+}
+CAMPOS_PROJETO_PADRAO = ['id', 'title', 'authors_text', 'created_at', 'favorite_count', 'file_url']
+
+CAMPOS_USUARIO = {
+    'id': User.id,
+    'name': User.name,
+    'project_count': User.project_count,
+    'avatar_url': User.foto_hash,
+}
+CAMPOS_USUARIO_PADRAO = list(CAMPOS_USUARIO)
+
+
+def _erro(status, mensagem):
+    resp = jsonify(erro=mensagem)
+    resp.status_code = status
+    abort(resp)
+
+
+def _lista_param(nome):
+    valor = request.args.get(nome, '')
+    return [v.strip() for v in valor.split(',') if v.strip()]
+
+
+def _campos(disponiveis, padrao):
+    campos = _lista_param('fields') or padrao
+    desconhecidos = [c for c in campos if c not in disponiveis]
+    if desconhecidos:
+        _erro(400, f'Campos desconhecidos: {", ".join(desconhecidos)}. Disponíveis: {", ".join(disponiveis)}.')
+    return list(dict.fromkeys(campos))
+
+
+def _ids():
+    try:
+        ids = [int(i) for i in _lista_param('ids')]
+    except ValueError:
+        _erro(400, 'ids deve ser uma lista de inteiros separados por vírgula.')
+    if len(ids) > MAX_IDS:
+        _erro(400, f'No máximo {MAX_IDS} ids por requisição.')
+    return list(dict.fromkeys(ids))
+
+
+def _colunas(mapa, campos, obrigatorias):
+    colunas = {c.key: c for c in obrigatorias}
+    for campo in campos:
+        if mapa[campo] is not None:
+            colunas[mapa[campo].key] = mapa[campo]
+    return list(colunas.values())
+
+
+def _responder(dados):
+    resp = jsonify(dados)
+    resp.add_etag()
+    resp.cache_control.public = True
+    resp.cache_control.max_age = current_app.config['API_MAX_AGE']
+    return resp.make_conditional(request)
+
+
+# === Serialização ===
+def _projeto(row, campos, autores):
+    saida = {}
+    for campo in campos:
+        if campo == 'file_url':
+            saida[campo] = (url_for('uploads', filename=row.file_path, _external=True)
+                            if row.file_path else None)
+        elif campo == 'thumbnail_url':
+            saida[campo] = (thumb_url(row.preview_hash, 'md', 'jpg', _external=True) if row.preview_hash else None)
+        elif campo == 'author_ids':
+            saida[campo] = autores.get(row.id, [])
+        elif campo == 'created_at':
+            saida[campo] = row.created_at.isoformat() if row.created_at else None
+        else:
+            saida[campo] = getattr(row, campo)
+    return saida
+
+
+def _usuario(row, campos):
+    saida = {}
+    for campo in campos:
+        if campo == 'avatar_url':
+            saida[campo] = thumb_url(row.foto_hash, 'sm', 'jpg', _external=True) if row.foto_hash else None
+        else:
+            saida[campo] = getattr(row, campo)
+    return saida
+
+
+def _autores_de(project_ids, campos):
+    if 'author_ids' not in campos or not project_ids:
+        return {}
+    autores = {}
+    for user_id, project_id in db.session.execute(
+        db.select(author_project.c.user_id, author_project.c.project_id)
+        .where(author_project.c.project_id.in_(project_ids))
+        .order_by(author_project.c.project_id, author_project.c.user_id)
+    ):
+        autores.setdefault(project_id, []).append(user_id)
+    return autores
+
+
+# === Projetos ===
+@bp.route('/projects')
+@query_budget(2)
+def projects():
+    campos = _campos(CAMPOS_PROJETO, CAMPOS_PROJETO_PADRAO)
+    ids = _ids()
+
+    if ids:
+        colunas = _colunas(CAMPOS_PROJETO, campos, [Project.id])
+        linhas = db.session.execute(db.select(*colunas).where(Project.id.in_(ids))).all()
+        por_id = {row.id: row for row in linhas}
+        autores = _autores_de(list(por_id), campos)
+        return _responder({
+            'data': [_projeto(por_id[i], campos, autores) for i in ids if i in por_id],
+            'missing': [i for i in ids if i not in por_id],
+        })
+
+    limite = min(max(request.args.get('limit', LIMIT_PADRAO, type=int), 1), MAX_LIMIT)
+    colunas = _colunas(CAMPOS_PROJETO, campos, [Project.id, Project.created_at])
+    cursor = request.args.get('cursor')
+    if cursor and decode_cursor(cursor) is None:
+        # no site um cursor ilegível volta à primeira página; numa integração é melhor avisar
+        _erro(400, 'Cursor inválido.')
+    pagina = keyset_paginate(db.session.query(*colunas), Project, cursor, per_page=limite)
+    autores = _autores_de([row.id for row in pagina.items], campos)
+    return _responder({
+        'data': [_projeto(row, campos, autores) for row in pagina.items],
+        'next_cursor': pagina.next_cursor,
+        'prev_cursor': pagina.prev_cursor,
+    })
+
+
+@bp.route('/projects/<int:project_id>')
+@query_budget(2)
+def project(project_id):
+    campos = _campos(CAMPOS_PROJETO, CAMPOS_PROJETO_PADRAO)
+    colunas = _colunas(CAMPOS_PROJETO, campos, [Project.id])
+    row = db.session.execute(db.select(*colunas).where(Project.id == project_id)).first()
+    if row is None:
+        _erro(404, 'Projeto não encontrado.')
+    return _responder(_projeto(row, campos, _autores_de([row.id], campos)))
+
+
+# === Usuários (só campos públicos) ===
+@bp.route('/users')
+@query_budget(1)
+def users():
+    campos = _campos(CAMPOS_USUARIO, CAMPOS_USUARIO_PADRAO)
+    ids = _ids()
+    if not ids:
+        _erro(400, 'Informe ids=1,2,3.')
+    colunas = _colunas(CAMPOS_USUARIO, campos, [User.id])
+    por_id = {row.id: row for row in db.session.execute(db.select(*colunas).where(User.id.in_(ids)))}
+    return _responder({
+        'data': [_usuario(por_id[i], campos) for i in ids if i in por_id],
+        'missing': [i for i in ids if i not in por_id],
+    })
+
+
+@bp.route('/users/<int:user_id>')
+@query_budget(1)
+def user(user_id):
+    campos = _campos(CAMPOS_USUARIO, CAMPOS_USUARIO_PADRAO)
+    colunas = _colunas(CAMPOS_USUARIO, campos, [User.id])
+    row = db.session.execute(db.select(*colunas).where(User.id == user_id)).first()
+    if row is None:
+        _erro(404, 'Usuário não encontrado.')
+    return _responder(_usuario(row, campos))
+
+
+@bp.errorhandler(HTTPException)
+def erro_http(exc):
+    if exc.response is not None:
+        return exc.response
+    resp = jsonify(erro=exc.description)
+    resp.status_code = exc.code
+    return resp
+
+
+def init_app(app):
+    app.config.setdefault('API_MAX_AGE', 60)
+    app.register_blueprint(bp)
@@ -1,15 +1,42 @@
 # app.py
 import os
-import uuid
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, abort
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import (Flask, render_template, request, redirect, url_for, flash, send_from_directory, abort, jsonify,
+                   make_response, session)
+from werkzeug.http import parse_content_range_header
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_migrate import Migrate
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from dotenv import load_dotenv
+from sqlalchemy.orm import joinedload, lazyload
 
-from models import db, User, Project, Favorite
+from models import db, User, Project, Favorite, DailyStats, author_project
 from forms import RegisterForm, LoginForm, ProjectForm
+import anexos
+import api
+import assets
+import autores
+import cache
+import catalogo
+import database
+import favoritar
+import instrumentation
+import jobs
+import limites
+import manutencao
+import principal
+import resumo
+import search
+import senhas
+import stats
+from pagination import keyset_paginate, offset_paginate, cached_count
+import query_budget
+import storage
+import sugestoes
+import thumbnails
+from cache import cached_page
+from instrumentation import medir
+from limites import limitar
+from query_budget import query_budget as sql_budget
 
 # === Configuração base ===
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
@@ -23,47 +50,96 @@ def create_app():
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or 'troca_urgentemente'
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or 'sqlite:///catalog.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # pool, recycle, pre-ping e timeout de statement por banco (ver database.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB
+    # entrega de /uploads pelo proxy da frente: None, 'x-sendfile' (Apache/lighttpd) ou 'x-accel' (nginx)
+    app.config['UPLOADS_OFFLOAD'] = os.getenv('UPLOADS_OFFLOAD') or None
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.getenv('UPLOADS_ACCEL_PREFIX', '/_uploads/')
+    app.config['USE_X_SENDFILE'] = app.config['UPLOADS_OFFLOAD'] == 'x-sendfile'
+    # proxies confiáveis na frente (Render e PythonAnywhere: 1); o IP do cliente vem do X-Forwarded-For
+    app.config['PROXY_HOPS'] = int(os.getenv('PROXY_HOPS', 1))
+    # cache de páginas para anônimos: LRU local por padrão, Redis compartilhado com CACHE_URL
+    app.config['CACHE_URL'] = os.getenv('CACHE_URL') or None
+    app.config['PAGE_CACHE_TTL'] = int(os.getenv('PAGE_CACHE_TTL', 300))
+    # processos do gunicorn (ele lê a mesma variável). O LRU local só é invalidado no processo que
+    # fez a escrita: sem CACHE_URL e com mais de um processo o cache de páginas fica desligado
+    app.config['WEB_CONCURRENCY'] = int(os.getenv('WEB_CONCURRENCY', 1))
+    # segundos que o total de projetos exibido na listagem fica em cache (0 desativa)
+    app.config['PROJECT_COUNT_TTL'] = int(os.getenv('PROJECT_COUNT_TTL', 60))
+
+    if app.config['PROXY_HOPS']:
+        # sem isso request.remote_addr é o proxy e todos os clientes dividem os mesmos limites
+        hops = app.config['PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     db.init_app(app)
-    migrate = Migrate(app, db)
+    database.init_app(app, db)
+    instrumentation.init_app(app)  # primeiro before_request: mede a requisição inteira
+    limites.init_app(app)  # logo depois: recusa cedo o que não vai dar para atender
+    migrate = Migrate(app, db, include_object=search.incluir_objeto)
+    cache.init_app(app)
+    search.init_app(app)
+    stats.init_app(app)
+    query_budget.init_app(app)
+    jobs.init_app(app)
+    storage.init_app(app)
+    thumbnails.init_app(app)
+    anexos.init_app(app)
+    manutencao.init_app(app)
+    senhas.init_app(app)
+    sugestoes.init_app(app)
+    api.init_app(app)
+    resumo.init_app(app)
+    catalogo.init_app(app)
+    assets.init_app(app)
 
     login_manager = LoginManager()
     login_manager.login_view = 'login'
     login_manager.init_app(app)
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    # usuário logado vem de um LRU por processo, sem SELECT a cada requisição
+    principal.init_app(app, login_manager)
 
     # ============================
     #           ROTAS
     # ============================
 
     @app.route('/')
+    @cached_page('index', tags=lambda: ['projetos'], args=('q', 'page', 'cursor'))
+    @limitar('busca', quando=lambda: bool(request.args.get('q', '').strip()))
+    @sql_budget(5)
     def index():
         q = request.args.get('q', '').strip()
-        page = request.args.get('page', 1, type=int)
+        total = None
         if q:
-            projects = Project.query.filter(
-                (Project.title.ilike(f'%{q}%')) |
-                (Project.description.ilike(f'%{q}%')) |
-                (Project.authors_text.ilike(f'%{q}%'))
-            ).order_by(Project.created_at.desc())
+            # busca no índice textual (FTS5 ou fallback em memória), ordenada por relevância
+            page = request.args.get('page', 1, type=int)
+            projects = search.search_projects(q, page=page, per_page=10)
+            total = projects.total
         else:
-            projects = Project.query.order_by(Project.created_at.desc())
-        projects = projects.paginate(page=page, per_page=10, error_out=False)
-        return render_template('index.html', projects=projects, q=q)
+            # listagem por cursor: sem OFFSET e sem COUNT(*) a cada página
+            # os cards não mostram autores: não precisa do selectin de Project.authors
+            listagem = Project.query.options(lazyload(Project.authors))
+            projects = keyset_paginate(listagem, Project, request.args.get('cursor'), per_page=10)
+            total = cached_count('projects', lambda: Project.query.count(),
+                                 app.config['PROJECT_COUNT_TTL'])
+        return render_template('index.html', projects=projects, q=q, total=total)
 
     # === LOGIN ===
     @app.route('/login', methods=['GET', 'POST'])
+    @limitar('login', quando=lambda: request.method == 'POST')
     def login():
         form = LoginForm()
         if form.validate_on_submit():
             user = User.query.filter_by(email=form.email.data).first()
-            if user and check_password_hash(user.password_hash, form.password.data):
+            with medir('senha'):
+                senha_ok = user is not None and senhas.conferir(user, form.password.data)
+            if senha_ok:
+                if db.session.is_modified(user):
+                    db.session.commit()  # hash refeito com o PASSWORD_METHOD atual
                 login_user(user, remember=form.remember.data)
+                principal.iniciar_sessao(user)
                 flash('Bem-vindo!', 'success')
                 return redirect(url_for('index'))
             flash('Credenciais incorretas.', 'danger')
@@ -71,6 +147,7 @@ def create_app():
 
     # === REGISTRO ===
     @app.route('/register', methods=['GET', 'POST'])
+    @limitar('register', quando=lambda: request.method == 'POST')
     def register():
         form = RegisterForm()
         if form.validate_on_submit():
@@ -81,18 +158,22 @@ def create_app():
 
             foto_nome = None
             if form.foto.data:
-                arquivo = form.foto.data
-                nome_seguro = secure_filename(arquivo.filename)
-                foto_nome = f"{uuid.uuid4().hex}_{nome_seguro}"
-                arquivo.save(os.path.join(app.config['UPLOAD_FOLDER'], foto_nome))
+                with medir('arquivo'):
+                    foto_nome = storage.put(form.foto.data)
 
+            with medir('senha'):
+                senha_hash = senhas.gerar(form.password.data)
             novo_user = User(
                 name=form.name.data,
                 email=form.email.data,
-                password_hash=generate_password_hash(form.password.data),
+                password_hash=senha_hash,
                 foto_perfil=foto_nome
             )
             db.session.add(novo_user)
+            db.session.flush()
+            stats.registrar_dia(registrations=1)
+            thumbnails.agendar(novo_user, foto_nome)
+            jobs.enfileirar('vincular_autor', user_id=novo_user.id)
             db.session.commit()
             flash('Cadastro realizado com sucesso! Faça login.', 'success')
             return redirect(url_for('login'))
@@ -104,23 +185,22 @@ def create_app():
     @login_required
     def logout():
         logout_user()
+        principal.encerrar_sessao()
         flash('Desconectado.', 'info')
         return redirect(url_for('index'))
 
     # === NOVO PROJETO ===
     @app.route('/project/new', methods=['GET', 'POST'])
     @login_required
+    @limitar('upload', quando=lambda: request.method == 'POST')
     def create_project():
         form = ProjectForm()
         if form.validate_on_submit():
-            filename = None
-            if form.file.data:
-                f = form.file.data
-                orig = secure_filename(f.filename)
-                unique = f"{uuid.uuid4().hex}_{orig}"
-                path = os.path.join(app.config['UPLOAD_FOLDER'], unique)
-                f.save(path)
-                filename = unique
+            try:
+                filename = salvar_upload(form)
+            except storage.UploadError as e:
+                flash(str(e), 'danger')
+                return render_template('project_create.html', form=form)
 
             project = Project(
                 title=form.title.data,
@@ -130,9 +210,15 @@ def create_app():
             )
 
             # 🔥 Associa automaticamente o usuário logado como autor
-            project.authors.append(current_user)
+            project.authors.append(principal.usuario())
 
             db.session.add(project)
+            db.session.flush()
+            stats.autoria(project.id, [], [current_user.id])
+            stats.registrar_dia(uploads=1)
+            search.index_project(project)
+            thumbnails.agendar(project, filename)
+            anexos.agendar(filename)
             db.session.commit()
             flash('Projeto publicado!', 'success')
             return redirect(url_for('index'))
@@ -140,13 +226,76 @@ def create_app():
         return render_template('project_create.html', form=form)
 
 
+    def salvar_upload(form):
+        """Arquivo do formulário (upload comum ou sessão em partes) -> nome no armazenamento."""
+        with medir('arquivo'):
+            if form.file.data:
+                return storage.put(form.file.data)
+            if form.upload_id.data:
+                return storage.concluir_sessao(form.upload_id.data, current_user.id)
+        return None
+
+    # === UPLOAD EM PARTES (retomável) ===
+    @app.route('/uploads/sessao', methods=['POST'])
+    @login_required
+    @limitar('upload')
+    def upload_sessao_abrir():
+        dados = request.get_json(silent=True) or {}
+        try:
+            upload_id = storage.abrir_sessao(dados.get('filename'), int(dados.get('size') or 0),
+                                             current_user.id, ProjectForm.EXTENSOES)
+        except (storage.UploadError, ValueError) as e:
+            return jsonify(erro=str(e)), 400
+        return jsonify(storage.status_sessao(upload_id, current_user.id)), 201
+
+    @app.route('/uploads/sessao/<upload_id>', methods=['GET', 'PUT'])
+    @login_required
+    @limitar('upload_parte', quando=lambda: request.method == 'PUT')
+    def upload_sessao(upload_id):
+        try:
+            if request.method == 'PUT':
+                faixa = parse_content_range_header(request.headers.get('Content-Range'))
+                if faixa is None:
+                    return jsonify(erro='Cabeçalho Content-Range obrigatório.'), 400
+                with medir('arquivo'):
+                    storage.gravar_parte(upload_id, current_user.id, faixa.start, faixa.length, request.stream)
+            return jsonify(storage.status_sessao(upload_id, current_user.id))
+        except storage.UploadError as e:
+            return jsonify(erro=str(e)), 409
+
     # === DETALHE DO PROJETO + PRÉ-VISUALIZAÇÃO ===
     @app.route('/project/<int:project_id>')
+    @cached_page('project_detail', tags=lambda project_id: [f'projeto:{project_id}'])
+    @sql_budget(4)
     def project_detail(project_id):
-        project = Project.query.get_or_404(project_id)
-        is_fav = False
+        # projeto, autores e "é favorito?" num SELECT só; o ETag sai dele antes de renderizar
         if current_user.is_authenticated:
-            is_fav = Favorite.query.filter_by(user_id=current_user.id, project_id=project.id).first() is not None
+            favorito = db.exists().where(Favorite.user_id == current_user.id, Favorite.project_id == Project.id)
+        else:
+            favorito = db.literal(False)
+        row = db.session.execute(
+            db.select(Project, favorito.label('is_fav'))
+            .options(joinedload(Project.authors))
+            .where(Project.id == project_id)
+        ).unique().first()
+        if row is None:
+            abort(404)
+        project, is_fav = row.Project, bool(row.is_fav)
+
+        # a página muda com o deploy, com o projeto (versão), com o favorito e com o usuário do menu;
+        # flashes são de uma vez só
+        etag = None
+        if '_flashes' not in session:
+            if current_user.is_authenticated:
+                quem = f'u{current_user.id}.{cache.get_cache().versao(f"usuario:{current_user.id}")}'
+            else:
+                quem = 'anon'
+            etag = f'{assets.versao_build()}.p{project.id}.v{project.version}.{quem}.{int(is_fav)}'
+            if request.if_none_match.contains_weak(etag):
+                resp = make_response('', 304)
+                resp.set_etag(etag, weak=True)
+                resp.cache_control.no_cache = True
+                return resp
 
         # lógica da pré-visualização
         preview_url = None
@@ -155,59 +304,112 @@ def create_app():
             if ext in ['png', 'jpg', 'jpeg', 'pdf']:
                 preview_url = url_for('uploads', filename=project.file_path)
 
-        return render_template('project_detail.html', project=project, is_fav=is_fav, preview_url=preview_url)
+        resp = make_response(render_template('project_detail.html', project=project, is_fav=is_fav,
+                                             preview_url=preview_url, pode_editar=can_edit(project)))
+        if etag:
+            resp.set_etag(etag, weak=True)
+            resp.cache_control.no_cache = True  # sempre revalida; o 304 não renderiza nada
+        return resp
 
     # === DOWNLOAD / VISUALIZAÇÃO DE UPLOADS ===
     @app.route('/uploads/<filename>')
     def uploads(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        # arquivos de upload nunca mudam depois de gravados: cache "para sempre" + ETag forte.
+        # Nos nomes por conteúdo o próprio sha256 é o ETag; nos antigos o Werkzeug gera um.
+        etag = storage.digest_de(filename) or True
+        path = storage.localizar(filename)
+        if path is None:
+            abort(404)
+        relativo = os.path.relpath(path, app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        if app.config['UPLOADS_OFFLOAD'] == 'x-accel':
+            resp = make_response('')
+            resp.headers['X-Accel-Redirect'] = app.config['UPLOADS_ACCEL_PREFIX'] + relativo
+            if etag is not True:
+                resp.set_etag(etag)
+            resp.make_conditional(request)
+        else:
+            # conditional=True trata If-None-Match (304) e Range (206); com USE_X_SENDFILE o
+            # Werkzeug só devolve o cabeçalho X-Sendfile e o proxy manda os bytes
+            resp = send_from_directory(app.config['UPLOAD_FOLDER'], relativo,
+                                       conditional=True, etag=etag, max_age=31536000)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = 31536000
+        resp.cache_control.immutable = True
+        return resp
+
+    # === MINIATURAS (nomes por hash de conteúdo, nunca mudam) ===
+    @app.route('/derivados/<filename>')
+    def derivados(filename):
+        return send_from_directory(app.config['DERIVATIVES_FOLDER'], filename, max_age=31536000)
 
     # === FAVORITAR ===
     @app.route('/project/<int:project_id>/favorite', methods=['POST'])
     @login_required
     def favorite_toggle(project_id):
-        project = Project.query.get_or_404(project_id)
-        fav = Favorite.query.filter_by(user_id=current_user.id, project_id=project.id).first()
-        if fav:
-            db.session.delete(fav)
-            db.session.commit()
+        # fallback sem JavaScript: alterna e volta para a página
+        favorito = favoritar.alternar(current_user.id, project_id)
+        if favoritar.total(project_id) is None:
+            abort(404)
+        db.session.commit()
+        if favorito:
+            flash('Adicionado aos favoritos.', 'success')
+        else:
             flash('Removido dos favoritos.', 'info')
+        return redirect(request.referrer or url_for('project_detail', project_id=project_id))
+
+    # PUT/DELETE idempotentes para o botão via fetch (main.js); não são enviáveis por formulário de outro site
+    @app.route('/project/<int:project_id>/favorite', methods=['PUT', 'DELETE'])
+    @login_required
+    @sql_budget(8)
+    def favorite_set(project_id):
+        if request.method == 'PUT':
+            favoritar.adicionar(current_user.id, project_id)
         else:
-            fav = Favorite(user_id=current_user.id, project_id=project.id)
-            db.session.add(fav)
-            db.session.commit()
-            flash('Adicionado aos favoritos.', 'success')
-        return redirect(request.referrer or url_for('project_detail', project_id=project.id))
+            favoritar.remover(current_user.id, project_id)
+        total = favoritar.total(project_id)
+        if total is None:
+            db.session.rollback()
+            return jsonify(erro='Projeto não encontrado.'), 404
+        db.session.commit()
+        return jsonify(favorito=request.method == 'PUT', total=total)
 
     # === EDIÇÃO DE PROJETO ===
     def can_edit(project):
-        return current_user.is_authenticated and (current_user.is_admin or current_user in project.authors)
+        return current_user.is_authenticated and (
+            current_user.is_admin or any(u.id == current_user.id for u in project.authors))
 
     @app.route('/project/<int:project_id>/edit', methods=['GET', 'POST'])
     @login_required
+    @limitar('upload', quando=lambda: request.method == 'POST')
     def edit_project(project_id):
         project = Project.query.get_or_404(project_id)
         if not can_edit(project):
             abort(403)
         form = ProjectForm(obj=project)
         if form.validate_on_submit():
+            try:
+                novo_arquivo = salvar_upload(form)
+            except storage.UploadError as e:
+                flash(str(e), 'danger')
+                return render_template('edit_project.html', form=form, project=project)
+
             project.title = form.title.data
             project.description = form.description.data
             project.authors_text = form.authors.data
 
-            if form.file.data:
-                f = form.file.data
-                orig = secure_filename(f.filename)
-                unique = f"{uuid.uuid4().hex}_{orig}"
-                f.save(os.path.join(app.config['UPLOAD_FOLDER'], unique))
-                project.file_path = unique
-
-            project.authors = []
-            names = [n.strip() for n in form.authors.data.split(',') if n.strip()]
-            for name in names:
-                u = User.query.filter(User.name.ilike(name)).first()
-                if u:
-                    project.authors.append(u)
+            if novo_arquivo:
+                # o arquivo anterior perde uma referência (apagado no commit se era a última)
+                storage.release(project.file_path)
+                project.file_path = novo_arquivo
+                project.preview_hash = None
+
+            # todos os nomes resolvidos num único SELECT pelo nome normalizado
+            antigos = [u.id for u in project.authors]
+            project.authors = autores.usuarios_do_texto(form.authors.data)
+            stats.autoria(project.id, antigos, [u.id for u in project.authors])
+            search.index_project(project)
+            thumbnails.agendar(project, novo_arquivo)
+            anexos.agendar(novo_arquivo)
             db.session.commit()
             flash('Projeto atualizado.', 'success')
             return redirect(url_for('project_detail', project_id=project.id))
@@ -223,33 +425,53 @@ def create_app():
         project = Project.query.get_or_404(project_id)
         if not can_edit(project):
             abort(403)
-        if project.file_path:
-            try:
-                os.remove(os.path.join(app.config['UPLOAD_FOLDER'], project.file_path))
-            except Exception:
-                pass
+        storage.release(project.file_path)
+        stats.autoria(project.id, [u.id for u in project.authors], [])
+        search.remove_project(project.id)
         db.session.delete(project)
         db.session.commit()
         flash('Projeto excluído.', 'info')
         return redirect(url_for('index'))
 
     # === ADMIN ===
+    ADMIN_POR_PAGINA = 25
+    ORDENS_PROJETOS = {'data': Project.created_at, 'titulo': Project.title,
+                       'favoritos': Project.favorite_count, 'autores': Project.author_count}
+    ORDENS_USUARIOS = {'nome': User.name, 'email': User.email, 'projetos': User.project_count}
+
+    def ordenar(query, modelo, ordens, padrao):
+        coluna = ordens.get(request.args.get('ordem'), ordens[padrao])
+        if request.args.get('dir', 'desc') == 'asc':
+            return query.order_by(coluna.asc(), modelo.id.asc())
+        return query.order_by(coluna.desc(), modelo.id.desc())
+
     @app.route('/admin')
     @login_required
+    @sql_budget(3)
     def admin_panel():
         if not current_user.is_admin:
             abort(403)
-        projects = Project.query.order_by(Project.created_at.desc()).all()
-        users = User.query.order_by(User.name).all()
+        projects = offset_paginate(Project.query.options(lazyload(Project.authors))
+                                   .order_by(Project.created_at.desc(), Project.id.desc()),
+                                   request.args.get('page_p', 1, type=int), ADMIN_POR_PAGINA)
+        users = offset_paginate(User.query.order_by(User.name, User.id),
+                                request.args.get('page_u', 1, type=int), ADMIN_POR_PAGINA)
         return render_template('admin.html', projects=projects, users=users)
 
     # === FAVORITOS ===
     @app.route('/favoritos')
     @login_required
+    @sql_budget(4)
     def favoritos():
-        favs = Favorite.query.filter_by(user_id=current_user.id).all()
-        projetos = [fav.project for fav in favs]
-        return render_template('favoritos.html', projetos=projetos)
+        # um único SELECT com JOIN, paginado pelo índice (user_id, created_at, project_id) de favorite
+        listagem = (db.session.query(Project, Favorite.created_at.label('favoritado_em'))
+                    .options(lazyload(Project.authors))
+                    .join(Favorite, Favorite.project_id == Project.id)
+                    .filter(Favorite.user_id == current_user.id))
+        pagina = keyset_paginate(listagem, None, request.args.get('cursor'), per_page=20,
+                                 colunas=(Favorite.created_at, Favorite.project_id),
+                                 chave=lambda row: (row.favoritado_em, row.Project.id))
+        return render_template('favoritos.html', pagina=pagina, resumo=resumo.do_usuario(current_user.id))
 
     # === PERFIL ===
     @app.route('/perfil', methods=['GET', 'POST'])
@@ -260,14 +482,20 @@ def create_app():
             email = request.form.get('email')
             senha = request.form.get('senha')
 
-            if nome:
-                current_user.name = nome
+            usuario = principal.usuario()
+            if nome and nome != usuario.name:
+                usuario.name = nome
+                jobs.enfileirar('vincular_autor', user_id=usuario.id)
             if email:
-                current_user.email = email
+                usuario.email = email
             if senha:
-                current_user.password_hash = generate_password_hash(senha)
+                with medir('senha'):
+                    usuario.password_hash = senhas.gerar(senha)
 
+            # o commit invalida o usuário em cache; a sessão atual segue válida com a senha nova
             db.session.commit()
+            if senha:
+                principal.iniciar_sessao(usuario)
             flash('Informações atualizadas com sucesso!', 'success')
             return redirect(url_for('perfil'))
 
@@ -276,22 +504,48 @@ def create_app():
         # === DASHBOARD ADMIN ===
     @app.route('/admin/dashboard')
     @login_required
+    @sql_budget(7)
     def admin_dashboard():
         if not current_user.is_admin:
             abort(403)
-        projects = Project.query.order_by(Project.created_at.desc()).all()
-        users = User.query.order_by(User.name).all()
-        return render_template('admin_dashboard.html', projects=projects, users=users)
+        # tudo aqui é O(tamanho da página): contadores desnormalizados + consolidado diário
+        tabela = 'usuarios' if request.args.get('tabela') == 'usuarios' else 'projetos'
+        page = request.args.get('page', 1, type=int)
+        if tabela == 'usuarios':
+            linhas = offset_paginate(ordenar(User.query, User, ORDENS_USUARIOS, 'projetos'),
+                                     page, ADMIN_POR_PAGINA)
+        else:
+            linhas = offset_paginate(ordenar(Project.query.options(lazyload(Project.authors)),
+                                             Project, ORDENS_PROJETOS, 'data'),
+                                     page, ADMIN_POR_PAGINA)
+        ttl = app.config['PROJECT_COUNT_TTL'] or 60
+        totais = {
+            'projetos': cached_count('projects', lambda: Project.query.count(), ttl),
+            'usuarios': cached_count('users', lambda: User.query.count(), ttl),
+            'favoritos': cached_count('favorites', lambda: Favorite.query.count(), ttl),
+        }
+        dias = DailyStats.query.order_by(DailyStats.day.desc()).limit(30).all()
+        return render_template('admin_dashboard.html', tabela=tabela, linhas=linhas, totais=totais, dias=dias,
+                               ordem=request.args.get('ordem'), direcao=request.args.get('dir', 'desc'))
+
+    @app.route('/admin/db-pool')
+    @login_required
+    def admin_db_pool():
+        if not current_user.is_admin:
+            abort(403)
+        return jsonify(database.metricas.snapshot())
 
         # === DASHBOARD DO USUÁRIO ===
     @app.route('/meus_projetos')
     @login_required
+    @sql_budget(4)
     def meus_projetos():
-        # projetos em que o usuário é autor
-        projetos = Project.query.filter(Project.authors.any(id=current_user.id)).order_by(Project.created_at.desc()).all()
-        return render_template('meus_projetos.html', projetos=projetos)
-
-
+        # projetos em que o usuário é autor (JOIN direto em author_project, sem EXISTS correlacionado)
+        listagem = (Project.query.options(lazyload(Project.authors))
+                    .join(author_project, author_project.c.project_id == Project.id)
+                    .filter(author_project.c.user_id == current_user.id))
+        pagina = keyset_paginate(listagem, Project, request.args.get('cursor'), per_page=12)
+        return render_template('meus_projetos.html', pagina=pagina, resumo=resumo.do_usuario(current_user.id))
 
     return app
 
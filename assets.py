@@ -0,0 +1,287 @@
+# assets.py
+"""CSS/JS/fontes servidos pela própria aplicação, com nome por conteúdo.
+
+``flask assets vendor`` baixa uma vez as dependências de front-end (Bootstrap,
+bootstrap-icons, fonte Inter) para ``static/vendor/``, junto com as fontes
+citadas nos CSS, que são reescritos para apontar para as cópias locais.
+
+``flask assets build`` copia tudo de ``static/`` para ``static/dist/`` com o
+hash do conteúdo no nome (``css/style.3f2a9c1d0b7e.css``), reescreve os
+``url()`` dos CSS para os nomes novos, grava as versões ``.gz`` (e ``.br``,
+com o pacote ``brotli`` instalado) e o ``manifest.json``. Rodar no deploy.
+
+Nos templates, ``asset_url('css/style.css')`` devolve o nome com hash
+(servido em ``/assets/`` com cache imutável e a variante comprimida que o
+navegador aceitar). Sem build, cai para ``/static/``; sem a cópia local de
+uma dependência, para a URL de CDN passada em ``cdn=``.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.parse
+import urllib.request
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+DIST = 'dist'
+MANIFESTO = 'manifest.json'
+COMPRIMIR = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.ttf', '.eot')  # woff/woff2/png já são comprimidos
+COMPRIMIR_MIN = 1024
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+# destino em static/ -> URL de origem
+VENDOR = {
+    'vendor/bootstrap/bootstrap.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css',
+    'vendor/inter/inter.css': 'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700&display=swap',
+}
+# o Google Fonts só entrega woff2 para navegadores que ele reconhece
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def _hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(64 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()[:12]
+
+
+def _urls_css(texto):
+    """Referências ``url()`` relevantes de um CSS (sem data: e sem âncoras)."""
+    for m in CSS_URL_RE.finditer(texto):
+        alvo = m.group(2).strip()
+        if not alvo.startswith(('data:', '#')):
+            yield m, alvo
+
+
+# ============================
+#           VENDOR
+# ============================
+
+def _baixar(url):
+    req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.read()
+
+
+def _gravar(path, dados):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(dados)
+    os.replace(path + '.tmp', path)
+
+
+def vendor(pasta_static, eco=print):
+    """Baixa ``VENDOR`` (e as fontes citadas nos CSS) para ``static/``."""
+    for destino, url in VENDOR.items():
+        dados = _baixar(url)
+        path = os.path.join(pasta_static, destino)
+        if destino.endswith('.css'):
+            texto = dados.decode('utf-8')
+            trocas = {}
+            for _, alvo in _urls_css(texto):
+                origem = urllib.parse.urljoin(url, alvo)
+                caminho = urllib.parse.urlsplit(origem).path
+                # relativo continua relativo; absoluto (fonts.gstatic.com) vai para fonts/
+                local = alvo.split('?', 1)[0].split('#', 1)[0] if not urllib.parse.urlsplit(alvo).netloc \
+                    else 'fonts/' + os.path.basename(caminho)
+                local = os.path.normpath(local).lstrip('./')
+                if alvo not in trocas:
+                    _gravar(os.path.join(os.path.dirname(path), local), _baixar(origem))
+                    trocas[alvo] = local
+            texto = CSS_URL_RE.sub(lambda m: f'url("{trocas.get(m.group(2).strip(), m.group(2))}")', texto)
+            dados = texto.encode('utf-8')
+            eco(f'{destino}: {len(trocas)} arquivos referenciados')
+        _gravar(path, dados)
+        eco(f'{destino} <- {url}')
+
+
+# ============================
+#           BUILD
+# ============================
+
+def _comprimir(path):
+    if not path.endswith(COMPRIMIR) or os.path.getsize(path) < COMPRIMIR_MIN:
+        return
+    with open(path, 'rb') as f:
+        dados = f.read()
+    # mtime=0: o .gz sai igual a cada build do mesmo arquivo
+    _gravar(path + '.gz', gzip.compress(dados, compresslevel=9, mtime=0))
+    try:
+        import brotli  # opcional: sem ele só há .gz
+    except ImportError:
+        return
+    _gravar(path + '.br', brotli.compress(dados, quality=11))
+
+
+def build(pasta_static, eco=print):
+    """Gera ``static/dist/`` e devolve o manifesto {caminho lógico: caminho com hash}."""
+    saida = os.path.join(pasta_static, DIST)
+    nova, antiga = saida + '.novo', saida + '.antigo'
+    # inclui as sobras de um build interrompido, que não podem ir parar dentro do dist novo
+    gerados = {os.path.abspath(p) for p in (saida, nova, antiga)}
+    origem = []
+    for raiz, dirs, arquivos in os.walk(pasta_static):
+        if os.path.abspath(raiz) in gerados:
+            dirs[:] = []
+            continue
+        dirs.sort()
+        for nome in sorted(arquivos):
+            origem.append(os.path.relpath(os.path.join(raiz, nome), pasta_static).replace(os.sep, '/'))
+
+    shutil.rmtree(nova, ignore_errors=True)
+    manifesto = {}
+
+    def publicar(logico, dados=None):
+        base, ext = os.path.splitext(logico)
+        if dados is None:
+            digest = _hash(os.path.join(pasta_static, logico))
+        else:
+            digest = hashlib.sha256(dados).hexdigest()[:12]
+        final = f'{base}.{digest}{ext}'
+        destino = os.path.join(nova, final)
+        if dados is None:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.copyfile(os.path.join(pasta_static, logico), destino)
+        else:
+            _gravar(destino, dados)
+        _comprimir(destino)
+        manifesto[logico] = final
+
+    # CSS por último: os url() precisam dos nomes finais de fontes e imagens
+    for logico in [p for p in origem if not p.endswith('.css')] + [p for p in origem if p.endswith('.css')]:
+        if not logico.endswith('.css'):
+            publicar(logico)
+            continue
+        with open(os.path.join(pasta_static, logico), encoding='utf-8') as f:
+            texto = f.read()
+        pasta_css = os.path.dirname(logico)
+
+        def trocar(m):
+            alvo = m.group(2).strip()
+            if alvo.startswith(('data:', '#')) or urllib.parse.urlsplit(alvo).netloc or alvo.startswith('/'):
+                return m.group(0)
+            caminho = alvo.split('?', 1)[0]  # o hash no nome já faz o papel do ?v=
+            ref = os.path.normpath(os.path.join(pasta_css, caminho.split('#', 1)[0])).replace(os.sep, '/')
+            if ref not in manifesto:
+                return m.group(0)
+            relativo = os.path.relpath(manifesto[ref], pasta_css or '.').replace(os.sep, '/')
+            sufixo = '#' + caminho.split('#', 1)[1] if '#' in caminho else ''
+            return f'url("{relativo}{sufixo}")'
+        publicar(logico, CSS_URL_RE.sub(trocar, texto).encode('utf-8'))
+
+    _gravar(os.path.join(nova, MANIFESTO), json.dumps(manifesto, indent=2, sort_keys=True).encode('utf-8'))
+    # troca o diretório inteiro de uma vez; o dist anterior só some depois
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(saida):
+        os.rename(saida, antiga)
+    os.rename(nova, saida)
+    shutil.rmtree(antiga, ignore_errors=True)
+    eco(f'{len(manifesto)} arquivos em {saida}')
+    return manifesto
+
+
+# ============================
+#      TEMPLATES E ROTA
+# ============================
+
+def carregar_manifesto(app):
+    path = os.path.join(app.static_folder, DIST, MANIFESTO)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _versao(app):
+    """Hash do manifesto, dos templates e de ``RELEASE``: muda a cada deploy que muda o HTML."""
+    h = hashlib.sha256(json.dumps(app.extensions['assets'], sort_keys=True).encode('utf-8'))
+    h.update((app.config.get('RELEASE') or '').encode('utf-8'))
+    pasta = os.path.join(app.root_path, app.template_folder)
+    for raiz, dirs, arquivos in os.walk(pasta):
+        dirs.sort()
+        for nome in sorted(arquivos):
+            path = os.path.join(raiz, nome)
+            h.update(os.path.relpath(path, pasta).encode('utf-8'))
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()[:10]
+
+
+def _recarregar(app):
+    app.extensions['assets'] = carregar_manifesto(app)
+    app.extensions['assets_versao'] = _versao(app)
+
+
+def versao_build():
+    """Identificador do deploy para ETags e chaves de cache de páginas HTML.
+
+    Sem ele, um 304 depois do deploy manteria no navegador um HTML que aponta
+    para nomes em ``/assets/`` que o ``build`` novo já apagou.
+    """
+    if current_app.debug:
+        _recarregar(current_app)
+    return current_app.extensions['assets_versao']
+
+
+def asset_url(path, cdn=None):
+    app = current_app
+    if app.debug:
+        _recarregar(app)  # em desenvolvimento o build pode mudar a qualquer hora
+    final = app.extensions['assets'].get(path)
+    if final is not None:
+        return url_for('assets', filename=final)
+    if cdn and not os.path.isfile(os.path.join(app.static_folder, path)):
+        return cdn  # dependência ainda não baixada com "flask assets vendor"
+    return url_for('static', filename=path)
+
+
+def servir(filename):
+    pasta = os.path.join(current_app.static_folder, DIST)
+    mimetype = mimetypes.guess_type(filename)[0]
+    resp = None
+    for codificacao, ext in (('br', '.br'), ('gzip', '.gz')):
+        comprimido = safe_join(pasta, filename + ext)
+        if request.accept_encodings[codificacao] and comprimido and os.path.isfile(comprimido):
+            resp = send_from_directory(pasta, filename + ext, mimetype=mimetype, max_age=31536000)
+            resp.headers['Content-Encoding'] = codificacao
+            break
+    if resp is None:
+        resp = send_from_directory(pasta, filename, max_age=31536000)
+    resp.vary.add('Accept-Encoding')
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True  # o nome muda junto com o conteúdo
+    return resp
+
+
+def init_app(app):
+    # commit do deploy, quando a plataforma informa (o Render define RENDER_GIT_COMMIT)
+    app.config.setdefault('RELEASE', os.getenv('RELEASE') or os.getenv('RENDER_GIT_COMMIT') or '')
+    _recarregar(app)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.add_url_rule('/assets/<path:filename>', 'assets', servir)
+
+    @app.cli.group('assets')
+    def assets_cli():
+        """CSS, JS e fontes servidos localmente."""
+
+    @assets_cli.command('vendor')
+    def assets_vendor():
+        """Baixa Bootstrap, bootstrap-icons e a fonte Inter para static/vendor/."""
+        vendor(app.static_folder, eco=click.echo)
+
+    @assets_cli.command('build')
+    def assets_build():
+        """Gera static/dist/ com nomes por hash, .gz/.br e o manifest.json."""
+        build(app.static_folder, eco=click.echo)
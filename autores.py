@@ -0,0 +1,105 @@
+# autores.py
+"""Resolução em lote de nomes de autores (texto livre) para usuários.
+
+Os nomes são comparados pela forma normalizada (minúsculas, sem acentos,
+espaços colapsados) guardada em ``User.name_normalized``, que é indexada e
+mantida automaticamente sempre que ``User.name`` muda.
+
+Quando um usuário se cadastra ou muda de nome, a tarefa ``vincular_autor``
+(jobs.py) liga a ele os projetos que já o citavam em ``authors_text``.
+"""
+from sqlalchemy import event
+
+import cache
+import jobs
+import stats
+from models import db, User, Project, author_project
+from search import normalizar
+
+
+def normalizar_nome(nome):
+    return ' '.join(normalizar(nome).split())
+
+
+def separar_nomes(texto):
+    """'Ana Sá, João' -> ['Ana Sá', 'João']"""
+    return [n.strip() for n in (texto or '').split(',') if n.strip()]
+
+
+def resolver(nomes):
+    """Devolve {nome normalizado: User} para os nomes que têm usuário, com um único SELECT.
+
+    Se dois usuários tiverem o mesmo nome normalizado vale o de menor id.
+    """
+    chaves = {normalizar_nome(n) for n in nomes} - {''}
+    if not chaves:
+        return {}
+    encontrados = {}
+    for user in User.query.filter(User.name_normalized.in_(chaves)).order_by(User.id.desc()):
+        encontrados[user.name_normalized] = user
+    return encontrados
+
+
+def usuarios_do_texto(texto):
+    """Usuários citados em ``authors_text``, na ordem do texto e sem repetição."""
+    por_nome = resolver(separar_nomes(texto))
+    vistos, usuarios = set(), []
+    for nome in separar_nomes(texto):
+        user = por_nome.get(normalizar_nome(nome))
+        if user is not None and user.id not in vistos:
+            vistos.add(user.id)
+            usuarios.append(user)
+    return usuarios
+
+
+def mapa_de_ids():
+    """{nome normalizado: user_id} de todos os usuários, para jobs em lote."""
+    mapa = {}
+    linhas = db.session.execute(
+        db.select(User.name_normalized, User.id).order_by(User.id.desc())
+    )
+    for chave, user_id in linhas:
+        mapa[chave] = user_id
+    return mapa
+
+
+@jobs.tarefa('vincular_autor')
+def vincular_usuario(user_id, lote=1000):
+    """Associa ao usuário os projetos cujo ``authors_text`` cita o nome dele."""
+    user = db.session.get(User, user_id)
+    if user is None or not user.name_normalized:
+        return 0
+    # mesma regra de resolver(): com nomes repetidos, quem vale é o menor id
+    dono = db.session.execute(
+        db.select(db.func.min(User.id)).where(User.name_normalized == user.name_normalized)
+    ).scalar()
+    if dono != user.id:
+        return 0
+
+    # pré-filtro no banco pela palavra mais longa do nome (com e sem acento); confirmação exata aqui
+    palavra = max(user.name.split(), key=len).lower()
+    candidatos = {palavra, normalizar_nome(palavra)}
+    filtro = db.or_(*(db.func.lower(Project.authors_text).contains(p, autoescape=True) for p in candidatos))
+    ja_vinculados = db.select(author_project.c.project_id).where(author_project.c.user_id == user.id)
+    consulta = (db.select(Project.id, Project.authors_text)
+                .where(filtro, Project.id.notin_(ja_vinculados)).order_by(Project.id))
+
+    novos, ultimo = [], 0
+    while True:
+        linhas = db.session.execute(consulta.where(Project.id > ultimo).limit(lote)).all()
+        if not linhas:
+            break
+        ultimo = linhas[-1][0]
+        novos += [{'user_id': user.id, 'project_id': pid} for pid, texto in linhas
+                  if user.name_normalized in map(normalizar_nome, separar_nomes(texto))]
+    if novos:
+        db.session.execute(author_project.insert(), novos)
+        stats.autoria_em_lote(novos)
+        cache.marcar('projetos', *{f'projeto:{linha["project_id"]}' for linha in novos})
+    db.session.commit()
+    return len(novos)
+
+
+@event.listens_for(User.name, 'set')
+def _atualizar_normalizado(target, value, oldvalue, initiator):
+    target.name_normalized = normalizar_nome(value)
@@ -0,0 +1,10 @@
+"""Benchmarks reproduzíveis das rotas do catálogo.
+
+``dados`` gera uma base sintética (usuários, projetos com descrições em
+português, favoritos com distribuição de cauda longa) e ``executar`` mede as
+rotas pelo test client do Flask ou por HTTP contra vários workers locais.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.executar --usuarios 500 --projetos 5000 --salvar base.json
+    python -m benchmarks.executar --usuarios 500 --projetos 5000 --comparar base.json
+"""
@@ -0,0 +1,348 @@
+# benchmarks/executar.py
+"""Mede as rotas principais sobre uma base sintética nova (SQLite temporário).
+
+Dois modos:
+- ``cliente``: test client do Flask, sequencial; conta o SQL de cada
+  requisição com ``query_budget.count_queries``.
+- ``http``: servidor local com ``--workers`` processos (pré-fork sobre o mesmo
+  socket, só Linux/macOS) e ``--concorrencia`` clientes simultâneos; o SQL
+  vem do cabeçalho Server-Timing.
+
+Relata p50/p95/p99, vazão e média de comandos SQL por rota. ``--salvar``
+grava o resultado em JSON; ``--comparar`` usa um JSON anterior como linha de
+base e termina com código 1 se alguma rota regredir.
+
+Uso:
+    python -m benchmarks.executar [--modo cliente|http] [--usuarios 200] [--projetos 2000]
+        [--requisicoes 200] [--salvar base.json] [--comparar base.json] [--tolerancia 0.2]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import re
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+ROTAS = ['index', 'busca', 'detalhe', 'favoritos', 'meus_projetos', 'admin_dashboard', 'upload']
+TAMANHO_UPLOAD = 64 * 1024
+SQL_RE = re.compile(r'desc="(\d+) comandos"')
+
+
+# === Preparação ===
+def criar_app(pasta, cache_paginas):
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(pasta, "bench.db")}'
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    from app import create_app
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, SERVER_TIMING=True, SQL_QUERY_BUDGET_ENFORCE=False,
+                      PAGE_CACHE_ENABLED=cache_paginas,
+                      RATE_LIMIT_ENABLED=False,  # todos os usuários virtuais vêm do mesmo IP
+                      PASSWORD_WORKERS=0,  # os workers do modo http são daemon: sem pool de processos
+                      UPLOAD_FOLDER=os.path.join(pasta, 'uploads'),
+                      DERIVATIVES_FOLDER=os.path.join(pasta, 'derivados'))
+    return app
+
+
+def preparar_base(app, args):
+    from flask_migrate import upgrade
+    from benchmarks import dados
+
+    with app.app_context():
+        upgrade(directory=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations'))
+        inicio = time.monotonic()
+        resumo = dados.gerar(args.usuarios, args.projetos, args.favoritos, seed=args.seed)
+    print(f'Base gerada em {time.monotonic() - inicio:.1f}s: {resumo["usuarios"]} usuários, '
+          f'{resumo["projetos"]} projetos, {resumo["favoritos"]} favoritos.')
+    return resumo
+
+
+def requisicao(rota, rnd, resumo):
+    """(método, url, corpo multipart ou None, autenticado) de uma requisição da rota."""
+    if rota == 'index':
+        return 'GET', '/', None, False
+    if rota == 'busca':
+        return 'GET', '/?' + urlencode({'q': rnd.choice(resumo['termos'])}), None, False
+    if rota == 'detalhe':
+        return 'GET', f'/project/{rnd.randint(1, resumo["projetos"])}', None, False
+    if rota == 'upload':
+        campos = {'title': f'Upload {uuid.uuid4().hex[:8]}', 'description': 'Projeto enviado pelo benchmark.',
+                  'authors': 'Benchmark'}
+        return 'POST', '/project/new', (campos, ('arquivo.zip', os.urandom(TAMANHO_UPLOAD))), True
+    return 'GET', {'favoritos': '/favoritos', 'meus_projetos': '/meus_projetos',
+                   'admin_dashboard': '/admin/dashboard'}[rota], None, True
+
+
+def multipart(campos, arquivo):
+    fronteira = uuid.uuid4().hex
+    partes = []
+    for nome, valor in campos.items():
+        partes.append(f'--{fronteira}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode())
+    nome_arquivo, conteudo = arquivo
+    partes.append(f'--{fronteira}\r\nContent-Disposition: form-data; name="file"; filename="{nome_arquivo}"\r\n'
+                  'Content-Type: application/octet-stream\r\n\r\n'.encode() + conteudo + b'\r\n')
+    partes.append(f'--{fronteira}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={fronteira}'
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados) + 0.5) - 1))]
+
+
+def resumir(latencias, consultas, duracao):
+    return {
+        'n': len(latencias),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'media_ms': round(statistics.fmean(latencias) * 1000, 2),
+        'rps': round(len(latencias) / duracao, 1) if duracao else None,
+        'sql_media': round(statistics.fmean(consultas), 1) if consultas else None,
+    }
+
+
+# === Modo test client ===
+def rodar_cliente(app, resumo, args):
+    from io import BytesIO
+    from benchmarks import dados
+    from query_budget import count_queries
+
+    def logar(email):
+        cliente = app.test_client()
+        resp = cliente.post('/login', data={'email': email, 'password': dados.SENHA})
+        if resp.status_code != 302:
+            raise SystemExit(f'Login de {email} falhou.')
+        return cliente
+
+    anonimo = app.test_client()
+    logado = logar(f'usuario{resumo["usuario_com_mais_favoritos"]}@{dados.DOMINIO}')
+    admin = logar(f'usuario1@{dados.DOMINIO}')
+    rnd = random.Random(args.seed)
+    resultados = {}
+    for rota in args.rotas:
+        cliente = admin if rota == 'admin_dashboard' else logado
+        latencias, consultas = [], []
+        inicio_rota = time.perf_counter()
+        for i in range(args.aquecimento + args.requisicoes):
+            metodo, url, corpo, autenticado = requisicao(rota, rnd, resumo)
+            c = cliente if autenticado else anonimo
+            kwargs = {}
+            if corpo:
+                campos, (nome, conteudo) = corpo
+                kwargs = {'data': {**campos, 'file': (BytesIO(conteudo), nome)},
+                          'content_type': 'multipart/form-data'}
+            with count_queries() as n:
+                t0 = time.perf_counter()
+                resp = c.open(url, method=metodo, **kwargs)
+                dt = time.perf_counter() - t0
+            if resp.status_code >= 400 or (metodo == 'GET' and resp.status_code != 200):
+                raise SystemExit(f'{rota}: {metodo} {url} devolveu {resp.status_code}')
+            if i == args.aquecimento - 1:
+                inicio_rota = time.perf_counter()
+            if i >= args.aquecimento:
+                latencias.append(dt)
+                consultas.append(n[0])
+        resultados[rota] = resumir(latencias, consultas, time.perf_counter() - inicio_rota)
+        imprimir_linha(rota, resultados[rota])
+    return resultados
+
+
+# === Modo HTTP ===
+def _servir(app, fd):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class Silencioso(WSGIRequestHandler):
+        def log_request(self, *a, **k):
+            pass
+
+    servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=Silencioso, fd=fd)
+    servidor.serve_forever()
+
+
+def login_http(porta, email):
+    from benchmarks import dados
+
+    conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=30)
+    corpo = urlencode({'email': email, 'password': dados.SENHA})
+    conn.request('POST', '/login', corpo, {'Content-Type': 'application/x-www-form-urlencoded'})
+    resp = conn.getresponse()
+    resp.read()
+    if resp.status != 302:
+        raise SystemExit(f'Login de {email} falhou.')
+    cookie = SimpleCookie(resp.getheader('Set-Cookie'))
+    return '; '.join(f'{k}={v.value}' for k, v in cookie.items())
+
+
+def rodar_http(app, resumo, args):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(('127.0.0.1', 0))
+    sock.listen(128)
+    porta = sock.getsockname()[1]
+
+    with app.app_context():
+        from models import db
+        db.engine.dispose()  # cada worker abre as próprias conexões depois do fork
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_servir, args=(app, sock.fileno()), daemon=True) for _ in range(args.workers)]
+    for w in workers:
+        w.start()
+
+    try:
+        from benchmarks.dados import DOMINIO
+        cookie = login_http(porta, f'usuario{resumo["usuario_com_mais_favoritos"]}@{DOMINIO}')
+        cookie_admin = login_http(porta, f'usuario1@{DOMINIO}')
+        locais = threading.local()
+
+        def enviar(item):
+            rota, (metodo, url, corpo, autenticado) = item
+            conn = getattr(locais, 'conn', None)
+            if conn is None:
+                conn = locais.conn = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+            headers = {}
+            if autenticado:
+                headers['Cookie'] = cookie_admin if rota == 'admin_dashboard' else cookie
+            dados = None
+            if corpo:
+                dados, headers['Content-Type'] = multipart(*corpo)
+            t0 = time.perf_counter()
+            try:
+                conn.request(metodo, url, dados, headers)
+                resp = conn.getresponse()
+                resp.read()
+            except (http.client.HTTPException, OSError):
+                locais.conn = None
+                conn.close()
+                raise
+            dt = time.perf_counter() - t0
+            if resp.getheader('Connection', '').lower() == 'close' or resp.version == 10:
+                conn.close()
+                locais.conn = None
+            if resp.status >= 400 or (metodo == 'GET' and resp.status != 200):
+                raise RuntimeError(f'{rota}: {metodo} {url} devolveu {resp.status}')
+            m = SQL_RE.search(resp.getheader('Server-Timing') or '')
+            return dt, int(m.group(1)) if m else None
+
+        rnd = random.Random(args.seed)
+        resultados = {}
+        with ThreadPoolExecutor(args.concorrencia) as pool:
+            for rota in args.rotas:
+                itens = [(rota, requisicao(rota, rnd, resumo)) for _ in range(args.aquecimento)]
+                list(pool.map(enviar, itens))
+                itens = [(rota, requisicao(rota, rnd, resumo)) for _ in range(args.requisicoes)]
+                inicio = time.perf_counter()
+                medidas = list(pool.map(enviar, itens))
+                duracao = time.perf_counter() - inicio
+                consultas = [q for _, q in medidas if q is not None]
+                resultados[rota] = resumir([dt for dt, _ in medidas], consultas, duracao)
+                imprimir_linha(rota, resultados[rota])
+        return resultados
+    finally:
+        for w in workers:
+            w.terminate()
+        sock.close()
+
+
+# === Relatório e comparação ===
+def imprimir_cabecalho():
+    print(f'{"rota":<18}{"n":>6}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>10}{"SQL":>7}')
+
+
+def imprimir_linha(rota, r):
+    sql = '-' if r['sql_media'] is None else f'{r["sql_media"]:.1f}'
+    print(f'{rota:<18}{r["n"]:>6}{r["p50_ms"]:>10.2f}{r["p95_ms"]:>10.2f}{r["p99_ms"]:>10.2f}'
+          f'{r["rps"] or 0:>10.1f}{sql:>7}')
+
+
+def comparar(atual, base, tolerancia, folga_ms):
+    """Lista de regressões: p95 acima da tolerância (e da folga absoluta) ou mais SQL."""
+    regressoes = []
+    for rota, r in atual.items():
+        b = base.get(rota)
+        if not b:
+            continue
+        limite = b['p95_ms'] * (1 + tolerancia)
+        if r['p95_ms'] > limite and r['p95_ms'] - b['p95_ms'] > folga_ms:
+            regressoes.append(f'{rota}: p95 {b["p95_ms"]:.2f} -> {r["p95_ms"]:.2f} ms')
+        if r['sql_media'] is not None and b.get('sql_media') is not None and r['sql_media'] > b['sql_media']:
+            regressoes.append(f'{rota}: SQL por requisição {b["sql_media"]} -> {r["sql_media"]}')
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--modo', choices=['cliente', 'http'], default='cliente')
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--projetos', type=int, default=2000)
+    parser.add_argument('--favoritos', type=int, default=20, help='média aproximada de favoritos por usuário')
+    parser.add_argument('--requisicoes', type=int, default=200, help='requisições medidas por rota')
+    parser.add_argument('--aquecimento', type=int, default=10, help='requisições descartadas por rota')
+    parser.add_argument('--rotas', nargs='+', choices=ROTAS, default=ROTAS)
+    parser.add_argument('--workers', type=int, default=4, help='processos do servidor (modo http)')
+    parser.add_argument('--concorrencia', type=int, default=16, help='clientes simultâneos (modo http)')
+    parser.add_argument('--sem-cache', action='store_true', help='desliga o cache de páginas para anônimos')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--salvar', help='grava o resultado em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior (linha de base)')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo aceito no p95')
+    parser.add_argument('--folga-ms', type=float, default=1.0, help='diferença absoluta mínima para acusar')
+    args = parser.parse_args(argv)
+
+    pasta = tempfile.mkdtemp(prefix='catalogo-bench-')
+    app = None
+    try:
+        app = criar_app(pasta, cache_paginas=not args.sem_cache)
+        resumo = preparar_base(app, args)
+        print(f'\nModo {args.modo}' + (f' ({args.workers} workers, {args.concorrencia} clientes)'
+                                     if args.modo == 'http' else ''))
+        imprimir_cabecalho()
+        rodar = rodar_http if args.modo == 'http' else rodar_cliente
+        resultados = rodar(app, resumo, args)
+    finally:
+        if app is not None:
+            app.extensions['jobs'].parar()  # antes de apagar a base que as tarefas ainda usam
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    saida = {
+        'meta': {'modo': args.modo, 'usuarios': args.usuarios, 'projetos': args.projetos,
+                 'requisicoes': args.requisicoes, 'seed': args.seed, 'cache': not args.sem_cache,
+                 'python': sys.version.split()[0], 'data': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'rotas': resultados,
+    }
+    if args.salvar:
+        with open(args.salvar, 'w') as f:
+            json.dump(saida, f, indent=2, ensure_ascii=False)
+        print(f'\nResultado salvo em {args.salvar}')
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        for chave in ('modo', 'usuarios', 'projetos', 'cache'):
+            if base['meta'].get(chave) != saida['meta'][chave]:
+                print(f'Aviso: {chave} difere da linha de base '
+                      f'({base["meta"].get(chave)} -> {saida["meta"][chave]}); a comparação pode não valer.')
+        regressoes = comparar(resultados, base['rotas'], args.tolerancia, args.folga_ms)
+        if regressoes:
+            print('\nRegressões em relação à linha de base:')
+            for r in regressoes:
+                print(f'  - {r}')
+            return 1
+        print('\nSem regressões em relação à linha de base.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+# cache.py
+"""Cache de páginas/fragmentos para visitantes anônimos.
+
+Backend padrão: LRU em memória com TTL, por processo. Com ``CACHE_URL``
+(``redis://...``) usa um Redis compartilhado entre os workers; o LRU em
+memória serve de substituto local com a mesma interface, mas as versões das
+tags dele são do processo: com ``WEB_CONCURRENCY`` > 1 e sem ``CACHE_URL`` o
+cache de páginas fica desligado por padrão (``PAGE_CACHE_ENABLED``).
+
+A invalidação é por *tags* versionadas: cada chave embute a versão atual das
+tags de que depende (``projetos``, ``projeto:<id>``...). Quando uma escrita
+commitada toca um Project/Favorite/autoria, os eventos da sessão incrementam
+só as versões afetadas e as entradas antigas simplesmente deixam de ser lidas.
+"""
+import functools
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+
+import assets
+from models import db, Project, Favorite, User
+
+
+class MemoryCache:
+    def __init__(self, max_entries=1000, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._dados = OrderedDict()
+        # versões ficam fora do LRU: se uma fosse despejada voltaria a 0 e reabriria entradas velhas
+        self._versoes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._dados.get(key)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira < time.monotonic():
+                del self._dados[key]
+                return None
+            self._dados.move_to_end(key)
+            return valor
+
+    def set(self, key, valor, ttl=None):
+        expira = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._dados[key] = (valor, expira)
+            self._dados.move_to_end(key)
+            while len(self._dados) > self.max_entries:
+                self._dados.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._dados.pop(key, None)
+
+    def versao(self, tag):
+        return self._versoes.get(tag, 0)
+
+    def invalidar(self, tag):
+        with self._lock:
+            self._versoes[tag] = self._versoes.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+            self._versoes.clear()
+
+
+class RedisCache:
+    """Mesma interface do MemoryCache, compartilhada entre processos."""
+
+    def __init__(self, url, default_ttl=300, prefixo='catalogo:'):
+        import redis  # opcional: só necessário com CACHE_URL
+
+        self._r = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefixo = prefixo
+
+    def get(self, key):
+        valor = self._r.get(self.prefixo + key)
+        return pickle.loads(valor) if valor is not None else None
+
+    def set(self, key, valor, ttl=None):
+        self._r.set(self.prefixo + key, pickle.dumps(valor), ex=ttl or self.default_ttl)
+
+    def delete(self, key):
+        self._r.delete(self.prefixo + key)
+
+    def versao(self, tag):
+        return int(self._r.get(f'{self.prefixo}v:{tag}') or 0)
+
+    def invalidar(self, tag):
+        self._r.incr(f'{self.prefixo}v:{tag}')
+
+    def clear(self):
+        for key in self._r.scan_iter(self.prefixo + '*'):
+            self._r.delete(key)
+
+
+def get_cache():
+    return current_app.extensions['cache']
+
+
+# ============================
+#       CACHE DE PÁGINAS
+# ============================
+
+def _cacheavel():
+    # usuários logados veem botões/menus próprios; flashes pendentes são de uma pessoa só
+    return (request.method == 'GET'
+            and current_app.config['PAGE_CACHE_ENABLED']
+            and '_flashes' not in session
+            and not current_user.is_authenticated)
+
+
+def cached_page(nome, tags, args=(), ttl=None):
+    """Guarda a resposta da view para visitantes anônimos.
+
+    ``tags(**view_args)`` devolve as tags das quais a página depende;
+    ``args`` são os parâmetros da query string que entram na chave.
+    O ETag que a view definir é guardado junto e respondido com 304 nos acertos.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(**view_args):
+            if not _cacheavel():
+                return view(**view_args)
+            cache = get_cache()
+            versoes = ','.join(f'{t}@{cache.versao(t)}' for t in tags(**view_args))
+            params = '&'.join(f'{a}={request.args.get(a, "")}' for a in args)
+            # o deploy entra na chave: com Redis o cache sobrevive a ele, e o HTML antigo cita assets apagados
+            chave = f'page:{assets.versao_build()}:{nome}:{sorted(view_args.items())}:{params}:{versoes}'
+
+            hit = cache.get(chave)
+            if hit is not None:
+                corpo, mimetype, *etag = hit
+                resp = make_response(corpo)
+                resp.mimetype = mimetype
+                resp.headers['X-Cache'] = 'HIT'
+                if etag and etag[0]:
+                    # o ETag da view vale enquanto as tags não mudam, igual ao corpo guardado
+                    resp.headers['ETag'] = etag[0]
+                    resp.cache_control.no_cache = True
+                    resp.make_conditional(request)
+                return resp
+
+            resp = make_response(view(**view_args))
+            if resp.status_code == 200 and '_flashes' not in session:
+                cache.set(chave, (resp.get_data(), resp.mimetype, resp.headers.get('ETag')),
+                          ttl or current_app.config['PAGE_CACHE_TTL'])
+            resp.headers['X-Cache'] = 'MISS'
+            return resp
+        return wrapper
+    return decorator
+
+
+# ============================
+#   INVALIDAÇÃO POR EVENTOS
+# ============================
+
+def marcar(*tags):
+    """Agenda a invalidação de ``tags`` para o próximo commit (escritas fora do ORM)."""
+    db.session.info.setdefault('cache_tags', set()).update(tags)
+
+
+def _tags_do_objeto(obj):
+    if isinstance(obj, Project):
+        return {'projetos', f'projeto:{obj.id}'}
+    if isinstance(obj, Favorite):
+        return {f'projeto:{obj.project_id}', f'resumo:{obj.user_id}'}
+    if isinstance(obj, User):
+        return {f'usuario:{obj.id}'}  # usuário logado em cache (principal.py)
+    return set()
+
+
+def _after_flush(sess, flush_context):
+    tags = sess.info.setdefault('cache_tags', set())
+    for obj in sess.new:
+        tags |= _tags_do_objeto(obj)
+    for obj in sess.deleted:
+        tags |= _tags_do_objeto(obj)
+    for obj in sess.dirty:
+        # inclui mudanças na coleção Project.authors (linhas de author_project)
+        if sess.is_modified(obj):
+            tags |= _tags_do_objeto(obj)
+
+
+def _after_commit(sess):
+    tags = sess.info.pop('cache_tags', None)
+    if tags:
+        cache = get_cache()
+        for tag in tags:
+            cache.invalidar(tag)
+
+
+def _after_rollback(sess, previous_transaction):
+    if previous_transaction.parent is None:  # rollback de SAVEPOINT não descarta a transação externa
+        sess.info.pop('cache_tags', None)
+
+
+def init_app(app):
+    app.config.setdefault('CACHE_URL', None)
+    app.config.setdefault('CACHE_MAX_ENTRIES', 1000)
+    app.config.setdefault('PAGE_CACHE_TTL', 300)
+    app.config.setdefault('WEB_CONCURRENCY', 1)
+    # a invalidação por tags do MemoryCache só alcança o processo que commitou; nos outros
+    # workers a página velha seguiria servida até o TTL. Sem backend compartilhado, só com um processo
+    app.config.setdefault('PAGE_CACHE_ENABLED',
+                          bool(app.config['CACHE_URL']) or app.config['WEB_CONCURRENCY'] <= 1)
+    if app.config['CACHE_URL']:
+        app.extensions['cache'] = RedisCache(app.config['CACHE_URL'], app.config['PAGE_CACHE_TTL'])
+    else:
+        app.extensions['cache'] = MemoryCache(app.config['CACHE_MAX_ENTRIES'], app.config['PAGE_CACHE_TTL'])
+
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_rollback)
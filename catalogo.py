@@ -0,0 +1,388 @@
+# catalogo.py
+"""Exportação e importação do catálogo inteiro (``flask catalog export|import``).
+
+O pacote tem um arquivo por tabela — ``users``, ``projects``,
+``authorships``, ``favorites`` e ``stored_files`` — em NDJSON (uma linha JSON
+por registro) ou CSV, e opcionalmente os anexos em ``uploads/``. O destino
+pode ser um diretório ou um .tar/.tar.gz (``-`` = stdout/stdin).
+
+A exportação lê com ``yield_per`` e escreve linha a linha, em memória
+constante. A importação insere em lotes (executemany) e remapeia os ids:
+usuários com e-mail já cadastrado são reaproveitados e os demais registros
+recebem ids novos a partir do maior id atual — por isso a importação deve
+rodar sem outras escritas concorrentes. Contadores, nomes normalizados,
+referências de ``stored_file`` e os índices de busca e de sugestões são
+recalculados no fim.
+"""
+import csv
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import func, select
+
+import autores
+import cache
+import search
+import stats
+import storage
+from models import db, User, Project, Favorite, StoredFile, author_project
+
+# ordem importa: quem é referenciado vem antes
+TABELAS = {
+    'users': (User.__table__, ['id', 'name', 'email', 'password_hash', 'is_admin', 'foto_perfil']),
+    'projects': (Project.__table__, ['id', 'title', 'description', 'created_at', 'file_path', 'authors_text']),
+    'authorships': (author_project, ['user_id', 'project_id']),
+    'favorites': (Favorite.__table__, ['user_id', 'project_id', 'created_at']),
+    'stored_files': (StoredFile.__table__, ['sha256', 'filename', 'size', 'created_at']),
+}
+DATAS = {'created_at'}
+BOOLEANOS = {'is_admin'}
+INTEIROS = {'id', 'user_id', 'project_id', 'size'}
+UPLOADS_DIR = 'uploads/'
+SPOOL_MAX = 8 * 1024 * 1024  # acima disso o arquivo da tabela vai para disco antes de entrar no tar
+
+
+# ============================
+#          EXPORTAÇÃO
+# ============================
+
+def linhas(nome, lote):
+    """Gera dicts de uma tabela, lendo do banco em blocos de ``lote``."""
+    tabela, colunas = TABELAS[nome]
+    stmt = select(*(tabela.c[c] for c in colunas)).execution_options(yield_per=lote)
+    for row in db.session.execute(stmt):
+        yield dict(zip(colunas, row))
+
+
+def _valor_texto(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+def serializar(registros, colunas, formato):
+    """Gera linhas de texto (NDJSON ou CSV com cabeçalho) a partir de dicts."""
+    if formato == 'ndjson':
+        for r in registros:
+            yield json.dumps({k: _valor_texto(v) for k, v in r.items()}, ensure_ascii=False) + '\n'
+        return
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for r in registros:
+        escritor.writerow(['' if r[c] is None else _valor_texto(r[c]) for c in colunas])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _anexos():
+    """(nome, caminho) dos arquivos referenciados por projetos e fotos de perfil que existem em disco."""
+    consulta = (select(Project.file_path).where(Project.file_path.isnot(None))
+                .union(select(User.foto_perfil).where(User.foto_perfil.isnot(None))))
+    for (filename,) in db.session.execute(consulta.execution_options(yield_per=1000)):
+        path = storage.localizar(filename)
+        if path is not None:
+            yield filename, path
+
+
+def exportar(destino, formato='ndjson', anexos=False, lote=1000, eco=print):
+    ext = 'ndjson' if formato == 'ndjson' else 'csv'
+    em_tar = destino == '-' or destino.endswith(('.tar', '.tar.gz', '.tgz'))
+    if not em_tar:
+        os.makedirs(destino, exist_ok=True)
+
+    tar = None
+    if em_tar:
+        modo = 'w|gz' if destino.endswith(('.gz', '.tgz')) else 'w|'
+        saida = sys.stdout.buffer if destino == '-' else open(destino, 'wb')
+        tar = tarfile.open(fileobj=saida, mode=modo)
+    try:
+        for nome, (_, colunas) in TABELAS.items():
+            inicio, total = time.monotonic(), 0
+
+            def contar(registros):
+                nonlocal total
+                for r in registros:
+                    total += 1
+                    yield r
+
+            partes = serializar(contar(linhas(nome, lote)), colunas, formato)
+            if tar is None:
+                with open(os.path.join(destino, f'{nome}.{ext}'), 'w', encoding='utf-8', newline='') as f:
+                    f.writelines(partes)
+            else:
+                # o tar precisa do tamanho antes do conteúdo: a tabela passa por um arquivo temporário
+                with tempfile.SpooledTemporaryFile(SPOOL_MAX) as tmp:
+                    for parte in partes:
+                        tmp.write(parte.encode('utf-8'))
+                    info = tarfile.TarInfo(f'{nome}.{ext}')
+                    info.size, info.mtime = tmp.tell(), int(time.time())
+                    tmp.seek(0)
+                    tar.addfile(info, tmp)
+            eco(f'{nome}: {total} registros ({time.monotonic() - inicio:.1f}s)')
+
+        if anexos:
+            n = 0
+            # no pacote os anexos ficam sem os subdiretórios do armazenamento (uploads/<nome>)
+            for filename, origem in _anexos():
+                if tar is None:
+                    os.makedirs(os.path.join(destino, UPLOADS_DIR), exist_ok=True)
+                    alvo = os.path.join(destino, UPLOADS_DIR, filename)
+                    if os.path.exists(alvo):
+                        pass
+                    elif _mesmo_disco(origem, destino):
+                        os.link(origem, alvo)  # mesmo sistema de arquivos: sem cópia
+                    else:
+                        _copiar(origem, alvo)
+                else:
+                    tar.add(origem, arcname=UPLOADS_DIR + filename, recursive=False)
+                n += 1
+            eco(f'anexos: {n} arquivos')
+    finally:
+        if tar is not None:
+            tar.close()
+            if destino != '-':
+                saida.close()
+
+
+def _mesmo_disco(a, b):
+    try:
+        return os.stat(a).st_dev == os.stat(b).st_dev
+    except OSError:
+        return False
+
+
+def _copiar(origem, alvo):
+    with open(origem, 'rb') as src, open(alvo + '.tmp', 'wb') as dst:
+        for bloco in iter(lambda: src.read(storage.CHUNK), b''):
+            dst.write(bloco)
+    os.replace(alvo + '.tmp', alvo)
+
+
+# ============================
+#          IMPORTAÇÃO
+# ============================
+
+def _ler(fluxo, nome_arquivo):
+    """Gera dicts de um arquivo NDJSON/CSV (fluxo binário), convertendo os tipos."""
+    # linha a linha em bytes: o fluxo de um tar lido em sequência não aceita TextIOWrapper (não é seekable)
+    texto = (linha.decode('utf-8') for linha in fluxo)
+    if nome_arquivo.endswith('.csv'):
+        registros = ({k: (v if v != '' else None) for k, v in r.items()} for r in csv.DictReader(texto))
+    else:
+        registros = (json.loads(linha) for linha in texto if linha.strip())
+    for r in registros:
+        for campo, valor in r.items():
+            if valor is None:
+                continue
+            if campo in DATAS:
+                r[campo] = datetime.fromisoformat(valor)
+            elif campo in INTEIROS:
+                r[campo] = int(valor)
+            elif campo in BOOLEANOS:
+                r[campo] = valor in (True, 'True', 'true', '1', 1)
+        yield r
+
+
+def _em_lotes(registros, tamanho):
+    lote = []
+    for r in registros:
+        lote.append(r)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class Importador:
+    def __init__(self, lote=5000, manter_ids=False, eco=print):
+        self.lote = lote
+        self.manter_ids = manter_ids
+        self.eco = eco
+        self.usuarios = {}  # id antigo -> id novo
+        self.projetos = {}
+        self.arquivos = {}  # metadados de stored_files, aplicados no fim
+
+    def _proximo_id(self, modelo):
+        return (db.session.execute(select(func.max(modelo.id))).scalar() or 0) + 1
+
+    def _inserir(self, nome, registros, preparar):
+        tabela, _ = TABELAS[nome]
+        inicio, total = time.monotonic(), 0
+        for lote in _em_lotes(registros, self.lote):
+            linhas = [linha for linha in map(preparar, lote) if linha is not None]
+            if linhas:
+                db.session.execute(tabela.insert(), linhas)
+                db.session.commit()
+            total += len(linhas)
+        self.eco(f'{nome}: {total} registros ({time.monotonic() - inicio:.1f}s)')
+
+    def users(self, registros):
+        existentes = dict(db.session.execute(select(User.email, User.id)).all())
+        proximo = self._proximo_id(User)
+
+        def preparar(r):
+            nonlocal proximo
+            if r['email'] in existentes:
+                self.usuarios[r['id']] = existentes[r['email']]
+                return None
+            novo = r['id'] if self.manter_ids else proximo
+            proximo += 1
+            self.usuarios[r['id']] = novo
+            existentes[r['email']] = novo
+            return {**r, 'id': novo, 'name_normalized': autores.normalizar_nome(r['name']),
+                    'is_admin': bool(r.get('is_admin'))}
+        self._inserir('users', registros, preparar)
+
+    def projects(self, registros):
+        proximo = self._proximo_id(Project)
+
+        def preparar(r):
+            nonlocal proximo
+            novo = r['id'] if self.manter_ids else proximo
+            proximo += 1
+            self.projetos[r['id']] = novo
+            return {**r, 'id': novo, 'created_at': r.get('created_at') or datetime.utcnow()}
+        self._inserir('projects', registros, preparar)
+
+    def _associacao(self, nome, registros):
+        def preparar(r):
+            user_id, project_id = self.usuarios.get(r['user_id']), self.projetos.get(r['project_id'])
+            if user_id is None or project_id is None:
+                return None  # referência a registro que não veio no pacote
+            return {**r, 'user_id': user_id, 'project_id': project_id}
+        self._inserir(nome, registros, preparar)
+
+    def authorships(self, registros):
+        self._associacao('authorships', registros)
+
+    def favorites(self, registros):
+        # created_at é a chave da paginação de /favoritos: não pode entrar vazio
+        self._associacao('favorites', ({**r, 'created_at': r.get('created_at') or datetime.utcnow()}
+                                       for r in registros))
+
+    def stored_files(self, registros):
+        n = 0
+        for r in registros:
+            self.arquivos[r['filename']] = r
+            n += 1
+        self.eco(f'stored_files: {n} registros')
+
+    def anexo(self, filename, fluxo):
+        if os.path.basename(filename) != filename or filename.startswith('.'):
+            self.eco(f'anexo ignorado (nome inválido): {filename}')
+            return
+        if storage.localizar(filename) is not None:
+            return
+        alvo = storage.caminho(filename)
+        os.makedirs(os.path.dirname(alvo), exist_ok=True)
+        with open(alvo + '.tmp', 'wb') as dst:
+            for bloco in iter(lambda: fluxo.read(storage.CHUNK), b''):
+                dst.write(bloco)
+        os.replace(alvo + '.tmp', alvo)
+
+    def concluir(self):
+        """Refaz o que é derivado: stored_file/refcount, contadores, índice de busca e cache."""
+        conhecidos = set(db.session.execute(select(StoredFile.filename)).scalars())
+        novos = []
+        for filename, meta in self.arquivos.items():
+            if filename not in conhecidos and storage.localizar(filename) is not None:
+                novos.append({'sha256': meta['sha256'], 'filename': filename, 'size': meta['size'],
+                              'refcount': 0, 'created_at': meta.get('created_at') or datetime.utcnow()})
+        for lote in _em_lotes(novos, self.lote):
+            db.session.execute(StoredFile.__table__.insert(), lote)
+        refs = (select(func.count()).select_from(Project).where(Project.file_path == StoredFile.filename)
+                .scalar_subquery()
+                + select(func.count()).select_from(User).where(User.foto_perfil == StoredFile.filename)
+                .scalar_subquery())
+        db.session.execute(StoredFile.__table__.update().values(refcount=refs))
+        if db.engine.dialect.name == 'postgresql':
+            # ids explícitos não avançam as sequências
+            for tabela in ('user', 'project', 'favorite'):
+                db.session.execute(db.text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{tabela}\"', 'id'), "
+                    f"coalesce((SELECT max(id) FROM \"{tabela}\"), 1))"))
+        db.session.commit()
+        stats.recalcular()
+        search.get_index().rebuild()
+        current_app.extensions['sugestoes'].descartar()
+        cache.get_cache().clear()
+
+
+def _membros(origem):
+    """Gera (nome, fluxo binário) do pacote, na ordem em que estão gravados."""
+    if os.path.isdir(origem):
+        for nome in TABELAS:
+            for ext in ('ndjson', 'csv'):
+                path = os.path.join(origem, f'{nome}.{ext}')
+                if os.path.exists(path):
+                    with open(path, 'rb') as f:
+                        yield f'{nome}.{ext}', f
+        pasta = os.path.join(origem, UPLOADS_DIR)
+        if os.path.isdir(pasta):
+            with os.scandir(pasta) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file():
+                        with open(entrada.path, 'rb') as f:
+                            yield UPLOADS_DIR + entrada.name, f
+        return
+    entrada = sys.stdin.buffer if origem == '-' else open(origem, 'rb')
+    try:
+        # leitura sequencial ('r|*'): não precisa caber em memória nem ser pesquisável
+        with tarfile.open(fileobj=entrada, mode='r|*') as tar:
+            for membro in tar:
+                if membro.isfile():
+                    yield membro.name, tar.extractfile(membro)
+    finally:
+        if origem != '-':
+            entrada.close()
+
+
+def importar(origem, lote=5000, manter_ids=False, anexos=True, eco=print):
+    imp = Importador(lote, manter_ids, eco)
+    for nome, fluxo in _membros(origem):
+        if nome.startswith(UPLOADS_DIR):
+            if anexos:
+                imp.anexo(nome[len(UPLOADS_DIR):], fluxo)
+            continue
+        tabela = nome.rsplit('.', 1)[0]
+        if tabela in TABELAS:
+            getattr(imp, tabela)(_ler(fluxo, nome))
+    imp.concluir()
+    eco('Importação concluída; rode "flask thumbnails" e "flask anexos extrair" para as miniaturas e a busca nos anexos.')
+
+
+def init_app(app):
+    @app.cli.group('catalog')
+    def catalog_cli():
+        """Exportação e importação do catálogo."""
+
+    @catalog_cli.command('export')
+    @click.argument('destino')
+    @click.option('--formato', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+    @click.option('--anexos', is_flag=True, help='inclui os arquivos de uploads/')
+    @click.option('--lote', type=int, default=1000, help='linhas lidas do banco por vez')
+    def catalog_export(destino, formato, anexos, lote):
+        """Exporta para DESTINO (diretório, .tar, .tar.gz ou - para stdout)."""
+        # com stdout ocupado pelo tar, o progresso vai para stderr
+        exportar(destino, formato, anexos, lote, eco=lambda msg: click.echo(msg, err=True))
+
+    @catalog_cli.command('import')
+    @click.argument('origem')
+    @click.option('--lote', type=int, default=5000, help='linhas por INSERT em lote')
+    @click.option('--manter-ids', is_flag=True, help='usa os ids do pacote (só em banco vazio)')
+    @click.option('--sem-anexos', is_flag=True, help='ignora os arquivos de uploads/ do pacote')
+    def catalog_import(origem, lote, manter_ids, sem_anexos):
+        """Importa de ORIGEM (diretório, .tar, .tar.gz ou - para stdin)."""
+        importar(origem, lote, manter_ids, not sem_anexos, eco=click.echo)
@@ -0,0 +1,157 @@
+# database.py
+"""Ajustes do engine do SQLAlchemy por banco e métricas do pool de conexões.
+
+Tudo vem de variáveis de ambiente para poder ajustar o deploy (gunicorn)
+sem mexer no código:
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# limites (segundos) do histograma de espera por conexão; contagens acumuladas como no Prometheus
+BUCKETS_ESPERA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def _env_int(nome, padrao):
+    valor = os.getenv(nome)
+    return int(valor) if valor not in (None, '') else padrao
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor in (None, ''):
+        return padrao
+    return valor.lower() in ('1', 'true', 'sim', 'yes', 'on')
+
+
+class PoolMetrics:
+    """Espera no checkout, conexões em uso e timeouts do pool (por processo)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.buckets = [0] * len(BUCKETS_ESPERA)
+        self.pool = None
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+            for i, limite in enumerate(BUCKETS_ESPERA):
+                if segundos <= limite:
+                    self.buckets[i] += 1
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        pool = self.pool
+        with self._lock:
+            dados = {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'espera_total_s': self.espera_total,
+                'espera_max_s': self.espera_max,
+                'espera_buckets': dict(zip(BUCKETS_ESPERA, self.buckets)),
+            }
+        if isinstance(pool, QueuePool):
+            capacidade = pool.size() + max(pool._max_overflow, 0)
+            dados.update({
+                'tamanho': pool.size(),
+                'em_uso': pool.checkedout(),
+                'livres': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'capacidade': capacidade,
+                'saturacao': pool.checkedout() / capacidade if capacidade else 0.0,
+            })
+        return dados
+
+
+metricas = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeout:
+            metricas.registrar_timeout()
+            raise
+        metricas.registrar_espera(time.perf_counter() - inicio)
+        return conn
+
+
+def engine_options(uri):
+    """Monta ``SQLALCHEMY_ENGINE_OPTIONS`` para o banco de ``uri``."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    timeout_sql = _env_int('DB_STATEMENT_TIMEOUT_MS', 0)
+
+    if backend == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return {}  # banco em memória: o SQLAlchemy já usa um pool próprio
+        return {
+            'poolclass': TimedQueuePool,
+            'pool_size': _env_int('DB_POOL_SIZE', 5),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+        }
+
+    opcoes = {
+        'poolclass': TimedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+        # abaixo do wait_timeout típico de hospedagens MySQL, para não reaproveitar conexão morta
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 280),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+    if timeout_sql:
+        if backend == 'mysql':
+            opcoes['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout_sql}'}
+        elif backend == 'postgresql':
+            opcoes['connect_args'] = {'options': f'-c statement_timeout={timeout_sql}'}
+    return opcoes
+
+
+def _pragmas_sqlite(app):
+    pragmas = (
+        'PRAGMA journal_mode=WAL',  # leitores não bloqueiam o escritor
+        'PRAGMA synchronous=NORMAL',  # seguro com WAL e bem mais rápido que FULL
+        f'PRAGMA busy_timeout={app.config["SQLITE_BUSY_TIMEOUT_MS"]}',
+        f'PRAGMA mmap_size={app.config["SQLITE_MMAP_SIZE"]}',
+    )
+
+    def ao_conectar(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return ao_conectar
+
+
+def init_app(app, db):
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT_MS', _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config.setdefault('SQLITE_MMAP_SIZE', _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    with app.app_context():
+        engine = db.engine
+        metricas.pool = engine.pool
+        if engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', _pragmas_sqlite(app))
@@ -0,0 +1,70 @@
+# favoritar.py
+"""Favoritar/desfavoritar com um único comando SQL cada.
+
+A unicidade de (user_id, project_id) fica com o índice único da tabela: o
+INSERT ignora o conflito e o DELETE simplesmente não acha nada, então
+cliques duplos e requisições concorrentes não criam favorito repetido nem
+contam duas vezes. Contadores e cache só mudam quando o comando afetou
+alguma linha.
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+
+import cache
+import resumo
+import stats
+from models import db, Favorite, Project
+
+
+def _inserir_ignorando(user_id, project_id):
+    origem = select(db.literal(user_id), Project.id, db.literal(datetime.utcnow())).where(Project.id == project_id)
+    colunas = ['user_id', 'project_id', 'created_at']
+    dialeto = db.engine.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        if dialeto == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as insert_dialeto
+        else:
+            from sqlalchemy.dialects.postgresql import insert as insert_dialeto
+        stmt = insert_dialeto(Favorite).from_select(colunas, origem).on_conflict_do_nothing()
+    else:
+        # MySQL/MariaDB
+        stmt = insert(Favorite).from_select(colunas, origem).prefix_with('IGNORE')
+    return db.session.execute(stmt).rowcount
+
+
+def _registrar(user_id, project_id, delta):
+    stats.favorito(project_id, delta)
+    cache.marcar(f'projeto:{project_id}', resumo.tag(user_id))
+
+
+def adicionar(user_id, project_id):
+    """Marca como favorito (idempotente); devolve True se criou agora."""
+    if _inserir_ignorando(user_id, project_id):
+        _registrar(user_id, project_id, +1)
+        return True
+    return False
+
+
+def remover(user_id, project_id):
+    """Desmarca (idempotente); devolve True se havia favorito."""
+    apagados = db.session.execute(
+        delete(Favorite).where(Favorite.user_id == user_id, Favorite.project_id == project_id)
+    ).rowcount
+    if apagados:
+        _registrar(user_id, project_id, -apagados)
+        return True
+    return False
+
+
+def alternar(user_id, project_id):
+    """Inverte o estado; devolve o novo estado (True = favorito)."""
+    if remover(user_id, project_id):
+        return False
+    adicionar(user_id, project_id)
+    return True
+
+
+def total(project_id):
+    """``favorite_count`` do projeto, ou None se ele não existe."""
+    return db.session.execute(select(Project.favorite_count).where(Project.id == project_id)).scalar()
@@ -1,6 +1,6 @@
 # forms.py
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, TextAreaField, BooleanField
+from wtforms import StringField, PasswordField, SubmitField, TextAreaField, BooleanField, HiddenField
 from wtforms.validators import DataRequired, Email, EqualTo, Length
 from flask_wtf.file import FileField, FileAllowed
 
@@ -18,10 +18,13 @@ class LoginForm(FlaskForm):
     submit = SubmitField('Entrar')
 
 class ProjectForm(FlaskForm):
+    EXTENSOES = ['pdf', 'png', 'jpg', 'jpeg', 'zip']
+
     title = StringField('Título', validators=[DataRequired(), Length(max=255)])
     description = TextAreaField('Descrição', validators=[DataRequired()])
     authors = StringField('Autores (separe por vírgula)', validators=[DataRequired()])
-    file = FileField('Arquivo (pdf, imagens ou zip)', validators=[FileAllowed(['pdf','png','jpg','jpeg','zip'])])
+    file = FileField('Arquivo (pdf, imagens ou zip)', validators=[FileAllowed(EXTENSOES)])
+    upload_id = HiddenField()  # sessão de upload em partes já concluída no cliente (storage.py)
     submit = SubmitField('Publicar')
 
 
@@ -0,0 +1,281 @@
+# instrumentation.py
+"""Métricas por requisição, cabeçalho Server-Timing e profiler de amostragem.
+
+Para cada requisição medimos o tempo total, os comandos SQL (contagem e tempo,
+vindos de ``query_budget``), o tempo de renderização de templates (sinais do
+Flask), trechos marcados com ``medir('nome')`` (hash de senha, gravação de
+arquivo) e os bytes de upload recebidos.
+
+- ``/admin/metrics`` devolve tudo no formato texto do Prometheus (admin
+  logado ou ``Authorization: Bearer $METRICS_TOKEN``). Os números são por
+  processo: com vários workers cada scrape vê um deles.
+- ``SERVER_TIMING`` liga o cabeçalho ``Server-Timing`` (None = só em debug).
+- ``PROFILE_SLOW_MS`` > 0 liga o profiler: uma thread amostra a pilha das
+  requisições em andamento a cada ``PROFILE_INTERVAL_MS`` e, quando a
+  requisição passa do limite, grava as pilhas no formato "folded" (uma linha
+  ``f1;f2;f3 contagem``) em ``PROFILE_DIR``, pronto para o flamegraph.pl ou
+  o speedscope.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import abort, before_render_template, current_app, g, has_request_context, request, template_rendered, Response
+from flask_login import current_user
+
+import database
+from query_budget import query_count, query_time
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# === Medições dentro da requisição ===
+@contextmanager
+def medir(nome):
+    """Soma o tempo do bloco no trecho ``nome`` da requisição atual."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context() and 'inst_trechos' in g:
+            g.inst_trechos[nome] += time.perf_counter() - inicio
+
+
+def registrar_upload(n):
+    if has_request_context():
+        g.inst_upload_bytes = g.get('inst_upload_bytes', 0) + n
+
+
+def _antes_template(sender, template, context, **extra):
+    if 'inst_trechos' in g:
+        g.inst_templates.append(time.perf_counter())
+
+
+def _depois_template(sender, template, context, **extra):
+    if 'inst_trechos' in g and g.inst_templates:
+        g.inst_trechos['template'] += time.perf_counter() - g.inst_templates.pop()
+
+
+# === Registro de métricas (formato Prometheus) ===
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requisicoes = Counter()  # (endpoint, método, status)
+        self.duracao = defaultdict(lambda: [0] * len(BUCKETS))  # endpoint -> contagens por bucket
+        self.duracao_soma = Counter()
+        self.duracao_total = Counter()
+        self.sql_comandos = Counter()
+        self.sql_segundos = Counter()
+        self.trechos = Counter()  # (endpoint, trecho) -> segundos
+        self.upload_bytes = Counter()
+        self.perfis = 0
+
+    def observar(self, endpoint, metodo, status, duracao, sql_n, sql_s, trechos, upload):
+        with self._lock:
+            self.requisicoes[(endpoint, metodo, status)] += 1
+            contagens = self.duracao[endpoint]
+            for i, limite in enumerate(BUCKETS):
+                if duracao <= limite:
+                    contagens[i] += 1
+            self.duracao_soma[endpoint] += duracao
+            self.duracao_total[endpoint] += 1
+            self.sql_comandos[endpoint] += sql_n
+            self.sql_segundos[endpoint] += sql_s
+            for nome, segundos in trechos.items():
+                self.trechos[(endpoint, nome)] += segundos
+            if upload:
+                self.upload_bytes[endpoint] += upload
+
+    def exportar(self):
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} {tipo}')
+            for rotulos, valor in amostras:
+                texto = ','.join(f'{k}="{_escapar(v)}"' for k, v in rotulos.items())
+                linhas.append(f'{nome}{{{texto}}} {valor}' if texto else f'{nome} {valor}')
+
+        with self._lock:
+            metrica('catalogo_requests_total', 'counter', 'Requisições atendidas.',
+                    [({'endpoint': e, 'method': m, 'status': s}, n)
+                     for (e, m, s), n in sorted(self.requisicoes.items())])
+            amostras = []
+            for endpoint, contagens in sorted(self.duracao.items()):
+                for limite, n in zip(BUCKETS, contagens):
+                    amostras.append(({'endpoint': endpoint, 'le': limite}, n))
+                amostras.append(({'endpoint': endpoint, 'le': '+Inf'}, self.duracao_total[endpoint]))
+            linhas.extend(_histograma('catalogo_request_duration_seconds', 'Tempo total da requisição.',
+                                      amostras, self.duracao_soma, self.duracao_total))
+            metrica('catalogo_sql_statements_total', 'counter', 'Comandos SQL emitidos.',
+                    [({'endpoint': e}, n) for e, n in sorted(self.sql_comandos.items())])
+            metrica('catalogo_sql_seconds_total', 'counter', 'Tempo gasto em SQL.',
+                    [({'endpoint': e}, round(s, 6)) for e, s in sorted(self.sql_segundos.items())])
+            metrica('catalogo_section_seconds_total', 'counter',
+                    'Tempo por trecho (template, senha, arquivo).',
+                    [({'endpoint': e, 'section': t}, round(s, 6)) for (e, t), s in sorted(self.trechos.items())])
+            metrica('catalogo_upload_bytes_total', 'counter', 'Bytes de upload recebidos.',
+                    [({'endpoint': e}, n) for e, n in sorted(self.upload_bytes.items())])
+            metrica('catalogo_profiles_total', 'counter', 'Perfis de requisições lentas gravados.',
+                    [({}, self.perfis)])
+
+        pool = database.metricas.snapshot()
+        metrica('catalogo_db_pool_checkouts_total', 'counter', 'Conexões retiradas do pool.',
+                [({}, pool['checkouts'])])
+        metrica('catalogo_db_pool_timeouts_total', 'counter', 'Esperas por conexão que estouraram o timeout.',
+                [({}, pool['timeouts'])])
+        metrica('catalogo_db_pool_wait_seconds_total', 'counter', 'Tempo esperando conexão do pool.',
+                [({}, round(pool['espera_total_s'], 6))])
+        if 'em_uso' in pool:
+            metrica('catalogo_db_pool_in_use', 'gauge', 'Conexões em uso.', [({}, pool['em_uso'])])
+            metrica('catalogo_db_pool_capacity', 'gauge', 'Tamanho do pool + overflow.', [({}, pool['capacidade'])])
+        admissao = current_app.extensions.get('admissao')
+        if admissao is not None:
+            metrica('catalogo_requests_in_flight', 'gauge', 'Requisições em andamento neste processo.',
+                    [({}, admissao.em_andamento)])
+            metrica('catalogo_requests_shed_total', 'counter', 'Requisições recusadas por sobrecarga (503).',
+                    [({}, admissao.descartadas)])
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histograma(nome, ajuda, buckets, somas, totais):
+    linhas = [f'# HELP {nome} {ajuda}', f'# TYPE {nome} histogram']
+    for rotulos, n in buckets:
+        linhas.append(f'{nome}_bucket{{endpoint="{_escapar(rotulos["endpoint"])}",le="{rotulos["le"]}"}} {n}')
+    for endpoint in sorted(totais):
+        linhas.append(f'{nome}_sum{{endpoint="{_escapar(endpoint)}"}} {round(somas[endpoint], 6)}')
+        linhas.append(f'{nome}_count{{endpoint="{_escapar(endpoint)}"}} {totais[endpoint]}')
+    return linhas
+
+
+metricas = Metricas()
+
+
+# === Profiler de amostragem ===
+class Amostrador:
+    """Thread única que amostra a pilha de cada requisição em andamento."""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.ativos = {}  # thread id -> Counter de pilhas
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _garantir_thread(self):
+        # iniciada na primeira requisição, já dentro do worker (depois do fork)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._rodar, name='amostrador', daemon=True)
+            self._thread.start()
+
+    def iniciar(self):
+        with self._lock:
+            self._garantir_thread()
+            self.ativos[threading.get_ident()] = Counter()
+
+    def terminar(self):
+        with self._lock:
+            return self.ativos.pop(threading.get_ident(), None)
+
+    def _rodar(self):
+        while True:
+            time.sleep(self.intervalo)
+            frames = sys._current_frames()
+            with self._lock:
+                for tid, pilhas in self.ativos.items():
+                    frame = frames.get(tid)
+                    if frame is not None:
+                        pilhas[_pilha(frame)] += 1
+
+
+def _pilha(frame):
+    partes = []
+    while frame is not None:
+        codigo = frame.f_code
+        partes.append(f'{os.path.basename(codigo.co_filename)}:{codigo.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(partes))
+
+
+def _gravar_perfil(pasta, endpoint, duracao, pilhas):
+    os.makedirs(pasta, exist_ok=True)
+    nome = f'{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint or "sem-rota"}-{int(duracao * 1000)}ms.folded'
+    with open(os.path.join(pasta, nome), 'w') as f:
+        for pilha, n in pilhas.most_common():
+            f.write(f'{pilha} {n}\n')
+    with metricas._lock:
+        metricas.perfis += 1
+
+
+def _server_timing(duracao, trechos):
+    partes = [f'app;dur={duracao * 1000:.1f}',
+              f'sql;dur={query_time() * 1000:.1f};desc="{query_count()} comandos"']
+    partes += [f'{nome};dur={segundos * 1000:.1f}' for nome, segundos in trechos.items()]
+    return ', '.join(partes)
+
+
+def init_app(app):
+    # None = só em debug; o cabeçalho expõe tempos internos
+    app.config.setdefault('SERVER_TIMING', {'1': True, '0': False}.get(os.getenv('SERVER_TIMING')))
+    app.config.setdefault('METRICS_TOKEN', os.getenv('METRICS_TOKEN') or None)
+    app.config.setdefault('PROFILE_SLOW_MS', int(os.getenv('PROFILE_SLOW_MS', 0)))
+    app.config.setdefault('PROFILE_INTERVAL_MS', int(os.getenv('PROFILE_INTERVAL_MS', 5)))
+    app.config.setdefault('PROFILE_DIR', os.getenv('PROFILE_DIR') or os.path.join(app.instance_path, 'perfis'))
+
+    amostrador = Amostrador(app.config['PROFILE_INTERVAL_MS'] / 1000)
+    app.extensions['instrumentation'] = amostrador
+
+    before_render_template.connect(_antes_template, app)
+    template_rendered.connect(_depois_template, app)
+
+    @app.before_request
+    def iniciar_medicao():
+        g.inst_inicio = time.perf_counter()
+        g.inst_trechos = Counter()
+        g.inst_templates = []
+        if app.config['PROFILE_SLOW_MS']:
+            amostrador.iniciar()
+
+    @app.after_request
+    def registrar_medicao(response):
+        if 'inst_inicio' not in g:
+            return response
+        duracao = time.perf_counter() - g.inst_inicio
+        trechos = g.inst_trechos
+        metricas.observar(request.endpoint or 'sem-rota', request.method, response.status_code, duracao,
+                          query_count(), query_time(), trechos, g.get('inst_upload_bytes', 0))
+        ligado = app.config['SERVER_TIMING']
+        if ligado or (ligado is None and app.debug):
+            response.headers['Server-Timing'] = _server_timing(duracao, trechos)
+
+        limite = app.config['PROFILE_SLOW_MS']
+        pilhas = amostrador.terminar() if limite else None
+        if pilhas and duracao * 1000 >= limite:
+            try:
+                _gravar_perfil(app.config['PROFILE_DIR'], request.endpoint, duracao, pilhas)
+            except OSError:
+                app.logger.exception('Falha ao gravar perfil da requisição')
+        return response
+
+    @app.teardown_request
+    def liberar_amostrador(exc):
+        # requisições que terminaram em exceção não passam pelo after_request
+        if app.config['PROFILE_SLOW_MS']:
+            amostrador.terminar()
+
+    @app.route('/admin/metrics')
+    def admin_metrics():
+        token = app.config['METRICS_TOKEN']
+        enviado = request.headers.get('Authorization', '')
+        if not (token and hmac.compare_digest(enviado, f'Bearer {token}')):
+            if not (current_user.is_authenticated and current_user.is_admin):
+                abort(403)
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
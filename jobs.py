@@ -0,0 +1,368 @@
+# jobs.py
+"""Fila de tarefas em segundo plano, persistida na tabela ``job``.
+
+``enfileirar`` só adiciona uma linha à sessão: a tarefa é gravada no mesmo
+commit da escrita que a originou (se a transação for desfeita, a tarefa some
+junto) e o despachante é acordado logo depois do commit. Cada processo web
+roda um despachante com ``JOBS_WORKERS`` threads, iniciado na primeira
+requisição; com ``JOBS_WORKERS = 0`` as tarefas ficam para ``flask jobs worker``.
+
+A posse de uma tarefa é tomada com ``UPDATE ... WHERE status = 'pending'``,
+então vários processos podem consumir a mesma fila. Falhas voltam para a fila
+com espera exponencial; depois de ``max_attempts`` a tarefa vai para ``dead``
+(fila morta), de onde ``flask jobs retry`` a recupera. Enquanto roda, a tarefa
+renova ``heartbeat_at`` a cada ``JOBS_HEARTBEAT`` segundos; as que estão em
+``running`` sem batimento há mais de ``JOBS_TIMEOUT`` (processo reiniciado no
+meio) voltam para ``pending``, por mais longas que sejam as que seguem vivas.
+
+As tarefas são registradas com ``@tarefa('nome')`` nos próprios módulos
+(storage, thumbnails, search, autores, anexos). ``periodica('nome', 'CHAVE')``
+faz o despachante manter sempre uma tarefa ``nome`` agendada, a cada
+``app.config['CHAVE']`` segundos depois da última execução.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import event, update
+
+from models import db, Job
+
+TAREFAS = {}
+PERIODICAS = {}  # nome -> chave da configuração com o intervalo em segundos (0 desativa)
+
+
+def tarefa(nome):
+    """Registra ``func(**payload)`` como executora das tarefas ``nome``."""
+    def decorator(func):
+        TAREFAS[nome] = func
+        return func
+    return decorator
+
+
+def periodica(nome, chave_intervalo):
+    """Roda a tarefa ``nome`` (sem payload) a cada ``config[chave_intervalo]`` segundos."""
+    PERIODICAS[nome] = chave_intervalo
+
+
+def enfileirar(nome, max_attempts=None, atraso=0, **payload):
+    """Adiciona a tarefa à transação atual; ela roda depois do commit."""
+    if nome not in TAREFAS:
+        raise KeyError(f'Tarefa desconhecida: {nome}')
+    job = Job(kind=nome, payload=json.dumps(payload),
+              max_attempts=max_attempts or current_app.config['JOBS_MAX_ATTEMPTS'],
+              run_at=datetime.utcnow() + timedelta(seconds=atraso))
+    db.session.add(job)
+    db.session.info['jobs_novos'] = True
+    return job
+
+
+def _espera(tentativa, base):
+    """Espera exponencial com jitter de ±20%, no máximo uma hora."""
+    return min(base * 2 ** (tentativa - 1), 3600) * random.uniform(0.8, 1.2)
+
+
+def _tomar(job_id, dono):
+    tomada = db.session.execute(
+        update(Job).where(Job.id == job_id, Job.status == 'pending')
+        .values(status='running', locked_by=dono, started_at=datetime.utcnow(), heartbeat_at=datetime.utcnow(),
+                attempts=Job.attempts + 1)
+    ).rowcount
+    db.session.commit()
+    return bool(tomada)
+
+
+@contextmanager
+def _batimentos(job_id, dono):
+    """Renova ``heartbeat_at`` numa thread à parte enquanto o bloco roda."""
+    app = current_app._get_current_object()
+    parar = threading.Event()
+
+    def bater():
+        while not parar.wait(app.config['JOBS_HEARTBEAT']):
+            try:
+                with app.app_context():
+                    db.session.execute(update(Job).where(Job.id == job_id, Job.locked_by == dono)
+                                       .values(heartbeat_at=datetime.utcnow()))
+                    db.session.commit()
+            except Exception:
+                # um batimento perdido não derruba a tarefa; só o silêncio por JOBS_TIMEOUT a devolve à fila
+                app.logger.warning('Falha ao renovar o batimento da tarefa #%s', job_id, exc_info=True)
+
+    thread = threading.Thread(target=bater, name=f'jobs-batimento-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+def executar(job_id, dono):
+    """Roda uma tarefa já tomada por ``dono`` e registra o resultado. Chamar dentro de um app context."""
+    job = db.session.get(Job, job_id)
+    kind, payload, tentativa, maximo = job.kind, json.loads(job.payload), job.attempts, job.max_attempts
+    db.session.commit()
+    try:
+        func = TAREFAS.get(kind)
+        if func is None:
+            raise LookupError(f'Tarefa desconhecida: {kind}')
+        with _batimentos(job_id, dono):
+            func(**payload)
+            db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        morta = tentativa >= maximo
+        current_app.logger.log(logging.ERROR if morta else logging.WARNING,
+                               'Tarefa %s #%s falhou (tentativa %s/%s): %r', kind, job_id, tentativa, maximo, exc,
+                               exc_info=morta)
+        valores = {'status': 'dead' if morta else 'pending', 'last_error': f'{type(exc).__name__}: {exc}',
+                   'locked_by': None}
+        if morta:
+            valores['finished_at'] = datetime.utcnow()
+        else:
+            valores['run_at'] = datetime.utcnow() + timedelta(
+                seconds=_espera(tentativa, current_app.config['JOBS_BACKOFF']))
+        db.session.execute(update(Job).where(Job.id == job_id, Job.locked_by == dono).values(valores))
+        db.session.commit()
+        return False
+    db.session.execute(update(Job).where(Job.id == job_id, Job.locked_by == dono)
+                       .values(status='done', finished_at=datetime.utcnow(), last_error=None))
+    db.session.commit()
+    return True
+
+
+def pendentes(limite):
+    return db.session.execute(
+        db.select(Job.id).where(Job.status == 'pending', Job.run_at <= datetime.utcnow())
+        .order_by(Job.run_at, Job.id).limit(limite)
+    ).scalars().all()
+
+
+def recuperar_travadas(timeout):
+    """Devolve à fila tarefas em ``running`` sem batimento há ``timeout`` segundos (processo que morreu)."""
+    limite = datetime.utcnow() - timedelta(seconds=timeout)
+    n = db.session.execute(
+        # sem batimento: tomada antes da coluna existir
+        update(Job).where(Job.status == 'running', db.func.coalesce(Job.heartbeat_at, Job.started_at) < limite)
+        .values(status='pending', locked_by=None, run_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return n
+
+
+def agendar_periodicas():
+    """Enfileira cada tarefa periódica que não tem nenhuma execução pendente ou em andamento."""
+    for nome, chave in PERIODICAS.items():
+        intervalo = current_app.config.get(chave) or 0
+        if intervalo <= 0:
+            continue
+        ativa = db.session.execute(
+            db.select(Job.id).where(Job.kind == nome, Job.status.in_(('pending', 'running'))).limit(1)
+        ).first()
+        if ativa is not None:
+            continue
+        ultima = db.session.execute(
+            db.select(db.func.max(Job.finished_at)).where(Job.kind == nome)
+        ).scalar()
+        atraso = 0 if ultima is None else max(0, intervalo - (datetime.utcnow() - ultima).total_seconds())
+        enfileirar(nome, atraso=atraso)
+    db.session.commit()
+
+
+def executar_pendentes(limite=None, dono=None):
+    """Roda na thread atual todas as tarefas vencidas (CLI e testes); devolve quantas rodaram."""
+    dono = dono or _identificador()
+    feitas = 0
+    while limite is None or feitas < limite:
+        ids = pendentes(1)
+        if not ids:
+            break
+        if _tomar(ids[0], dono):
+            executar(ids[0], dono)
+            feitas += 1
+    return feitas
+
+
+def _identificador():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'[:64]
+
+
+# ============================
+#        DESPACHANTE
+# ============================
+
+class Despachante:
+    """Thread que busca tarefas vencidas e as entrega a um pool de threads."""
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self.dono = None
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._ocupadas = 0
+        self._thread = None
+        self._executor = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self.dono = f'{socket.gethostname()}:{os.getpid()}'[:64]
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='jobs')
+            self._thread = threading.Thread(target=self._rodar, name='jobs-despachante', daemon=True)
+            self._thread.start()
+
+    def acordar(self):
+        self._acordar.set()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        # o laço termina antes do pool fechar: senão um submit em andamento falha com RuntimeError
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def _rodar(self):
+        intervalo = self.app.config['JOBS_POLL_INTERVAL']
+        ultima_recuperacao = 0
+        while not self._parar.is_set():
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - ultima_recuperacao > 60:
+                        recuperar_travadas(self.app.config['JOBS_TIMEOUT'])
+                        # entre processos pode sair uma duplicata ocasional; as periódicas são idempotentes
+                        agendar_periodicas()
+                        ultima_recuperacao = time.monotonic()
+                    with self._lock:
+                        livres = self.workers - self._ocupadas
+                    for job_id in (pendentes(livres) if livres > 0 else []):
+                        if _tomar(job_id, self.dono):
+                            with self._lock:
+                                self._ocupadas += 1
+                            self._executor.submit(self._executar, job_id)
+            except Exception:
+                self.app.logger.exception('Falha no despachante de tarefas')
+            self._acordar.wait(intervalo)
+            self._acordar.clear()
+
+    def _executar(self, job_id):
+        try:
+            with self.app.app_context():
+                executar(job_id, self.dono)
+        except Exception:
+            self.app.logger.exception('Falha ao registrar o resultado da tarefa #%s', job_id)
+        finally:
+            with self._lock:
+                self._ocupadas -= 1
+            self.acordar()
+
+
+def _acordar_apos_commit(session):
+    if session.info.pop('jobs_novos', False):
+        despachante = current_app.extensions.get('jobs')
+        if despachante is not None:
+            despachante.acordar()
+
+
+def _descartar(session, previous_transaction):
+    if previous_transaction.parent is None:  # rollback de SAVEPOINT não descarta a transação externa
+        session.info.pop('jobs_novos', None)
+
+
+def init_app(app):
+    # threads de tarefas por processo web; 0 = só o "flask jobs worker" consome a fila
+    app.config.setdefault('JOBS_WORKERS', int(os.getenv('JOBS_WORKERS', 2)))
+    app.config.setdefault('JOBS_POLL_INTERVAL', float(os.getenv('JOBS_POLL_INTERVAL', 2)))
+    app.config.setdefault('JOBS_MAX_ATTEMPTS', 5)
+    app.config.setdefault('JOBS_BACKOFF', 5)  # segundos antes da 1ª nova tentativa; dobra a cada falha
+    app.config.setdefault('JOBS_HEARTBEAT', 30)  # segundos entre renovações de heartbeat_at
+    app.config.setdefault('JOBS_TIMEOUT', 5 * 60)  # running sem batimento há mais tempo que isso = processo morreu
+
+    despachante = Despachante(app, app.config['JOBS_WORKERS'])
+    app.extensions['jobs'] = despachante
+
+    if not event.contains(db.session, 'after_commit', _acordar_apos_commit):
+        event.listen(db.session, 'after_commit', _acordar_apos_commit)
+        event.listen(db.session, 'after_soft_rollback', _descartar)
+
+    @app.before_request
+    def iniciar_despachante():
+        # na primeira requisição, já dentro do worker (depois do fork do gunicorn)
+        if app.config['JOBS_WORKERS'] > 0 and despachante._thread is None:
+            despachante.iniciar()
+
+    @app.cli.group('jobs')
+    def jobs_cli():
+        """Fila de tarefas em segundo plano."""
+
+    @jobs_cli.command('worker')
+    @click.option('--workers', type=int, default=None, help='threads (padrão: JOBS_WORKERS ou 2)')
+    def jobs_worker(workers):
+        """Consome a fila até receber Ctrl+C."""
+        despachante.workers = workers or app.config['JOBS_WORKERS'] or 2
+        despachante.iniciar()
+        click.echo(f'Consumindo a fila com {despachante.workers} threads (Ctrl+C para sair)...')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            despachante.parar()
+
+    @jobs_cli.command('run')
+    @click.option('--limite', type=int, default=None, help='no máximo N tarefas')
+    def jobs_run(limite):
+        """Roda agora, neste processo, as tarefas vencidas."""
+        click.echo(f'{executar_pendentes(limite)} tarefas executadas.')
+
+    @jobs_cli.command('status')
+    def jobs_status():
+        """Quantidade de tarefas por tipo e situação, e as últimas falhas."""
+        linhas = db.session.execute(
+            db.select(Job.kind, Job.status, db.func.count()).group_by(Job.kind, Job.status)
+            .order_by(Job.kind, Job.status)
+        ).all()
+        for kind, status, n in linhas:
+            click.echo(f'{kind:<20} {status:<8} {n}')
+        mortas = db.session.execute(
+            db.select(Job.id, Job.kind, Job.last_error).where(Job.status == 'dead')
+            .order_by(Job.id.desc()).limit(10)
+        ).all()
+        for job_id, kind, erro in mortas:
+            click.echo(f'  #{job_id} {kind}: {erro}')
+
+    @jobs_cli.command('retry')
+    @click.argument('ids', nargs=-1, type=int)
+    def jobs_retry(ids):
+        """Devolve à fila as tarefas mortas (todas ou só os IDS)."""
+        filtro = [Job.status == 'dead'] + ([Job.id.in_(ids)] if ids else [])
+        n = db.session.execute(
+            update(Job).where(*filtro)
+            .values(status='pending', attempts=0, run_at=datetime.utcnow(), finished_at=None)
+        ).rowcount
+        db.session.commit()
+        click.echo(f'{n} tarefas devolvidas à fila.')
+
+    @jobs_cli.command('purge')
+    @click.option('--dias', type=int, default=7, help='apaga concluídas há mais de N dias')
+    def jobs_purge(dias):
+        """Apaga tarefas concluídas antigas."""
+        limite = datetime.utcnow() - timedelta(days=dias)
+        n = db.session.execute(
+            db.delete(Job).where(Job.status == 'done', Job.finished_at < limite)
+        ).rowcount
+        db.session.commit()
+        click.echo(f'{n} tarefas apagadas.')
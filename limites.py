@@ -0,0 +1,186 @@
+# limites.py
+"""Controle de admissão: limites por cliente e descarte de carga.
+
+Limites (429): cada rota cara declara ``@limitar('nome')`` e
+``RATE_LIMITS['nome']`` diz quantas requisições cada escopo pode fazer por
+período, como um balde de fichas (rajada de até ``quantidade``, reposto
+continuamente). Escopos: ``ip``, ``usuario`` (id do usuário logado; IP para
+anônimos) e ``email`` (o e-mail enviado no formulário, contra ataques a uma
+conta só a partir de vários IPs). O IP é o do cliente, não o do proxy da
+frente: ``create_app`` instala o ProxyFix com ``PROXY_HOPS`` saltos confiáveis.
+
+Os baldes ficam em memória, por processo. Com ``RATE_LIMIT_URL`` (ou
+``CACHE_URL``) apontando para um Redis, ficam compartilhados entre os
+workers; o backend em memória tem a mesma interface e o substitui.
+
+Descarte (503): antes de qualquer rota, se o pool do banco está saturado
+(``ADMISSION_POOL_SATURACAO``) ou se o processo já tem requisições demais em
+andamento (``ADMISSION_MAX_EM_ANDAMENTO``), a requisição é recusada na hora
+com ``Retry-After``, em vez de entrar na fila e estourar a latência de todas.
+"""
+import functools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, g, request
+from flask_login import current_user
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+import database
+
+# nome -> [(escopo, quantidade, segundos)]
+RATE_LIMITS_PADRAO = {
+    'login': [('ip', 10, 60), ('email', 5, 60)],
+    'register': [('ip', 5, 3600)],
+    'busca': [('ip', 30, 60)],
+    'sugestoes': [('ip', 300, 60)],  # typeahead: algumas por segundo enquanto a pessoa digita
+    'upload': [('usuario', 30, 3600)],
+    'upload_parte': [('usuario', 600, 60)],  # partes de 1-8 MB do upload retomável
+}
+ISENTOS = {'static', 'assets', 'admin_metrics', 'admin_db_pool'}  # o monitoramento precisa responder justamente na saturação
+
+
+class MemoryBuckets:
+    def __init__(self, max_chaves=100_000):
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()  # chave -> (fichas, instante)
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, capacidade, taxa, custo=1):
+        """Tira ``custo`` fichas do balde; devolve 0 ou quantos segundos faltam para haver fichas."""
+        agora = time.monotonic()
+        with self._lock:
+            fichas, instante = self._baldes.get(chave, (capacidade, agora))
+            fichas = min(capacidade, fichas + (agora - instante) * taxa)
+            espera = 0.0
+            if fichas >= custo:
+                fichas -= custo
+            else:
+                espera = (custo - fichas) / taxa
+            self._baldes[chave] = (fichas, agora)
+            self._baldes.move_to_end(chave)
+            while len(self._baldes) > self.max_chaves:
+                self._baldes.popitem(last=False)  # balde esquecido = balde cheio: erra a favor do cliente
+        return espera
+
+
+class RedisBuckets:
+    """Mesma interface do MemoryBuckets, compartilhada entre processos."""
+
+    SCRIPT = """
+    local balde = redis.call('HMGET', KEYS[1], 'fichas', 'instante')
+    local capacidade, taxa, agora, custo = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local fichas = tonumber(balde[1]) or capacidade
+    local instante = tonumber(balde[2]) or agora
+    fichas = math.min(capacidade, fichas + math.max(0, agora - instante) * taxa)
+    local espera = 0
+    if fichas >= custo then fichas = fichas - custo else espera = (custo - fichas) / taxa end
+    redis.call('HSET', KEYS[1], 'fichas', fichas, 'instante', agora)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacidade / taxa) + 1)
+    return tostring(espera)
+    """
+
+    def __init__(self, url, prefixo='catalogo:rl:'):
+        import redis  # opcional: só necessário com RATE_LIMIT_URL/CACHE_URL
+
+        r = redis.Redis.from_url(url)
+        self._script = r.register_script(self.SCRIPT)
+        self.prefixo = prefixo
+
+    def consumir(self, chave, capacidade, taxa, custo=1):
+        return float(self._script(keys=[self.prefixo + chave], args=[capacidade, taxa, time.time(), custo]))
+
+
+def _identidade(escopo):
+    if escopo == 'usuario' and current_user.is_authenticated:
+        return f'u{current_user.id}'
+    if escopo == 'email':
+        email = (request.form.get('email') or '').strip().lower()
+        return f'e{email}' if email else None
+    return f'ip{request.remote_addr}'
+
+
+def verificar(nome):
+    """Consome uma ficha de cada escopo da regra ``nome``; levanta 429 se algum estiver vazio."""
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return
+    baldes = current_app.extensions['limites']
+    espera = 0.0
+    for escopo, quantidade, segundos in current_app.config['RATE_LIMITS'].get(nome, ()):
+        identidade = _identidade(escopo)
+        if identidade is not None:
+            espera = max(espera, baldes.consumir(f'{nome}:{escopo}:{identidade}', quantidade, quantidade / segundos))
+    if espera:
+        raise TooManyRequests(retry_after=math.ceil(espera))
+
+
+def limitar(nome, quando=None):
+    """Aplica a regra ``nome`` de ``RATE_LIMITS`` à view (só quando ``quando()`` for verdadeiro, se dado)."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if quando is None or quando():
+                verificar(nome)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# === Descarte de carga ===
+class Admissao:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.em_andamento = 0
+        self.descartadas = 0
+
+    def entrar(self, maximo, saturacao_maxima):
+        """Devolve o motivo da recusa, ou None se a requisição pode seguir."""
+        with self._lock:
+            if maximo and self.em_andamento >= maximo:
+                self.descartadas += 1
+                return 'processo ocupado'
+            if saturacao_maxima and database.metricas.snapshot().get('saturacao', 0.0) >= saturacao_maxima:
+                self.descartadas += 1
+                return 'banco ocupado'
+            self.em_andamento += 1
+        return None
+
+    def sair(self):
+        with self._lock:
+            self.em_andamento -= 1
+
+
+def init_app(app):
+    app.config.setdefault('RATE_LIMIT_ENABLED', os.getenv('RATE_LIMIT_ENABLED', '1') != '0')
+    app.config.setdefault('RATE_LIMIT_URL', os.getenv('RATE_LIMIT_URL') or app.config.get('CACHE_URL'))
+    app.config.setdefault('RATE_LIMITS', RATE_LIMITS_PADRAO)
+    # 0 desativa; o padrão acompanha as threads de um worker gthread típico
+    app.config.setdefault('ADMISSION_MAX_EM_ANDAMENTO', int(os.getenv('ADMISSION_MAX_EM_ANDAMENTO', 32)))
+    app.config.setdefault('ADMISSION_POOL_SATURACAO', float(os.getenv('ADMISSION_POOL_SATURACAO', 1.0)))
+    app.config.setdefault('ADMISSION_RETRY_AFTER', 2)
+
+    if app.config['RATE_LIMIT_URL']:
+        app.extensions['limites'] = RedisBuckets(app.config['RATE_LIMIT_URL'])
+    else:
+        app.extensions['limites'] = MemoryBuckets()
+    admissao = Admissao()
+    app.extensions['admissao'] = admissao
+
+    @app.before_request
+    def admitir():
+        if request.endpoint in ISENTOS:
+            return
+        motivo = admissao.entrar(app.config['ADMISSION_MAX_EM_ANDAMENTO'], app.config['ADMISSION_POOL_SATURACAO'])
+        if motivo:
+            # sem log por requisição: na sobrecarga ele só pioraria; o total sai em /admin/metrics
+            raise ServiceUnavailable(f'Serviço sobrecarregado ({motivo}). Tente novamente em instantes.',
+                                     retry_after=app.config['ADMISSION_RETRY_AFTER'])
+        g.admitida = True
+
+    @app.teardown_request
+    def liberar(exc):
+        if g.pop('admitida', False):
+            admissao.sair()
@@ -0,0 +1,286 @@
+# manutencao.py
+"""Manutenção de ``UPLOAD_FOLDER``: arquivos órfãos, quarentena, uso por usuário e fragmentação.
+
+``coletar`` percorre o diretório com ``os.scandir`` (em fluxo, sem montar a
+lista inteira) e compara cada nome com o conjunto dos nomes referenciados por
+``Project.file_path`` e ``User.foto_perfil``, lido numa consulta só. O que
+não é referenciado há mais de ``STORAGE_IDADE_MINIMA`` segundos (uploads em
+andamento ainda não commitaram a referência) vai para
+``UPLOAD_FOLDER/.quarentena/<AAAAMMDD>/``, e não para o lixo: para desfazer,
+basta mover o arquivo de volta. A quarentena é esvaziada depois de
+``STORAGE_QUARENTENA_DIAS`` dias. Sessões de upload em partes e temporários
+abandonados também são removidos.
+
+A coleta roda como tarefa periódica da fila a cada ``STORAGE_GC_INTERVALO``
+segundos e também por ``flask storage gc``. ``flask storage uso`` mostra o
+espaço por usuário; ``flask storage fragmentar`` move os arquivos por conteúdo
+da raiz para os subdiretórios ``aa/bb/`` (storage.py).
+"""
+import os
+import shutil
+import time
+from collections import Counter
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import delete, select
+
+import jobs
+import search
+import storage
+from models import db, AttachmentText, Project, StoredFile, User, author_project
+
+QUARENTENA_DIR = '.quarentena'
+LOTE = 500
+
+
+def varrer(pasta):
+    """Gera ``(nome, caminho, os.stat_result)`` de cada arquivo do armazenamento, fora dos diretórios internos."""
+    pilha = [pasta] if os.path.isdir(pasta) else []  # nada enviado ainda
+    while pilha:
+        atual = pilha.pop()
+        with os.scandir(atual) as entradas:
+            for entrada in entradas:
+                if entrada.name.startswith('.'):
+                    continue  # .tmp, .parcial, .quarentena e arquivos escondidos
+                if entrada.is_dir(follow_symlinks=False):
+                    pilha.append(entrada.path)
+                elif entrada.is_file(follow_symlinks=False):
+                    yield entrada.name, entrada.path, entrada.stat(follow_symlinks=False)
+
+
+def referenciados():
+    """Nomes usados por projetos e fotos de perfil (uma consulta)."""
+    consulta = (select(Project.file_path).where(Project.file_path.isnot(None))
+                .union(select(User.foto_perfil).where(User.foto_perfil.isnot(None))))
+    return set(db.session.execute(consulta).scalars())
+
+
+# ============================
+#            COLETA
+# ============================
+
+def _para_quarentena(path, pasta, dia):
+    alvo = os.path.join(pasta, QUARENTENA_DIR, dia, os.path.relpath(path, pasta))
+    os.makedirs(os.path.dirname(alvo), exist_ok=True)
+    os.replace(path, alvo)
+
+
+def _limpar_antigos(diretorio, idade_max, agora):
+    """Apaga entradas de ``diretorio`` (arquivos ou subdiretórios) modificadas há mais de ``idade_max`` segundos."""
+    removidos = 0
+    if not os.path.isdir(diretorio):
+        return removidos
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            if agora - entrada.stat(follow_symlinks=False).st_mtime <= idade_max:
+                continue
+            if entrada.is_dir(follow_symlinks=False):
+                shutil.rmtree(entrada.path, ignore_errors=True)
+            else:
+                os.remove(entrada.path)
+            removidos += 1
+    return removidos
+
+
+def _em_uso(nomes):
+    """Dos ``nomes``, os que algum projeto ou foto de perfil usa agora."""
+    consulta = (select(Project.file_path).where(Project.file_path.in_(nomes))
+                .union(select(User.foto_perfil).where(User.foto_perfil.in_(nomes))))
+    return set(db.session.execute(consulta).scalars())
+
+
+def _recolher(candidatos, pasta, dia, idade_min):
+    """Confirma um lote de órfãos no banco e os move para a quarentena; devolve quantos moveu.
+
+    A lista de referências lida no início da varredura pode estar velha. Na
+    mesma transação: confere as referências de novo, apaga só as linhas de
+    stored_file com refcount 0 (a trava dessas linhas segura um reenvio do
+    mesmo conteúdo até o commit) e poupa tudo o que ainda tem contagem.
+    """
+    nomes = {nome for nome, _ in candidatos}
+    vivos = _em_uso(nomes)
+    digests = [d for d in (storage.digest_de(n) for n in nomes - vivos) if d]
+    if digests:
+        db.session.execute(delete(StoredFile).where(StoredFile.sha256.in_(digests), StoredFile.refcount <= 0))
+        vivos |= set(db.session.execute(
+            select(StoredFile.filename).where(StoredFile.sha256.in_(digests))).scalars())
+
+    movidos = []
+    for nome, path in candidatos:
+        if nome in vivos:
+            continue
+        try:
+            # um reenvio por deduplicação (storage._registrar) renova o mtime
+            if time.time() - os.stat(path).st_mtime < idade_min:
+                continue
+            _para_quarentena(path, pasta, dia)
+        except FileNotFoundError:
+            continue
+        movidos.append(nome)
+
+    sumidos = [d for d in map(storage.digest_de, movidos) if d]
+    if sumidos:
+        for anexo_id in db.session.execute(
+                select(AttachmentText.id).where(AttachmentText.sha256.in_(sumidos))).scalars():
+            search.remover_anexo(anexo_id)
+        db.session.execute(delete(AttachmentText).where(AttachmentText.sha256.in_(sumidos)))
+    db.session.commit()
+    return len(movidos)
+
+
+def coletar(simular=False, eco=print):
+    """Move os órfãos para a quarentena e limpa o que expirou; devolve um resumo (dict)."""
+    cfg = current_app.config
+    pasta = cfg['UPLOAD_FOLDER']
+    idade_min = cfg['STORAGE_IDADE_MINIMA']
+    agora = time.time()
+    dia = datetime.utcnow().strftime('%Y%m%d')
+    refs = referenciados()  # filtro barato; cada lote é confirmado de novo em _recolher
+
+    vistos = set()
+    resumo = Counter()
+    candidatos = []
+    for nome, path, st in varrer(pasta):
+        vistos.add(nome)
+        resumo['arquivos'] += 1
+        resumo['bytes'] += st.st_size
+        if nome in refs or agora - st.st_mtime < idade_min:
+            continue
+        resumo['orfaos'] += 1
+        resumo['bytes_orfaos'] += st.st_size
+        if simular:
+            eco(f'órfão: {os.path.relpath(path, pasta)} ({st.st_size} bytes)')
+            continue
+        candidatos.append((nome, path))
+        if len(candidatos) >= LOTE:
+            resumo['quarentena'] += _recolher(candidatos, pasta, dia, idade_min)
+            candidatos = []
+    if candidatos:
+        resumo['quarentena'] += _recolher(candidatos, pasta, dia, idade_min)
+
+    ausentes = refs - vistos
+    for nome in sorted(ausentes)[:20]:
+        eco(f'referenciado mas ausente: {nome}')
+    resumo['ausentes'] = len(ausentes)
+
+    if not simular:
+        resumo['quarentena_expirada'] = _limpar_antigos(
+            os.path.join(pasta, QUARENTENA_DIR), cfg['STORAGE_QUARENTENA_DIAS'] * 86400, agora)
+        resumo['temporarios'] = (
+            _limpar_antigos(os.path.join(pasta, storage.TMP_DIR), cfg['STORAGE_PARCIAL_DIAS'] * 86400, agora)
+            + _limpar_antigos(os.path.join(pasta, storage.PARCIAL_DIR), cfg['STORAGE_PARCIAL_DIAS'] * 86400, agora))
+    return dict(resumo)
+
+
+# ============================
+#         USO E LAYOUT
+# ============================
+
+def uso():
+    """Bytes e arquivos por usuário (autoria + foto), o total em disco e o da quarentena."""
+    pasta = current_app.config['UPLOAD_FOLDER']
+    tamanhos = {nome: st.st_size for nome, _, st in varrer(pasta)}
+    por_usuario = Counter()
+    arquivos = Counter()
+    # arquivo de projeto com vários autores conta para cada um
+    donos = db.session.execute(
+        select(author_project.c.user_id, Project.file_path)
+        .join(Project, Project.id == author_project.c.project_id)
+        .where(Project.file_path.isnot(None))
+        .union_all(select(User.id, User.foto_perfil).where(User.foto_perfil.isnot(None)))
+    )
+    for user_id, filename in donos:
+        if filename in tamanhos:
+            por_usuario[user_id] += tamanhos[filename]
+            arquivos[user_id] += 1
+    quarentena = 0
+    if os.path.isdir(os.path.join(pasta, QUARENTENA_DIR)):
+        quarentena = sum(st.st_size for _, _, st in varrer(os.path.join(pasta, QUARENTENA_DIR)))
+    return {'total': sum(tamanhos.values()), 'arquivos': len(tamanhos), 'quarentena': quarentena,
+            'por_usuario': por_usuario, 'arquivos_por_usuario': arquivos}
+
+
+def fragmentar(eco=print):
+    """Move os arquivos por conteúdo da raiz de UPLOAD_FOLDER para ``aa/bb/``; devolve quantos moveu."""
+    pasta = current_app.config['UPLOAD_FOLDER']
+    movidos = 0
+    if not os.path.isdir(pasta):
+        return movidos
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if not entrada.is_file(follow_symlinks=False) or storage.digest_de(entrada.name) is None:
+                continue
+            alvo = storage.caminho(entrada.name)
+            os.makedirs(os.path.dirname(alvo), exist_ok=True)
+            if os.path.exists(alvo):
+                os.remove(entrada.path)  # mesmo nome = mesmo conteúdo
+            else:
+                os.replace(entrada.path, alvo)
+            movidos += 1
+    if movidos:
+        eco(f'{movidos} arquivos movidos para subdiretórios.')
+    return movidos
+
+
+def _tamanho(n):
+    for unidade in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024:
+            return f'{n:.0f} {unidade}' if unidade == 'B' else f'{n:.1f} {unidade}'
+        n /= 1024
+    return f'{n:.1f} TB'
+
+
+@jobs.tarefa('manutencao_uploads')
+def manutencao():
+    fragmentar(eco=current_app.logger.info)
+    resumo = coletar(eco=current_app.logger.warning)
+    current_app.logger.info('Manutenção de uploads: %s', resumo)
+
+
+jobs.periodica('manutencao_uploads', 'STORAGE_GC_INTERVALO')
+
+
+def init_app(app):
+    app.config.setdefault('STORAGE_GC_INTERVALO', int(os.getenv('STORAGE_GC_INTERVALO', 24 * 3600)))
+    app.config.setdefault('STORAGE_IDADE_MINIMA', 3600)
+    app.config.setdefault('STORAGE_QUARENTENA_DIAS', 7)
+    app.config.setdefault('STORAGE_PARCIAL_DIAS', 2)  # sessões de upload em partes abandonadas
+
+    @app.cli.group('storage')
+    def storage_cli():
+        """Manutenção dos arquivos enviados."""
+
+    @storage_cli.command('gc')
+    @click.option('--simular', is_flag=True, help='só lista os órfãos, sem mover nada')
+    def storage_gc(simular):
+        """Move arquivos sem referência para a quarentena e limpa temporários antigos."""
+        resumo = coletar(simular, eco=click.echo)
+        click.echo(f'{resumo.get("arquivos", 0)} arquivos ({_tamanho(resumo.get("bytes", 0))}), '
+                   f'{resumo.get("orfaos", 0)} órfãos ({_tamanho(resumo.get("bytes_orfaos", 0))}), '
+                   f'{resumo.get("ausentes", 0)} referências sem arquivo.')
+        if not simular:
+            click.echo(f'Movidos para a quarentena: {resumo.get("quarentena", 0)}; '
+                       f'quarentena expirada: {resumo.get("quarentena_expirada", 0)}; '
+                       f'temporários: {resumo.get("temporarios", 0)}.')
+
+    @storage_cli.command('uso')
+    @click.option('--top', type=int, default=20, help='quantos usuários listar')
+    def storage_uso(top):
+        """Espaço em disco por usuário e total."""
+        dados = uso()
+        click.echo(f'Total: {_tamanho(dados["total"])} em {dados["arquivos"]} arquivos '
+                   f'(quarentena: {_tamanho(dados["quarentena"])})')
+        maiores = dados['por_usuario'].most_common(top)
+        nomes = dict(db.session.execute(
+            select(User.id, User.email).where(User.id.in_([uid for uid, _ in maiores]))).all())
+        for uid, n in maiores:
+            click.echo(f'{_tamanho(n):>10}  {dados["arquivos_por_usuario"][uid]:>5} arq.  '
+                       f'#{uid} {nomes.get(uid, "?")}')
+
+    @storage_cli.command('fragmentar')
+    def storage_fragmentar():
+        """Move os uploads da raiz para os subdiretórios por hash (uma vez, depois de atualizar)."""
+        if not fragmentar(eco=click.echo):
+            click.echo('Nada a mover.')
@@ -0,0 +1,26 @@
+"""índice (project_id, user_id) em author_project
+
+Revision ID: 0f4a2c7e9b31
+Revises: b5d17e3a9c42
+Create Date: 2026-10-18 22:18:52.907346
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0f4a2c7e9b31'
+down_revision = 'b5d17e3a9c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (user_id, project_id) já é a PK; (user_id, created_at, project_id) em favorite veio em 1d7e4b92c3a6
+    with op.batch_alter_table('author_project', schema=None) as batch_op:
+        batch_op.create_index('ix_author_project_project_user', ['project_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('author_project', schema=None) as batch_op:
+        batch_op.drop_index('ix_author_project_project_user')
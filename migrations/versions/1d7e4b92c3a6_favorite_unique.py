@@ -0,0 +1,44 @@
+"""favorito único por usuário/projeto e índice de cobertura para /favoritos
+
+Revision ID: 1d7e4b92c3a6
+Revises: f2c6d9a4b815
+Create Date: 2026-10-18 19:26:40.518823
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d7e4b92c3a6'
+down_revision = 'f2c6d9a4b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    favorite = sa.table('favorite', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                        sa.column('project_id', sa.Integer))
+    project = sa.table('project', sa.column('id', sa.Integer), sa.column('favorite_count', sa.Integer))
+
+    # remove duplicados antes do índice único (fica o mais antigo de cada par)
+    manter = (sa.select(sa.func.min(favorite.c.id))
+              .group_by(favorite.c.user_id, favorite.c.project_id))
+    # subconsulta derivada: o MySQL não deixa ler a própria tabela num DELETE
+    manter = sa.select(manter.subquery().c[0])
+    op.execute(favorite.delete().where(favorite.c.id.notin_(manter)))
+
+    # os duplicados tinham sido contados em favorite_count
+    contagem = (sa.select(sa.func.count()).select_from(favorite)
+                .where(favorite.c.project_id == project.c.id).scalar_subquery())
+    op.execute(project.update().values(favorite_count=contagem))
+
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.create_index('uq_favorite_user_project', ['user_id', 'project_id'], unique=True)
+        batch_op.create_index('ix_favorite_user_created', ['user_id', 'created_at', 'project_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_index('ix_favorite_user_created')
+        batch_op.drop_index('uq_favorite_user_project')
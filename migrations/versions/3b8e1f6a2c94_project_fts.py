@@ -0,0 +1,35 @@
+"""busca textual: tabela FTS5 project_fts
+
+Revision ID: 3b8e1f6a2c94
+Revises: d4eef99f9920
+Create Date: 2026-10-18 09:12:40.118230
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f6a2c94'
+down_revision = 'd4eef99f9920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 só existe no SQLite; nos outros bancos a busca usa o índice em memória (search.py)
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE project_fts USING fts5("
+        "title, description, authors_text, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "INSERT INTO project_fts (rowid, title, description, authors_text) "
+        "SELECT id, title, description, coalesce(authors_text, '') FROM project"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TABLE project_fts')
@@ -0,0 +1,26 @@
+"""batimento das tarefas em andamento (job.heartbeat_at)
+
+Revision ID: 4c9a6e2b7d15
+Revises: 7b4d2e9a1f60
+Create Date: 2026-10-19 15:41:06.372518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c9a6e2b7d15'
+down_revision = '7b4d2e9a1f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('job', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,32 @@
+"""password_hash com espaço para scrypt e custos maiores
+
+Revision ID: 6a3f0c8d2e17
+Revises: 1d7e4b92c3a6
+Create Date: 2026-10-18 20:12:08.431902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3f0c8d2e17'
+down_revision = '1d7e4b92c3a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=128),
+               type_=sa.String(length=255),
+               existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('password_hash',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=128),
+               existing_nullable=False)
@@ -0,0 +1,33 @@
+"""created_at obrigatório em project e favorite (chave da paginação por cursor)
+
+Revision ID: 7b4d2e9a1f60
+Revises: c8e1f4a7b203
+Create Date: 2026-10-19 14:03:27.551904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4d2e9a1f60'
+down_revision = 'c8e1f4a7b203'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # linhas antigas sem data: NULL some do predicado do cursor e quebra o token
+    op.execute('UPDATE project SET created_at = coalesce(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL')
+    op.execute('UPDATE favorite SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL')
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,47 @@
+"""texto extraído dos anexos (attachment_text + FTS5 attachment_fts)
+
+Revision ID: 9e6b3d1f5a28
+Revises: 0f4a2c7e9b31
+Create Date: 2026-10-18 23:02:36.571904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e6b3d1f5a28'
+down_revision = '0f4a2c7e9b31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attachment_text',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('truncated', sa.Boolean(), nullable=False),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('extracted_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_project_file_path'), ['file_path'], unique=False)
+
+    # FTS5 só existe no SQLite; nos outros bancos o texto entra no índice em memória (search.py)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE attachment_fts USING fts5("
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('DROP TABLE attachment_fts')
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_file_path'))
+    op.drop_table('attachment_text')
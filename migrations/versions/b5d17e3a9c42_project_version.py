@@ -0,0 +1,29 @@
+"""updated_at e versão do projeto (ETag da página de detalhe)
+
+Revision ID: b5d17e3a9c42
+Revises: 6a3f0c8d2e17
+Create Date: 2026-10-18 21:40:17.284519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d17e3a9c42'
+down_revision = '6a3f0c8d2e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.execute('UPDATE project SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('version')
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,46 @@
+"""nome normalizado do usuário para resolução de autores
+
+Revision ID: c41b8e2f6d07
+Revises: a7f29d0c4e51
+Create Date: 2026-10-18 14:05:31.274480
+
+"""
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41b8e2f6d07'
+down_revision = 'a7f29d0c4e51'
+branch_labels = None
+depends_on = None
+
+
+def _normalizar(nome):
+    # mesma regra de autores.normalizar_nome, copiada para a migração não depender do app
+    decomposto = unicodedata.normalize('NFKD', (nome or '').lower())
+    return ' '.join(''.join(c for c in decomposto if not unicodedata.combining(c)).split())
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_normalized', sa.String(length=120), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_name_normalized'), ['name_normalized'], unique=False)
+
+    conn = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('name', sa.String),
+                    sa.column('name_normalized', sa.String))
+    linhas = conn.execute(sa.select(user.c.id, user.c.name)).fetchall()
+    if linhas:
+        conn.execute(
+            user.update().where(user.c.id == sa.bindparam('uid')).values(name_normalized=sa.bindparam('norm')),
+            [{'uid': uid, 'norm': _normalizar(nome)} for uid, nome in linhas]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_name_normalized'))
+        batch_op.drop_column('name_normalized')
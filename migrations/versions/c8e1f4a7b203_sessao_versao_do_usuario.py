@@ -0,0 +1,26 @@
+"""versão da sessão do usuário (revogação imediata sem cache compartilhado)
+
+Revision ID: c8e1f4a7b203
+Revises: 9e6b3d1f5a28
+Create Date: 2026-10-19 10:12:44.903117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e1f4a7b203'
+down_revision = '9e6b3d1f5a28'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sessao_versao', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('sessao_versao')
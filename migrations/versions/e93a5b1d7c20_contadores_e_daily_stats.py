@@ -0,0 +1,79 @@
+"""contadores desnormalizados e consolidado diário
+
+Revision ID: e93a5b1d7c20
+Revises: c41b8e2f6d07
+Create Date: 2026-10-18 15:32:17.806144
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93a5b1d7c20'
+down_revision = 'c41b8e2f6d07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('uploads', sa.Integer(), nullable=False),
+    sa.Column('registrations', sa.Integer(), nullable=False),
+    sa.Column('favorites', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorite_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('author_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_project_favorite_count'), ['favorite_count'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('project_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_user_project_count'), ['project_count'], unique=False)
+
+    # preenche os contadores com o estado atual
+    project = sa.table('project', sa.column('id', sa.Integer), sa.column('created_at', sa.DateTime),
+                       sa.column('favorite_count', sa.Integer), sa.column('author_count', sa.Integer))
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('project_count', sa.Integer))
+    favorite = sa.table('favorite', sa.column('project_id', sa.Integer), sa.column('created_at', sa.DateTime))
+    author_project = sa.table('author_project', sa.column('user_id', sa.Integer),
+                              sa.column('project_id', sa.Integer))
+    contar = lambda tabela, cond: sa.select(sa.func.count()).select_from(tabela).where(cond).scalar_subquery()
+    op.execute(project.update().values(
+        favorite_count=contar(favorite, favorite.c.project_id == project.c.id),
+        author_count=contar(author_project, author_project.c.project_id == project.c.id),
+    ))
+    op.execute(user.update().values(
+        project_count=contar(author_project, author_project.c.user_id == user.c.id),
+    ))
+
+    # consolidado histórico possível: projetos e favoritos têm created_at, usuários não
+    conn = op.get_bind()
+    dias = {}
+    for tabela, campo in ((project, 'uploads'), (favorite, 'favorites')):
+        dia = sa.func.date(tabela.c.created_at)
+        linhas = conn.execute(sa.select(dia, sa.func.count()).where(tabela.c.created_at.isnot(None)).group_by(dia))
+        for valor, total in linhas:
+            valor = valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+            dias.setdefault(valor, {'uploads': 0, 'registrations': 0, 'favorites': 0})[campo] = total
+    if dias:
+        daily = sa.table('daily_stats', sa.column('day', sa.Date), sa.column('uploads', sa.Integer),
+                         sa.column('registrations', sa.Integer), sa.column('favorites', sa.Integer))
+        op.bulk_insert(daily, [{'day': dia, **valores} for dia, valores in dias.items()])
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_project_count'))
+        batch_op.drop_column('project_count')
+
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_project_favorite_count'))
+        batch_op.drop_column('author_count')
+        batch_op.drop_column('favorite_count')
+
+    op.drop_table('daily_stats')
@@ -8,34 +8,113 @@ db = SQLAlchemy()
 author_project = db.Table(
     'author_project',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('project_id', db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    db.Column('project_id', db.Integer, db.ForeignKey('project.id'), primary_key=True),
+    # a PK (user_id, project_id) serve "projetos do usuário"; este serve "autores do projeto"
+    db.Index('ix_author_project_project_user', 'project_id', 'user_id'),
 )
 
 class User(UserMixin, db.Model):
     __tablename__ = 'user'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
+    # nome sem acentos/maiúsculas, mantido por autores.py; chave da resolução de autores
+    name_normalized = db.Column(db.String(120), index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)  # scrypt do Werkzeug passa de 160
     is_admin = db.Column(db.Boolean, default=False)
-    projects = db.relationship('Project', secondary=author_project, back_populates='authors')
+    project_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)  # stats.py
+    foto_perfil = db.Column(db.String(255))
+    foto_hash = db.Column(db.String(64))  # sha256 da foto; nomeia as miniaturas (thumbnails.py)
+    # sobe quando muda algo do retrato da sessão (principal.py); lido a cada requisição sem cache compartilhado
+    sessao_versao = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # carregamento explícito: listas grandes ficam sob demanda; use selectinload na consulta quando precisar
+    projects = db.relationship('Project', secondary=author_project, back_populates='authors', lazy='select')
 
 class Project(db.Model):
     __tablename__ = 'project'
+    __table_args__ = (
+        # índice da paginação por cursor (created_at DESC, id DESC)
+        db.Index('ix_project_created_at_id', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    file_path = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    file_path = db.Column(db.String(255), index=True)  # busca no texto dos anexos chega ao projeto por aqui
     authors_text = db.Column(db.String(255))  # texto livre com nome dos autores
-    authors = db.relationship('User', secondary=author_project, back_populates='projects')
-    favorites = db.relationship('Favorite', back_populates='project', cascade='all, delete-orphan')
+    preview_hash = db.Column(db.String(64))  # sha256 do arquivo; nomeia as miniaturas (thumbnails.py)
+    # contadores desnormalizados mantidos por stats.py
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
+    author_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # qualquer UPDATE na linha (ORM ou os contadores acima) avança a versão: é ela que forma o ETag do detalhe
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.literal_column('version + 1'))
+    # autores são poucos e quase sempre usados junto (detalhe, edição, permissão): um SELECT ... IN por lote
+    authors = db.relationship('User', secondary=author_project, back_populates='projects', lazy='selectin')
+    favorites = db.relationship('Favorite', back_populates='project', cascade='all, delete-orphan', lazy='select')
 
 class Favorite(db.Model):
     __tablename__ = 'favorite'
+    __table_args__ = (
+        # um favorito por usuário/projeto: o toggle conta com isso (favoritar.py)
+        db.Index('uq_favorite_user_project', 'user_id', 'project_id', unique=True),
+        # /favoritos: filtra por usuário e ordena por data sem ler a tabela
+        db.Index('ix_favorite_user_created', 'user_id', 'created_at', 'project_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user = db.relationship('User', backref=db.backref('favorites', cascade='all, delete-orphan', lazy='select'))
+    # um favorito sem o projeto não serve para nada: vem no mesmo SELECT
+    project = db.relationship('Project', back_populates='favorites', lazy='joined')
+
+class DailyStats(db.Model):
+    """Consolidado diário (UTC) para o painel: projetos publicados, cadastros e favoritos."""
+    __tablename__ = 'daily_stats'
+    day = db.Column(db.Date, primary_key=True)
+    uploads = db.Column(db.Integer, nullable=False, default=0)
+    registrations = db.Column(db.Integer, nullable=False, default=0)
+    favorites = db.Column(db.Integer, nullable=False, default=0)
+
+class StoredFile(db.Model):
+    """Arquivo do armazenamento por conteúdo (storage.py) e quantas referências ele tem."""
+    __tablename__ = 'stored_file'
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AttachmentText(db.Model):
+    """Texto extraído de um arquivo do armazenamento (anexos.py), pelo sha256: cada conteúdo é lido uma vez."""
+    __tablename__ = 'attachment_text'
+    id = db.Column(db.Integer, primary_key=True)  # rowid da tabela FTS attachment_fts
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # pdf, zip
+    text = db.Column(db.Text, nullable=False, default='')
+    truncated = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.String(255))  # preenchido quando a extração falhou ou foi recusada
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    """Tarefa em segundo plano (jobs.py). Gravada na mesma transação de quem a enfileirou."""
+    __tablename__ = 'job'
+    __table_args__ = (
+        # o despachante busca "pendentes já vencidas" a cada ciclo
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON com os argumentos da tarefa
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, running, done, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    last_error = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user = db.relationship('User', backref=db.backref('favorites', cascade='all, delete-orphan'))
-    project = db.relationship('Project', back_populates='favorites')
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # renovado enquanto a tarefa roda (jobs.py)
+    finished_at = db.Column(db.DateTime)
@@ -0,0 +1,155 @@
+# pagination.py
+"""Paginação por cursor (keyset) na ordenação (created_at DESC, id DESC).
+
+Em vez de ``OFFSET`` + ``COUNT(*)``, cada página parte do último item da
+anterior, então a página 5.000 custa o mesmo que a primeira. Os cursores são
+tokens opacos (base64 de um JSON) com o par (created_at, id) e a direção.
+"""
+import base64
+import binascii
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(created_at, item_id, direction):
+    payload = json.dumps({'t': created_at.isoformat(), 'i': item_id, 'd': direction},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Devolve (created_at, id, direção) ou None se o token for inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        direction = data['d']
+        if direction not in ('n', 'p'):
+            return None
+        return datetime.fromisoformat(data['t']), int(data['i']), direction
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+
+
+def _chave_padrao(item):
+    return item.created_at, item.id
+
+
+class KeysetPage:
+    def __init__(self, items, has_prev, has_next, chave=_chave_padrao):
+        self.items = items
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.chave = chave
+
+    @property
+    def prev_cursor(self):
+        if not (self.has_prev and self.items):
+            return None
+        return encode_cursor(*self.chave(self.items[0]), 'p')
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next and self.items):
+            return None
+        return encode_cursor(*self.chave(self.items[-1]), 'n')
+
+    @property
+    def prev_args(self):
+        return {'cursor': self.prev_cursor}
+
+    @property
+    def next_args(self):
+        return {'cursor': self.next_cursor}
+
+
+def keyset_paginate(query, model, cursor=None, per_page=10, colunas=None, chave=_chave_padrao):
+    """Pagina ``query`` por (model.created_at, model.id), mais recentes primeiro.
+
+    Busca ``per_page + 1`` linhas para saber se existe página seguinte sem
+    precisar contar o total. Para ordenar por outro par, ``colunas`` dá as
+    colunas (data, id) e ``chave(item)`` os valores correspondentes de cada linha.
+    """
+    created_at, pk = colunas or (model.created_at, model.id)
+    decoded = decode_cursor(cursor)
+
+    if decoded is None:
+        rows = query.order_by(created_at.desc(), pk.desc()).limit(per_page + 1).all()
+        return KeysetPage(rows[:per_page], has_prev=False, has_next=len(rows) > per_page, chave=chave)
+
+    ts, item_id, direction = decoded
+    if direction == 'n':
+        rows = (query.filter(or_(created_at < ts, and_(created_at == ts, pk < item_id)))
+                .order_by(created_at.desc(), pk.desc())
+                .limit(per_page + 1).all())
+        return KeysetPage(rows[:per_page], has_prev=True, has_next=len(rows) > per_page, chave=chave)
+
+    # voltando: percorre no sentido inverso e desvira o resultado
+    rows = (query.filter(or_(created_at > ts, and_(created_at == ts, pk > item_id)))
+            .order_by(created_at.asc(), pk.asc())
+            .limit(per_page + 1).all())
+    has_prev = len(rows) > per_page
+    return KeysetPage(list(reversed(rows[:per_page])), has_prev=has_prev, has_next=True, chave=chave)
+
+
+# === Contagem total em cache ===
+_counts = {}
+_counts_lock = threading.Lock()
+
+
+def cached_count(key, count_fn, ttl):
+    """Executa ``count_fn()`` no máximo uma vez a cada ``ttl`` segundos por processo.
+
+    Com ``ttl`` vazio/zero a contagem é desativada e retorna None.
+    """
+    if not ttl:
+        return None
+    now = time.monotonic()
+    with _counts_lock:
+        hit = _counts.get(key)
+        if hit and hit[1] > now:
+            return hit[0]
+    value = count_fn()
+    with _counts_lock:
+        _counts[key] = (value, now + ttl)
+    return value
+
+
+class OffsetPage:
+    """Página por número sem ``COUNT(*)``: busca ``per_page + 1`` linhas para saber se há próxima."""
+
+    def __init__(self, items, page, has_next):
+        self.items = items
+        self.page = page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def prev_args(self):
+        return {'page': self.prev_num}
+
+    @property
+    def next_args(self):
+        return {'page': self.next_num}
+
+
+def offset_paginate(query, page=1, per_page=20):
+    page = max(page, 1)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return OffsetPage(rows[:per_page], page, has_next=len(rows) > per_page)
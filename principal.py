@@ -0,0 +1,132 @@
+# principal.py
+"""Usuário logado sem ida ao banco a cada requisição.
+
+O ``user_loader`` devolve um ``Principal``: um retrato leve do usuário (id,
+nome, e-mail, foto, is_admin) guardado num LRU com TTL por processo. Cada
+entrada vale enquanto a tag ``usuario:<id>`` do cache (cache.py) não mudar de
+versão — qualquer alteração de um ``User`` pelo ORM, ou ``cache.marcar`` em
+escritas fora dele, invalida a tag no commit. Com ``CACHE_URL`` as versões são
+compartilhadas entre processos e a mudança vale na hora em todos. Com o cache
+em memória as versões são do processo; então cada carga lê a linha do
+usuário com ``User.sessao_versao`` (uma consulta pela chave primária, nunca
+duas), que sobe a cada mudança de senha, admin ou outro campo do retrato feita
+pelo ORM: revogar acesso vale na hora também nos outros workers.
+
+A sessão (assinada pelo Flask) guarda uma impressão da senha. Quando ela não
+confere com a do banco, a senha foi trocada em outra sessão: esta é
+encerrada, inclusive o cookie de "lembrar-me".
+
+O ``Principal`` não é um objeto do ORM: para alterar o usuário ou usá-lo em
+relacionamentos, carregue-o com ``usuario()``.
+"""
+import hashlib
+import hmac
+
+from flask import current_app, session
+from flask_login import UserMixin, current_user
+from sqlalchemy import event, select
+
+import cache
+from models import db, User
+
+SESSAO = '_principal'
+CAMPOS = ('id', 'name', 'email', 'is_admin', 'foto_perfil', 'foto_hash')
+
+
+class Principal(UserMixin):
+    def __init__(self, row):
+        for campo in CAMPOS:
+            setattr(self, campo, getattr(row, campo))
+        self.is_admin = bool(self.is_admin)
+
+    def __repr__(self):
+        return f'<Principal {self.id}>'
+
+
+def _tag(user_id):
+    return f'usuario:{user_id}'
+
+
+def _impressao(password_hash):
+    chave = current_app.config['SECRET_KEY'].encode()
+    return hmac.new(chave, password_hash.encode(), hashlib.sha256).hexdigest()[:16]
+
+
+def iniciar_sessao(user):
+    """Grava na sessão a impressão da senha atual (depois do login ou de trocar a senha)."""
+    session[SESSAO] = {'id': user.id, 's': _impressao(user.password_hash)}
+
+
+def encerrar_sessao():
+    session.pop(SESSAO, None)
+
+
+def _ler(user_id):
+    return db.session.execute(
+        select(*(getattr(User, c) for c in CAMPOS), User.password_hash, User.sessao_versao)
+        .where(User.id == user_id)
+    ).first()
+
+
+def carregar(user_id):
+    user_id = int(user_id)
+    lru = current_app.extensions['principais']
+    retrato = session.get(SESSAO)
+    if retrato is not None and retrato.get('id') != user_id:
+        retrato = None
+    compartilhado = not isinstance(cache.get_cache(), cache.MemoryCache)
+
+    item = lru.get(user_id)
+    row = None
+    if compartilhado:
+        versao = cache.get_cache().versao(_tag(user_id))
+    else:
+        # versão vista por todos os processos; a mesma leitura já traz o retrato, se ele estiver velho
+        row = _ler(user_id)
+        if row is None:
+            return None
+        versao = row.sessao_versao
+
+    if item is not None and item[1] == versao and (retrato is None or retrato['s'] == item[2]):
+        principal, impressao = item[0], item[2]
+    else:
+        if row is None:
+            row = _ler(user_id)
+            if row is None:
+                return None
+        impressao = _impressao(row.password_hash)
+        if retrato is not None and retrato['s'] != impressao:
+            # senha trocada em outra sessão: não deixa o cookie de "lembrar-me" logar de novo
+            # (logout_user() aqui chamaria o loader de novo)
+            encerrar_sessao()
+            for chave in ('_user_id', '_fresh', '_id'):
+                session.pop(chave, None)
+            session['_remember'] = 'clear'
+            return None
+        principal = Principal(row)
+        lru.set(user_id, (principal, versao, impressao))
+
+    if retrato is None:
+        session[SESSAO] = {'id': user_id, 's': impressao}
+    return principal
+
+
+def usuario():
+    """O ``User`` do ORM correspondente ao usuário logado (uma consulta)."""
+    return db.session.get(User, current_user.id)
+
+
+def _subir_versao(mapper, connection, target):
+    estado = db.inspect(target)
+    if any(estado.attrs[c].history.has_changes() for c in CAMPOS + ('password_hash',)):
+        target.sessao_versao = User.sessao_versao + 1
+
+
+def init_app(app, login_manager):
+    app.config.setdefault('PRINCIPAL_CACHE_SIZE', 10000)
+    app.config.setdefault('PRINCIPAL_TTL', 60)
+    app.extensions['principais'] = cache.MemoryCache(app.config['PRINCIPAL_CACHE_SIZE'],
+                                                     app.config['PRINCIPAL_TTL'])
+    login_manager.user_loader(carregar)
+    if not event.contains(User, 'before_update', _subir_versao):
+        event.listen(User, 'before_update', _subir_versao)
@@ -0,0 +1,91 @@
+# query_budget.py
+"""Contador (e tempo) de SQL por requisição e orçamento de consultas por rota.
+
+Cada rota pode declarar quantos comandos SQL pode emitir com
+``@query_budget(n)``. Se passar do limite, a requisição gera um aviso no log
+ou, com ``SQL_QUERY_BUDGET_ENFORCE`` ligado (padrão quando ``TESTING``),
+levanta ``QueryBudgetExceeded`` — o suficiente para um teste falhar quando
+alguém reintroduz um N+1.
+"""
+import functools
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def query_budget(limit):
+    """Marca a view com o número máximo de comandos SQL por requisição."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            return view(*args, **kwargs)
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+def query_count():
+    return g.get('sql_queries', 0)
+
+
+def query_time():
+    """Segundos gastos em comandos SQL na requisição atual."""
+    return g.get('sql_time', 0.0)
+
+
+_contadores = []
+
+
+@contextmanager
+def count_queries():
+    """Conta os comandos SQL emitidos dentro do bloco (fora de requisições também)."""
+    contador = [0]
+    _contadores.append(contador)
+    try:
+        yield contador
+    finally:
+        _contadores.remove(contador)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for contador in _contadores:
+        contador[0] += 1
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        conn.info['sql_inicio'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop('sql_inicio', None)
+    if inicio is not None and has_request_context():
+        g.sql_time = g.get('sql_time', 0.0) + time.perf_counter() - inicio
+
+
+def init_app(app):
+    # None = segue o TESTING da aplicação
+    app.config.setdefault('SQL_QUERY_BUDGET_ENFORCE', None)
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    if not event.contains(Engine, 'after_cursor_execute', _after_cursor_execute):
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.after_request
+    def verificar_orcamento(response):
+        view = app.view_functions.get(request.endpoint)
+        limite = getattr(view, 'query_budget', None)
+        usados = query_count()
+        if limite is not None and usados > limite:
+            msg = f'{request.endpoint}: {usados} comandos SQL (orçamento {limite})'
+            enforce = app.config['SQL_QUERY_BUDGET_ENFORCE']
+            if enforce or (enforce is None and app.testing):
+                raise QueryBudgetExceeded(msg)
+            app.logger.warning('Orçamento de SQL excedido: %s', msg)
+        return response
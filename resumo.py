@@ -0,0 +1,52 @@
+# resumo.py
+"""Resumo do usuário (contagens e favoritos recentes) para as páginas pessoais.
+
+O agregado fica no cache (cache.py) sob a tag ``resumo:<id>``, invalidada no
+commit de qualquer favorito ou autoria do usuário; ``RESUMO_TTL`` limita o
+que escapa disso, como um projeto favoritado que mudou de título.
+"""
+from flask import current_app
+from sqlalchemy import func, select
+
+import cache
+from models import db, Favorite, Project, User
+
+RECENTES = 5
+
+
+def tag(user_id):
+    return f'resumo:{user_id}'
+
+
+def calcular(user_id):
+    """Duas consultas, ambas pelos índices (user_id, ...) de favorite e pelo PK de user."""
+    favoritos = select(func.count()).select_from(Favorite).where(Favorite.user_id == user_id).scalar_subquery()
+    projetos, total_favoritos = db.session.execute(
+        select(User.project_count, favoritos).where(User.id == user_id)
+    ).one()
+    recentes = db.session.execute(
+        select(Project.id, Project.title, Favorite.created_at)
+        .join(Favorite, Favorite.project_id == Project.id)
+        .where(Favorite.user_id == user_id)
+        .order_by(Favorite.created_at.desc(), Favorite.project_id.desc())
+        .limit(RECENTES)
+    ).all()
+    return {
+        'projetos': projetos,
+        'favoritos': total_favoritos,
+        'recentes': [{'id': pid, 'title': title, 'created_at': criado} for pid, title, criado in recentes],
+    }
+
+
+def do_usuario(user_id):
+    c = cache.get_cache()
+    chave = f'resumo:{user_id}@{c.versao(tag(user_id))}'
+    resumo = c.get(chave)
+    if resumo is None:
+        resumo = calcular(user_id)
+        c.set(chave, resumo, current_app.config['RESUMO_TTL'])
+    return resumo
+
+
+def init_app(app):
+    app.config.setdefault('RESUMO_TTL', 300)
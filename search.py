@@ -0,0 +1,464 @@
+# search.py
+"""Índice de busca dos projetos (título, descrição, autores e texto do anexo).
+
+Quando o banco é SQLite usamos a tabela virtual FTS5 ``project_fts`` criada
+pela migração; nos demais bancos (ou se a migração ainda não rodou) cai para
+um índice invertido em memória, montado uma vez por processo e mantido em dia
+com o que os outros processos gravam por uma marca d'água em
+``Project.updated_at`` (``SEARCH_MEMORIA_INTERVALO``).
+
+O texto dos anexos (anexos.py) fica em ``attachment_fts``, uma linha por
+conteúdo e não por projeto; a consulta junta as duas tabelas, com o anexo
+valendo menos que os campos do próprio projeto (``PESO_ANEXO``).
+"""
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import event, inspect, text
+
+import jobs
+from models import db, AttachmentText, Project, StoredFile
+
+FTS_TABLE = 'project_fts'
+ANEXO_FTS_TABLE = 'attachment_fts'
+CAMPOS = ('title', 'description', 'authors_text')
+# pesos por campo, na mesma ordem das colunas da tabela FTS
+PESOS = (10.0, 1.0, 5.0)
+PESO_ANEXO = 0.5
+TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Programação' -> 'programacao'."""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokens(texto):
+    return TOKEN_RE.findall(normalizar(texto))
+
+
+class SearchPage:
+    """Página de resultados com a mesma interface usada pelo ``index.html``."""
+
+    def __init__(self, items, page, per_page, total):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+
+    @property
+    def pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def prev_args(self):
+        return {'page': self.prev_num}
+
+    @property
+    def next_args(self):
+        return {'page': self.next_num}
+
+
+# ============================
+#        BACKEND FTS5
+# ============================
+
+class FTSIndex:
+    nome = 'fts5'
+
+    def __init__(self, anexos=True):
+        self.anexos = anexos  # attachment_fts existe (migração 9e6b3d1f5a28)
+
+    def add(self, project):
+        self.remove(project.id)
+        db.session.execute(
+            text(f'INSERT INTO {FTS_TABLE} (rowid, title, description, authors_text) '
+                 'VALUES (:id, :title, :description, :authors_text)'),
+            {'id': project.id, 'title': project.title or '',
+             'description': project.description or '', 'authors_text': project.authors_text or ''}
+        )
+
+    def remove(self, project_id):
+        db.session.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), {'id': project_id})
+
+    def add_anexo(self, anexo):
+        if self.anexos and anexo.text:
+            db.session.execute(text(f'INSERT INTO {ANEXO_FTS_TABLE} (rowid, text) VALUES (:id, :text)'),
+                               {'id': anexo.id, 'text': anexo.text})
+
+    def remove_anexo(self, anexo_id):
+        if self.anexos:
+            db.session.execute(text(f'DELETE FROM {ANEXO_FTS_TABLE} WHERE rowid = :id'), {'id': anexo_id})
+
+    def search(self, q, limit, offset):
+        termos = tokens(q)
+        if not termos:
+            return [], 0
+        # cada termo vira uma consulta de prefixo: "progr"* AND "web"*
+        expr = ' AND '.join(f'"{t}"*' for t in termos)
+        pesos = ', '.join(str(p) for p in PESOS)
+        # bm25 é negativo (menor = melhor): somar premia quem casa nos campos e no anexo
+        partes = [f'SELECT rowid AS id, bm25({FTS_TABLE}, {pesos}) AS r FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q']
+        if self.anexos:
+            partes.append(
+                f'SELECT p.id AS id, bm25({ANEXO_FTS_TABLE}) * {PESO_ANEXO} AS r FROM {ANEXO_FTS_TABLE} '
+                f'JOIN attachment_text t ON t.id = {ANEXO_FTS_TABLE}.rowid '
+                'JOIN stored_file s ON s.sha256 = t.sha256 '
+                'JOIN project p ON p.file_path = s.filename '
+                f'WHERE {ANEXO_FTS_TABLE} MATCH :q'
+            )
+        achados = ' UNION ALL '.join(partes)
+        total = db.session.execute(
+            text(f'SELECT count(DISTINCT id) FROM ({achados})'), {'q': expr}
+        ).scalar()
+        ids = db.session.execute(
+            text(f'SELECT id FROM ({achados}) GROUP BY id ORDER BY sum(r), id DESC LIMIT :limit OFFSET :offset'),
+            {'q': expr, 'limit': limit, 'offset': offset}
+        ).scalars().all()
+        return ids, total
+
+    def rebuild(self):
+        db.session.execute(text(f'DELETE FROM {FTS_TABLE}'))
+        db.session.execute(text(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, authors_text) '
+            "SELECT id, title, description, coalesce(authors_text, '') FROM project"
+        ))
+        if self.anexos:
+            db.session.execute(text(f'DELETE FROM {ANEXO_FTS_TABLE}'))
+            db.session.execute(text(
+                f"INSERT INTO {ANEXO_FTS_TABLE} (rowid, text) SELECT id, text FROM attachment_text WHERE text != ''"
+            ))
+        db.session.commit()
+
+
+# ============================
+#   BACKEND EM MEMÓRIA (FALLBACK)
+# ============================
+
+class MemoryIndex:
+    """Índice invertido por processo: termo -> {project_id: peso}.
+
+    O vocabulário fica ordenado para que consultas de prefixo sejam um
+    ``bisect`` em vez de uma varredura. As alterações feitas durante uma
+    transação só são aplicadas depois do commit; as de outros processos
+    entram pela conferência em segundo plano (``atualizar``), feita no máximo
+    a cada ``SEARCH_MEMORIA_INTERVALO`` segundos.
+    """
+    nome = 'memoria'
+    # releitura de quem mudou um pouco antes da marca: o updated_at é gravado
+    # no flush, e uma transação mais lenta pode commitar depois de outra mais nova
+    FOLGA = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._docs = {}
+        self._vocab = []
+        self._carregado = False
+        self._marca = None  # (maior Project.updated_at, maior AttachmentText.extracted_at) já lidos
+        self._conferido_em = 0.0
+        self._atualizando = False
+
+    @staticmethod
+    def _linhas(*filtros):
+        return db.session.execute(
+            db.select(Project.id, Project.title, Project.description, Project.authors_text,
+                      AttachmentText.text)
+            .outerjoin(StoredFile, StoredFile.filename == Project.file_path)
+            .outerjoin(AttachmentText, AttachmentText.sha256 == StoredFile.sha256)
+            .where(*filtros)
+            .execution_options(yield_per=1000)
+        )
+
+    @staticmethod
+    def _estado():
+        """(total de projetos, maior updated_at, maior extracted_at), numa consulta."""
+        return tuple(db.session.execute(db.select(
+            db.select(db.func.count(Project.id)).scalar_subquery(),
+            db.select(db.func.max(Project.updated_at)).scalar_subquery(),
+            db.select(db.func.max(AttachmentText.extracted_at)).scalar_subquery(),
+        )).one())
+
+    def _garantir_carregado(self):
+        if self._carregado:
+            return
+        with self._lock:
+            if self._carregado:
+                return
+            # a marca vem antes da leitura: o que mudar durante ela é relido na próxima conferência
+            _, *marca = self._estado()
+            for pid, title, description, authors_text, anexo in self._linhas():
+                self._indexar(pid, (title, description, authors_text, anexo))
+            self._marca = marca
+            self._conferido_em = time.monotonic()
+            self._carregado = True
+
+    def atualizar(self):
+        """Aplica o que outros processos commitaram desde a última conferência."""
+        total, *marca = self._estado()
+        agora = datetime.utcnow()
+        filtros = []
+        for coluna, antiga, nova in zip((Project.updated_at, AttachmentText.extracted_at), self._marca, marca):
+            if nova is None:
+                continue
+            if antiga is None:
+                filtros.append(coluna.isnot(None))
+            elif nova != antiga or agora - nova < self.FOLGA:
+                # dentro da folga ainda pode aparecer um commit atrasado com data anterior à marca
+                filtros.append(coluna >= antiga - self.FOLGA)
+        if filtros:
+            linhas = self._linhas(db.or_(*filtros)).all()
+            with self._lock:
+                for pid, title, description, authors_text, anexo in linhas:
+                    self._indexar(pid, (title, description, authors_text, anexo))
+        if total != len(self._docs):
+            # exclusões não deixam updated_at: confere os ids
+            existentes = set(db.session.execute(db.select(Project.id)).scalars())
+            with self._lock:
+                for pid in set(self._docs) - existentes:
+                    self._remover(pid)
+        self._marca = marca
+        self._conferido_em = time.monotonic()
+
+    def _atualizar_em_segundo_plano(self):
+        app = current_app._get_current_object()
+        if time.monotonic() - self._conferido_em < app.config['SEARCH_MEMORIA_INTERVALO']:
+            return
+        with self._lock:
+            if self._atualizando:
+                return
+            self._atualizando = True
+
+        def rodar():
+            try:
+                with app.app_context():
+                    self.atualizar()
+            except Exception:
+                app.logger.exception('Falha ao atualizar o índice de busca em memória')
+            finally:
+                self._atualizando = False
+
+        threading.Thread(target=rodar, name='busca-memoria', daemon=True).start()
+
+    def _indexar(self, pid, valores):
+        self._remover(pid)
+        pesos = defaultdict(float)
+        for valor, peso in zip(valores, PESOS + (PESO_ANEXO,)):
+            for termo in tokens(valor):
+                pesos[termo] += peso
+        for termo, peso in pesos.items():
+            postings = self._postings[termo]
+            if not postings:
+                bisect.insort(self._vocab, termo)
+            postings[pid] = peso
+        self._docs[pid] = set(pesos)
+
+    def _remover(self, pid):
+        for termo in self._docs.pop(pid, ()):
+            postings = self._postings[termo]
+            postings.pop(pid, None)
+            if not postings:
+                del self._postings[termo]
+                i = bisect.bisect_left(self._vocab, termo)
+                if i < len(self._vocab) and self._vocab[i] == termo:
+                    del self._vocab[i]
+
+    def _pendentes(self):
+        return db.session.info.setdefault('search_pendentes', [])
+
+    def add(self, project):
+        valores = tuple(getattr(project, c) for c in CAMPOS) + (_texto_anexo(project.file_path),)
+        self._pendentes().append((project.id, valores))
+
+    def add_anexo(self, anexo):
+        # o texto entra pelos projetos que usam o arquivo
+        for project in Project.query.join(StoredFile, StoredFile.filename == Project.file_path).filter(
+                StoredFile.sha256 == anexo.sha256):
+            self._pendentes().append((project.id, tuple(getattr(project, c) for c in CAMPOS) + (anexo.text,)))
+
+    def remove_anexo(self, anexo_id):
+        pass  # add_anexo do texto novo reindexa os projetos
+
+    def remove(self, project_id):
+        self._pendentes().append((project_id, None))
+
+    def aplicar(self, pendentes):
+        if not self._carregado:
+            return  # o carregamento inicial já vai ler o estado commitado
+        with self._lock:
+            for pid, valores in pendentes:
+                if valores is None:
+                    self._remover(pid)
+                else:
+                    self._indexar(pid, valores)
+
+    def search(self, q, limit, offset):
+        termos = tokens(q)
+        if not termos:
+            return [], 0
+        self._garantir_carregado()
+        self._atualizar_em_segundo_plano()
+        n_docs = max(1, len(self._docs))
+        scores = None
+        with self._lock:
+            for termo in termos:
+                encontrados = {}
+                i = bisect.bisect_left(self._vocab, termo)
+                while i < len(self._vocab) and self._vocab[i].startswith(termo):
+                    for pid, peso in self._postings[self._vocab[i]].items():
+                        encontrados[pid] = max(encontrados.get(pid, 0.0), peso)
+                    i += 1
+                if not encontrados:
+                    return [], 0
+                idf = math.log(1 + n_docs / len(encontrados))
+                if scores is None:
+                    scores = {pid: peso * idf for pid, peso in encontrados.items()}
+                else:
+                    scores = {pid: s + encontrados[pid] * idf
+                              for pid, s in scores.items() if pid in encontrados}
+        ordenados = sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))
+        return [pid for pid, _ in ordenados[offset:offset + limit]], len(ordenados)
+
+    def rebuild(self):
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._vocab.clear()
+            self._carregado = False
+        self._garantir_carregado()
+
+
+# ============================
+#        API DO MÓDULO
+# ============================
+
+def _texto_anexo(filename):
+    if not filename:
+        return None
+    return db.session.execute(
+        db.select(AttachmentText.text).join(StoredFile, StoredFile.sha256 == AttachmentText.sha256)
+        .where(StoredFile.filename == filename)
+    ).scalar()
+
+
+def get_index():
+    index = current_app.extensions.get('search')
+    if index is None:
+        if db.engine.dialect.name == 'sqlite' and inspect(db.engine).has_table(FTS_TABLE):
+            index = FTSIndex(anexos=inspect(db.engine).has_table(ANEXO_FTS_TABLE))
+        else:
+            current_app.logger.info('Busca: FTS5 indisponível, usando índice em memória.')
+            index = MemoryIndex()
+        current_app.extensions['search'] = index
+    return index
+
+
+def index_project(project):
+    """Atualiza o projeto no índice. Chamar depois do flush e antes do commit."""
+    get_index().add(project)
+
+
+def remove_project(project_id):
+    get_index().remove(project_id)
+
+
+def indexar_anexo(anexo):
+    """Coloca o texto de um AttachmentText (já com id) na busca. Chamar antes do commit."""
+    get_index().add_anexo(anexo)
+
+
+def remover_anexo(anexo_id):
+    get_index().remove_anexo(anexo_id)
+
+
+def search_projects(q, page=1, per_page=10):
+    page = max(page, 1)
+    ids, total = get_index().search(q, per_page, (page - 1) * per_page)
+    items = []
+    if ids:
+        por_id = {p.id: p for p in Project.query.filter(Project.id.in_(ids))}
+        items = [por_id[i] for i in ids if i in por_id]
+    return SearchPage(items, page, per_page, total)
+
+
+@jobs.tarefa('reindexar_busca')
+def reindexar(project_ids=None):
+    """Reindexa os projetos de ``project_ids`` (os que sumiram saem do índice) ou o catálogo inteiro."""
+    index = get_index()
+    if project_ids is None:
+        index.rebuild()
+        return
+    encontrados = set()
+    for project in Project.query.filter(Project.id.in_(project_ids)):
+        index.add(project)
+        encontrados.add(project.id)
+    for pid in set(project_ids) - encontrados:
+        index.remove(pid)
+
+
+def incluir_objeto(obj, name, type_, reflected, compare_to):
+    """Evita que o autogenerate do Alembic tente apagar as tabelas do FTS5."""
+    return not (type_ == 'table' and name and name.startswith((FTS_TABLE, ANEXO_FTS_TABLE)))
+
+
+def _aplicar_pendentes(session):
+    pendentes = session.info.pop('search_pendentes', None)
+    if not pendentes:
+        return
+    index = current_app.extensions.get('search')
+    if isinstance(index, MemoryIndex):
+        index.aplicar(pendentes)
+
+
+def _descartar_pendentes(session, previous_transaction):
+    if previous_transaction.parent is None:  # rollback de SAVEPOINT não descarta a transação externa
+        session.info.pop('search_pendentes', None)
+
+
+def init_app(app):
+    app.config.setdefault('SEARCH_MEMORIA_INTERVALO', 10)  # segundos entre conferências do índice em memória
+    app.extensions['search'] = None
+
+    if not event.contains(db.session, 'after_commit', _aplicar_pendentes):
+        event.listen(db.session, 'after_commit', _aplicar_pendentes)
+        event.listen(db.session, 'after_soft_rollback', _descartar_pendentes)
+
+    @app.cli.command('reindex-search')
+    @click.option('--fila', is_flag=True, help='enfileira a reconstrução em vez de rodar agora')
+    def reindex_search(fila):
+        """Reconstrói o índice de busca a partir da tabela project."""
+        if fila:
+            jobs.enfileirar('reindexar_busca')
+            db.session.commit()
+            click.echo('Reconstrução do índice enfileirada.')
+            return
+        index = get_index()
+        index.rebuild()
+        click.echo(f'Índice de busca ({index.nome}) reconstruído.')
@@ -0,0 +1,148 @@
+# senhas.py
+"""Hash de senhas com algoritmo e custo configuráveis, fora do worker web.
+
+``PASSWORD_METHOD`` usa o formato do Werkzeug (``scrypt:32768:8:1``,
+``pbkdf2:sha256:1000000``...). Hashes gravados com outro método continuam
+valendo e são refeitos no próximo login bem-sucedido (``conferir``).
+
+O KDF roda num pool de ``PASSWORD_WORKERS`` processos: o custo de CPU fica
+isolado e limitado, e a thread da requisição só espera o resultado. No
+máximo ``PASSWORD_MAX_FILA`` cálculos por processo web ficam na fila; além
+disso a requisição recebe 503 com ``Retry-After`` em vez de esperar.
+Com ``PASSWORD_WORKERS = 0``, sempre fora de requisições (CLI, scripts) e em
+processos daemon, que não podem ter filhos, o cálculo é feito na própria thread.
+
+``flask senhas calibrar`` mede a máquina e sugere o custo para uma latência alvo.
+"""
+import atexit
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app, has_request_context
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class Ocupado(ServiceUnavailable):
+    description = 'Muitos logins ao mesmo tempo. Tente novamente em alguns segundos.'
+
+
+class Servico:
+    def __init__(self, max_fila):
+        self._vagas = threading.BoundedSemaphore(max_fila)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+
+    def _executor(self, workers):
+        # o pool é criado no processo que vai usá-lo (depois do fork do gunicorn)
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                # spawn: não herda as threads (despachante de tarefas, pool do banco) do processo web
+                self._pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+                atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+            return self._pool
+
+    def rodar(self, func, *args):
+        workers, espera = current_app.config['PASSWORD_WORKERS'], current_app.config['PASSWORD_ESPERA']
+        # processos daemon (workers de benchmark, multiprocessing) não podem criar o pool
+        if not workers or not has_request_context() or multiprocessing.current_process().daemon:
+            return func(*args)
+        if not self._vagas.acquire(timeout=espera):
+            raise Ocupado(retry_after=max(1, round(espera)))
+        try:
+            return self._executor(workers).submit(func, *args).result()
+        finally:
+            self._vagas.release()
+
+
+def _servico():
+    return current_app.extensions['senhas']
+
+
+def gerar(senha):
+    return _servico().rodar(generate_password_hash, senha, current_app.config['PASSWORD_METHOD'])
+
+
+def verificar(password_hash, senha):
+    return _servico().rodar(check_password_hash, password_hash, senha)
+
+
+def metodo(password_hash):
+    return password_hash.split('$', 1)[0]
+
+
+def precisa_refazer(password_hash):
+    return metodo(password_hash) != current_app.config['PASSWORD_METHOD']
+
+
+def conferir(user, senha):
+    """Confere a senha e, se o hash for de um método antigo, grava um novo (commit fica com quem chamou)."""
+    if not verificar(user.password_hash, senha):
+        return False
+    if precisa_refazer(user.password_hash):
+        user.password_hash = gerar(senha)
+    return True
+
+
+# ============================
+#          CALIBRAÇÃO
+# ============================
+
+def _medir(metodo, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        generate_password_hash('calibracao', metodo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def calibrar(algoritmo, alvo_ms, repeticoes=3, eco=print):
+    """Maior custo cujo hash leva até ``alvo_ms`` nesta máquina; devolve o PASSWORD_METHOD sugerido."""
+    if algoritmo == 'scrypt':
+        escolhido, n = None, 2 ** 12
+        while n <= 2 ** 20:
+            # r=8, p=1; memória ~ 128 * n * r bytes
+            candidato = f'scrypt:{n}:8:1'
+            ms = _medir(candidato, repeticoes)
+            eco(f'{candidato:<24} {ms:8.1f} ms')
+            if ms > alvo_ms:
+                break
+            escolhido, n = candidato, n * 2
+        return escolhido or 'scrypt:4096:8:1'
+    # pbkdf2 é linear nas iterações: mede uma vez e extrapola
+    base = 100_000
+    ms = _medir(f'pbkdf2:sha256:{base}', repeticoes)
+    iteracoes = max(base, int(base * alvo_ms / ms) // 10_000 * 10_000)
+    eco(f'pbkdf2:sha256:{base:<11} {ms:8.1f} ms')
+    return f'pbkdf2:sha256:{iteracoes}'
+
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_METHOD', os.getenv('PASSWORD_METHOD', 'scrypt:32768:8:1'))
+    # processos por worker web dedicados ao KDF; 0 = calcula na thread da requisição
+    app.config.setdefault('PASSWORD_WORKERS', int(os.getenv('PASSWORD_WORKERS', 2)))
+    app.config.setdefault('PASSWORD_MAX_FILA', 16)
+    app.config.setdefault('PASSWORD_ESPERA', 5)  # segundos esperando vaga na fila antes do 503
+    app.extensions['senhas'] = Servico(app.config['PASSWORD_MAX_FILA'])
+
+    @app.cli.group('senhas')
+    def senhas_cli():
+        """Hash de senhas."""
+
+    @senhas_cli.command('calibrar')
+    @click.option('--algoritmo', type=click.Choice(['scrypt', 'pbkdf2']), default='scrypt')
+    @click.option('--alvo-ms', type=float, default=250, help='latência desejada por hash')
+    @click.option('--repeticoes', type=int, default=3)
+    def senhas_calibrar(algoritmo, alvo_ms, repeticoes):
+        """Mede esta máquina e sugere o PASSWORD_METHOD para a latência alvo."""
+        sugerido = calibrar(algoritmo, alvo_ms, repeticoes, eco=click.echo)
+        click.echo(f'\nPASSWORD_METHOD={sugerido}')
+        click.echo(f'(atual: {app.config["PASSWORD_METHOD"]}; hashes antigos são refeitos no próximo login)')
@@ -1,6 +1,6 @@
 from app import create_app
 from models import db, User
-from werkzeug.security import generate_password_hash
+import senhas
 
 app = create_app()
 app.app_context().push()
@@ -9,7 +9,7 @@ app.app_context().push()
 admin = User(
     name="Administrador",
     email="admin@catalogo.com",
-    password_hash=generate_password_hash("123456"),
+    password_hash=senhas.gerar("123456"),
     is_admin=True
 )
 
@@ -12,32 +12,27 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   });
 
-  // Animação leve nos cards ao rolar
+  // Animação leve nos cards: cada um aparece uma vez, quando entra na tela
   const cards = document.querySelectorAll(".card");
-  const revealCards = () => {
+  if ("IntersectionObserver" in window) {
+    const observador = new IntersectionObserver(entradas => {
+      entradas.forEach(entrada => {
+        if (!entrada.isIntersecting) return;
+        entrada.target.classList.add("card-visivel");
+        observador.unobserve(entrada.target);
+      });
+    }, { rootMargin: "0px 0px -100px 0px" });
     cards.forEach(card => {
-      const rect = card.getBoundingClientRect();
-      if (rect.top < window.innerHeight - 100) {
-        card.style.opacity = 1;
-        card.style.transform = "translateY(0)";
-      }
+      card.classList.add("card-revelar");
+      observador.observe(card);
     });
-  };
-  cards.forEach(card => {
-    card.style.opacity = 0;
-    card.style.transform = "translateY(20px)";
-    card.style.transition = "all 0.5s ease-out";
-  });
-  window.addEventListener("scroll", revealCards);
-  revealCards();
+  }
 });
 
 // Adiciona sombra na navbar quando rola a página
 window.addEventListener("scroll", () => {
-  const nav = document.querySelector(".navbar");
-  if (window.scrollY > 20) nav.classList.add("shadow");
-  else nav.classList.remove("shadow");
-});
+  document.querySelector(".navbar").classList.toggle("shadow", window.scrollY > 20);
+}, { passive: true });
 
 // Pré-visualização em tempo real de novo projeto
 document.addEventListener("DOMContentLoaded", () => {
@@ -63,3 +58,179 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 });
 
+
+// Upload em partes (retomável) para arquivos grandes, ex.: ZIPs acima do limite por requisição
+const CHUNK_SIZE = 4 * 1024 * 1024;
+const CHUNKED_MIN = 8 * 1024 * 1024;
+
+async function enviarEmPartes(arquivo, aoProgredir) {
+  let resp = await fetch("/uploads/sessao", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: arquivo.name, size: arquivo.size }),
+  });
+  let estado = await resp.json();
+  if (!resp.ok) throw new Error(estado.erro);
+
+  let tentativas = 0;
+  while (estado.offset < estado.size) {
+    const fim = Math.min(estado.offset + CHUNK_SIZE, estado.size);
+    try {
+      resp = await fetch(`/uploads/sessao/${estado.upload_id}`, {
+        method: "PUT",
+        headers: { "Content-Range": `bytes ${estado.offset}-${fim - 1}/${estado.size}` },
+        body: arquivo.slice(estado.offset, fim),
+      });
+      if (!resp.ok && resp.status !== 409) throw new Error((await resp.json()).erro);
+      tentativas = 0;
+    } catch (erro) {
+      if (++tentativas > 5) throw erro;
+      await new Promise(r => setTimeout(r, 1000 * tentativas));
+    }
+    // pergunta ao servidor onde parou (cobre partes perdidas e respostas 409)
+    resp = await fetch(`/uploads/sessao/${estado.upload_id}`);
+    estado = await resp.json();
+    if (!resp.ok) throw new Error(estado.erro);
+    aoProgredir(estado.offset / estado.size);
+  }
+  return estado.upload_id;
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("form[enctype='multipart/form-data']").forEach(form => {
+    const entrada = form.querySelector("input[type='file'][name='file']");
+    const uploadId = form.querySelector("input[name='upload_id']");
+    if (!entrada || !uploadId) return;
+
+    form.addEventListener("submit", async evento => {
+      const arquivo = entrada.files[0];
+      if (!arquivo || arquivo.size < CHUNKED_MIN || uploadId.value) return;
+      evento.preventDefault();
+      const botao = form.querySelector("button[type='submit']");
+      const rotulo = botao.textContent;
+      botao.disabled = true;
+      try {
+        uploadId.value = await enviarEmPartes(arquivo, p => {
+          botao.textContent = `Enviando... ${Math.round(p * 100)}%`;
+        });
+        entrada.value = "";
+        form.submit();
+      } catch (erro) {
+        alert(`Falha no envio: ${erro.message}`);
+        botao.disabled = false;
+        botao.textContent = rotulo;
+      }
+    });
+  });
+});
+
+// Favoritar sem recarregar a página: PUT/DELETE idempotentes, o formulário continua como fallback
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("form[data-favorito]").forEach(form => {
+    const botao = form.querySelector("button[type='submit']");
+    const total = form.querySelector("[data-favoritos-total]");
+
+    const mostrar = favorito => {
+      form.dataset.favorito = favorito ? "sim" : "nao";
+      botao.textContent = favorito ? "Remover dos Favoritos" : "Favoritar";
+      botao.classList.toggle("btn-warning", favorito);
+      botao.classList.toggle("btn-success", !favorito);
+    };
+
+    form.addEventListener("submit", async evento => {
+      evento.preventDefault();
+      if (botao.disabled) return;
+      const favoritar = form.dataset.favorito !== "sim";
+      botao.disabled = true;
+      mostrar(favoritar);  // otimista; desfaz se o servidor recusar
+      try {
+        const resp = await fetch(form.action, {
+          method: favoritar ? "PUT" : "DELETE",
+          headers: { Accept: "application/json" },
+        });
+        if (!resp.ok) throw new Error(resp.status);
+        const dados = await resp.json();
+        mostrar(dados.favorito);
+        if (total) total.textContent = dados.total;
+      } catch (erro) {
+        mostrar(!favoritar);
+      } finally {
+        botao.disabled = false;
+      }
+    });
+  });
+});
+
+// Sugestões enquanto digita: espera uma pausa na digitação e cancela a consulta anterior
+document.addEventListener("DOMContentLoaded", () => {
+  document.querySelectorAll("input[data-sugestoes]").forEach(entrada => {
+    const lista = entrada.form.querySelector("[data-sugestoes-lista]");
+    const ESPERA_MS = 150;
+    let timer = null;
+    let pendente = null;
+    let ativo = -1;
+
+    const fechar = () => {
+      lista.hidden = true;
+      lista.replaceChildren();
+      ativo = -1;
+    };
+
+    const destacar = indice => {
+      const itens = lista.querySelectorAll("a");
+      if (!itens.length) return;
+      ativo = (indice + itens.length) % itens.length;
+      itens.forEach((item, i) => item.classList.toggle("active", i === ativo));
+    };
+
+    const mostrar = sugestoes => {
+      lista.replaceChildren(...sugestoes.map(s => {
+        const item = document.createElement("a");
+        item.href = s.url;
+        item.className = "list-group-item list-group-item-action d-flex justify-content-between";
+        const texto = document.createElement("span");
+        texto.textContent = s.texto;
+        const tipo = document.createElement("small");
+        tipo.className = "text-muted";
+        tipo.textContent = s.tipo === "autor" ? "autor" : "projeto";
+        item.append(texto, tipo);
+        return item;
+      }));
+      lista.hidden = !sugestoes.length;
+      ativo = -1;
+    };
+
+    const buscar = async () => {
+      const q = entrada.value.trim();
+      if (pendente) pendente.abort();
+      if (q.length < 2) return fechar();
+      pendente = new AbortController();
+      try {
+        const resp = await fetch(`${entrada.dataset.sugestoes}?q=${encodeURIComponent(q)}`,
+                                 { signal: pendente.signal });
+        if (resp.ok) mostrar((await resp.json()).sugestoes);
+      } catch (erro) {
+        if (erro.name !== "AbortError") fechar();
+      }
+    };
+
+    entrada.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(buscar, ESPERA_MS);
+    });
+    entrada.addEventListener("keydown", evento => {
+      if (lista.hidden) return;
+      if (evento.key === "ArrowDown" || evento.key === "ArrowUp") {
+        evento.preventDefault();
+        destacar(ativo + (evento.key === "ArrowDown" ? 1 : -1));
+      } else if (evento.key === "Enter" && ativo >= 0) {
+        evento.preventDefault();
+        lista.querySelectorAll("a")[ativo].click();
+      } else if (evento.key === "Escape") {
+        fechar();
+      }
+    });
+    // o clique num item precisa acontecer antes de a lista sumir
+    entrada.addEventListener("blur", () => setTimeout(fechar, 200));
+  });
+});
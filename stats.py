@@ -0,0 +1,96 @@
+# stats.py
+"""Contadores desnormalizados e consolidado diário para o painel administrativo.
+
+``Project.favorite_count``, ``Project.author_count`` e ``User.project_count``
+são atualizados com ``UPDATE ... SET col = col + n`` na mesma transação da
+escrita que os altera, então nunca ficam fora de sincronia com o commit.
+A tabela ``daily_stats`` guarda, por dia (UTC), quantos projetos foram
+publicados, quantos usuários se cadastraram e quantos favoritos foram dados.
+"""
+from collections import Counter
+from datetime import datetime
+
+import click
+from sqlalchemy import bindparam, update
+from sqlalchemy.exc import IntegrityError
+
+import cache
+import resumo
+from models import db, Project, User, Favorite, DailyStats, author_project
+
+
+def _somar(modelo, coluna, ids, delta):
+    if ids and delta:
+        db.session.execute(update(modelo).where(modelo.id.in_(ids)).values({coluna: coluna + delta}))
+
+
+def registrar_dia(**campos):
+    """Soma ``campos`` (uploads/registrations/favorites) na linha de hoje, criando-a se preciso."""
+    hoje = datetime.utcnow().date()
+    valores = {getattr(DailyStats, c): getattr(DailyStats, c) + n for c, n in campos.items()}
+    somar = update(DailyStats).where(DailyStats.day == hoje).values(valores)
+    if db.session.execute(somar).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(DailyStats(day=hoje, **campos))
+    except IntegrityError:
+        # outra requisição criou a linha do dia ao mesmo tempo
+        db.session.execute(somar)
+
+
+def favorito(project_id, delta):
+    _somar(Project, Project.favorite_count, [project_id], delta)
+    if delta > 0:
+        registrar_dia(favorites=delta)
+
+
+def autoria(project_id, antigos, novos):
+    """Ajusta os contadores quando os autores de um projeto mudam de ``antigos`` para ``novos`` (ids)."""
+    antigos, novos = set(antigos), set(novos)
+    entraram, sairam = novos - antigos, antigos - novos
+    _somar(Project, Project.author_count, [project_id], len(entraram) - len(sairam))
+    _somar(User, User.project_count, entraram, 1)
+    _somar(User, User.project_count, sairam, -1)
+    cache.marcar(*(resumo.tag(uid) for uid in entraram | sairam))
+
+
+def autoria_em_lote(linhas):
+    """Contadores para associações inseridas direto em author_project ({'user_id', 'project_id'})."""
+    if not linhas:
+        return
+    por_projeto = Counter(l['project_id'] for l in linhas)
+    por_usuario = Counter(l['user_id'] for l in linhas)
+    # executemany no nível Core: um UPDATE preparado para todas as linhas do lote
+    projeto, usuario = Project.__table__, User.__table__
+    db.session.execute(
+        projeto.update().where(projeto.c.id == bindparam('pid'))
+        .values(author_count=projeto.c.author_count + bindparam('n')),
+        [{'pid': pid, 'n': n} for pid, n in por_projeto.items()]
+    )
+    db.session.execute(
+        usuario.update().where(usuario.c.id == bindparam('uid'))
+        .values(project_count=usuario.c.project_count + bindparam('n')),
+        [{'uid': uid, 'n': n} for uid, n in por_usuario.items()]
+    )
+
+
+def recalcular():
+    """Reconstrói todos os contadores a partir das tabelas de origem."""
+    favs = (db.select(db.func.count()).select_from(Favorite)
+            .where(Favorite.project_id == Project.id).scalar_subquery())
+    autores = (db.select(db.func.count()).select_from(author_project)
+               .where(author_project.c.project_id == Project.id).scalar_subquery())
+    projetos = (db.select(db.func.count()).select_from(author_project)
+                .where(author_project.c.user_id == User.id).scalar_subquery())
+    db.session.execute(update(Project).values(favorite_count=favs, author_count=autores))
+    db.session.execute(update(User).values(project_count=projetos))
+    db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command('recalcular-stats')
+    def recalcular_stats():
+        """Recalcula os contadores desnormalizados de projetos e usuários."""
+        recalcular()
+        click.echo('Contadores recalculados.')
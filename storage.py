@@ -0,0 +1,271 @@
+# storage.py
+"""Armazenamento de uploads endereçado por conteúdo.
+
+Cada arquivo é gravado uma única vez como ``<sha256>.<ext>``; a tabela
+``stored_file`` guarda quantas referências (projetos, fotos de perfil) apontam
+para ele. ``release`` só apaga o arquivo quando a última referência some — e
+apenas depois do commit.
+
+No banco e nas URLs o nome é sempre ``<sha256>.<ext>``; em disco o arquivo
+fica em ``UPLOAD_FOLDER/<aa>/<bb>/`` (os quatro primeiros dígitos do hash),
+para nenhum diretório acumular centenas de milhares de entradas. Uploads
+antigos (nomes livres) e arquivos ainda não movidos por ``flask storage
+fragmentar`` continuam na raiz e são achados por ``localizar``.
+
+Arquivos grandes (ZIPs) podem chegar em partes por uma sessão de upload
+retomável: o cliente abre a sessão, manda os pedaços com ``Content-Range`` e,
+se a conexão cair, pergunta o offset atual e continua de onde parou. Cada
+sessão aceita uma parte por vez (trava no arquivo ``.part``).
+
+A remoção do arquivo em disco é uma tarefa da fila (jobs.py), gravada na mesma
+transação do ``release``.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from flask import current_app
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+import instrumentation
+import jobs
+from models import db, StoredFile
+
+CHUNK = 64 * 1024
+TMP_DIR = '.tmp'
+PARCIAL_DIR = '.parcial'
+NOME_CONTEUDO_RE = re.compile(r'^([0-9a-f]{64})(\.[a-z0-9]+)?$')
+
+
+class UploadError(Exception):
+    pass
+
+
+def relativo(filename):
+    """Caminho de ``filename`` dentro de UPLOAD_FOLDER (``aa/bb/<nome>`` para nomes por conteúdo)."""
+    digest = digest_de(filename)
+    if digest is None:
+        return filename
+    return f'{digest[:2]}/{digest[2:4]}/{filename}'
+
+
+def caminho(filename):
+    """Onde ``filename`` deve ficar em disco."""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], relativo(filename))
+
+
+def localizar(filename):
+    """Caminho em disco de um arquivo existente, ou None (aceita a raiz, layout anterior ao fragmentado)."""
+    pasta = current_app.config['UPLOAD_FOLDER']
+    for path in (caminho(filename), os.path.join(pasta, filename)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _pasta(*partes):
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], *partes)
+    os.makedirs(os.path.dirname(path) if partes else path, exist_ok=True)
+    return path
+
+
+def extensao(nome):
+    nome = secure_filename(nome or '')
+    return '.' + nome.rsplit('.', 1)[-1].lower() if '.' in nome else ''
+
+
+def digest_de(filename):
+    """sha256 embutido no nome de um arquivo do armazenamento, ou None (uploads antigos)."""
+    m = NOME_CONTEUDO_RE.match(filename or '')
+    return m.group(1) if m else None
+
+
+def _copiar_com_hash(origem, destino):
+    """Copia ``origem`` (file-like) para ``destino`` em blocos; devolve (sha256, bytes)."""
+    h = hashlib.sha256()
+    total = 0
+    with open(destino, 'wb') as out:
+        for bloco in iter(lambda: origem.read(CHUNK), b''):
+            h.update(bloco)
+            out.write(bloco)
+            total += len(bloco)
+    return h.hexdigest(), total
+
+
+def _registrar(tmp_path, digest, tamanho, ext):
+    """Move o arquivo temporário para o nome final e conta mais uma referência."""
+    filename = f'{digest}{ext}'
+    incrementar = (update(StoredFile).where(StoredFile.sha256 == digest)
+                   .values(refcount=StoredFile.refcount + 1))
+    if db.session.execute(incrementar).rowcount:
+        filename = db.session.get(StoredFile, digest).filename
+        existente = localizar(filename)
+        if existente is None:
+            os.makedirs(os.path.dirname(caminho(filename)), exist_ok=True)
+            os.replace(tmp_path, caminho(filename))  # o arquivo tinha sumido: o enviado serve
+        else:
+            os.remove(tmp_path)  # já temos esse conteúdo
+            os.utime(existente)  # conta como recente para a coleta de órfãos (manutencao.py)
+        return filename
+
+    destino = caminho(filename)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(tmp_path, destino)
+    try:
+        with db.session.begin_nested():
+            db.session.add(StoredFile(sha256=digest, filename=filename, size=tamanho, refcount=1))
+    except IntegrityError:
+        # outra requisição gravou o mesmo conteúdo ao mesmo tempo
+        db.session.execute(incrementar)
+    return filename
+
+
+def put(file_storage):
+    """Grava um ``FileStorage`` e devolve o nome no armazenamento."""
+    ext = extensao(file_storage.filename)
+    tmp_path = _pasta(TMP_DIR, uuid.uuid4().hex)
+    try:
+        digest, tamanho = _copiar_com_hash(file_storage.stream, tmp_path)
+        instrumentation.registrar_upload(tamanho)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return _registrar(tmp_path, digest, tamanho, ext)
+
+
+def release(filename):
+    """Remove uma referência; sem nenhuma, o arquivo é apagado pela fila depois do commit."""
+    if not filename:
+        return
+    digest = digest_de(filename)
+    if digest is None:
+        # upload anterior ao armazenamento por conteúdo: tinha um dono só
+        jobs.enfileirar('apagar_upload', filename=filename)
+        return
+    db.session.execute(update(StoredFile).where(StoredFile.sha256 == digest)
+                       .values(refcount=StoredFile.refcount - 1))
+    registro = db.session.get(StoredFile, digest, populate_existing=True)
+    if registro is not None and registro.refcount <= 0:
+        db.session.delete(registro)
+        jobs.enfileirar('apagar_upload', filename=filename)
+
+
+@jobs.tarefa('apagar_upload')
+def apagar_upload(filename):
+    digest = digest_de(filename)
+    if digest is not None and db.session.get(StoredFile, digest) is not None:
+        return  # o mesmo conteúdo foi enviado de novo depois do release
+    path = localizar(filename)
+    if path is not None:
+        os.remove(path)
+
+
+# ============================
+#   UPLOAD RETOMÁVEL EM PARTES
+# ============================
+
+def _sessao_paths(upload_id):
+    if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+        raise UploadError('Sessão de upload inválida.')
+    base = _pasta(PARCIAL_DIR, upload_id)
+    return base + '.part', base + '.json'
+
+
+def _ler_meta(upload_id, user_id):
+    part, meta_path = _sessao_paths(upload_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise UploadError('Sessão de upload não encontrada.')
+    if meta['user_id'] != user_id:
+        raise UploadError('Sessão de upload não encontrada.')
+    meta['offset'] = os.path.getsize(part)
+    return meta
+
+
+def abrir_sessao(filename, size, user_id, extensoes):
+    ext = extensao(filename)
+    if ext.lstrip('.') not in extensoes:
+        raise UploadError('Tipo de arquivo não permitido.')
+    if size <= 0 or size > current_app.config['MAX_UPLOAD_SIZE']:
+        raise UploadError('Tamanho de arquivo inválido.')
+    upload_id = uuid.uuid4().hex
+    part, meta_path = _sessao_paths(upload_id)
+    open(part, 'wb').close()
+    with open(meta_path, 'w') as f:
+        json.dump({'filename': filename, 'size': size, 'user_id': user_id}, f)
+    return upload_id
+
+
+def status_sessao(upload_id, user_id):
+    meta = _ler_meta(upload_id, user_id)
+    return {'upload_id': upload_id, 'offset': meta['offset'], 'size': meta['size']}
+
+
+@contextlib.contextmanager
+def _travar_sessao(part, modo):
+    """Abre o ``.part`` da sessão com trava exclusiva; um segundo PUT simultâneo recebe UploadError."""
+    with open(part, modo) as f:
+        if fcntl is not None:  # fora de POSIX (desenvolvimento no Windows) fica sem trava
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError('Outra parte desta sessão está sendo enviada.')
+        yield f  # a trava sai junto com o close
+
+
+def gravar_parte(upload_id, user_id, inicio, total, stream):
+    """Anexa o corpo da requisição à sessão a partir de ``inicio``; devolve o novo offset.
+
+    ``total`` é o tamanho do Content-Range e precisa ser o declarado ao abrir
+    a sessão. Se ``inicio`` não bater com o que já está gravado devolvemos o
+    offset atual (via ``UploadError``) para o cliente retomar do ponto certo.
+    """
+    meta = _ler_meta(upload_id, user_id)
+    if total != meta['size']:
+        raise UploadError(f'Tamanho total esperado: {meta["size"]}.')
+    part, _ = _sessao_paths(upload_id)
+    with _travar_sessao(part, 'ab') as out:
+        # o offset vale o que está no arquivo depois da trava, não o lido antes dela
+        inicial = offset = os.fstat(out.fileno()).st_size
+        if inicio != offset:
+            raise UploadError(f'Offset esperado: {offset}.')
+        for bloco in iter(lambda: stream.read(CHUNK), b''):
+            offset += len(bloco)
+            if offset > meta['size']:
+                out.truncate(inicial)
+                raise UploadError('Parte excede o tamanho declarado.')
+            out.write(bloco)
+    instrumentation.registrar_upload(offset - inicial)
+    return offset
+
+
+def concluir_sessao(upload_id, user_id):
+    """Leva o arquivo completo da sessão para o armazenamento e devolve o nome final."""
+    meta = _ler_meta(upload_id, user_id)
+    part, meta_path = _sessao_paths(upload_id)
+    h = hashlib.sha256()
+    with _travar_sessao(part, 'rb') as f:
+        if os.fstat(f.fileno()).st_size != meta['size']:
+            raise UploadError('Upload incompleto.')
+        for bloco in iter(lambda: f.read(CHUNK), b''):
+            h.update(bloco)
+    os.remove(meta_path)
+    return _registrar(part, h.hexdigest(), meta['size'], extensao(meta['filename']))
+
+
+def init_app(app):
+    # limite do arquivo montado por partes; cada requisição continua limitada por MAX_CONTENT_LENGTH
+    app.config.setdefault('MAX_UPLOAD_SIZE', int(os.getenv('MAX_UPLOAD_SIZE', 512 * 1024 * 1024)))
@@ -0,0 +1,282 @@
+# sugestoes.py
+"""Sugestões de busca (typeahead) a partir de um índice de prefixos em memória.
+
+O índice é uma lista ordenada de chaves normalizadas (minúsculas, sem
+acento), uma para cada início de palavra dos títulos de projeto e dos nomes
+de autor: "Gestão Escolar" gera "gestao escolar" e "escolar", então tanto
+"ges" quanto "esc" encontram o projeto. A consulta é um ``bisect`` seguido de
+uma varredura curta (``VARREDURA`` chaves, no máximo), sem tocar no banco.
+
+As chaves do início de cada título/nome ficam também numa segunda lista,
+consultada primeiro: quem digita costuma digitar o começo.
+
+Autores vêm de ``Project.authors_text`` e de ``User.name``, agrupados pelo
+nome normalizado e pesados pelo número de citações; projetos são pesados por
+``favorite_count``. Escritas do ORM em projetos e usuários atualizam o índice
+depois do commit; o que muda por fora (outros processos, SQL direto) entra na
+reconstrução completa, feita em segundo plano a cada ``SUGESTOES_MAX_IDADE``
+segundos.
+"""
+import bisect
+import threading
+import time
+
+from flask import current_app, jsonify, request, url_for
+from sqlalchemy import event
+
+from autores import normalizar_nome, separar_nomes
+from limites import limitar
+from models import db, Project, User
+
+TAMANHO_CHAVE = 40  # o resto da chave não muda a ordem de nada que alguém digite
+VARREDURA = 400
+MIN_CARACTERES = 2
+
+
+def _chaves(texto):
+    """Uma chave por início de palavra: 'gestao escolar' -> ['gestao escolar', 'escolar']."""
+    palavras = normalizar_nome(texto).split()
+    return list(dict.fromkeys(' '.join(palavras[i:])[:TAMANHO_CHAVE] for i in range(len(palavras))))
+
+
+def _tirar(lista, entrada):
+    i = bisect.bisect_left(lista, entrada)
+    if i < len(lista) and lista[i] == entrada:
+        del lista[i]
+
+
+class IndiceSugestoes:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._chaves = []  # (chave, tipo, ref) ordenado
+        self._inicios = []  # idem, só a primeira chave de cada item
+        self._itens = {}  # (tipo, ref) -> [texto, peso, chaves]
+        self._autores_do_projeto = {}  # project_id -> nomes citados em authors_text
+        self._nome_do_usuario = {}  # user_id -> nome
+        self.construido_em = None
+        self._reconstruindo = False
+        self._diario = None  # escritas commitadas durante uma reconstrução
+
+    # === Montagem ===
+    def _incluir(self, tipo, ref, texto, peso):
+        chaves = _chaves(texto)
+        if not chaves:
+            return
+        self._itens[(tipo, ref)] = [texto, peso, chaves]
+        bisect.insort(self._inicios, (chaves[0], tipo, ref))
+        for chave in chaves:
+            bisect.insort(self._chaves, (chave, tipo, ref))
+
+    def _excluir(self, tipo, ref):
+        item = self._itens.pop((tipo, ref), None)
+        if item is None:
+            return
+        _tirar(self._inicios, (item[2][0], tipo, ref))
+        for chave in item[2]:
+            _tirar(self._chaves, (chave, tipo, ref))
+
+    def _citar(self, nome, delta):
+        chave = normalizar_nome(nome)
+        if not chave:
+            return
+        item = self._itens.get(('a', chave))
+        if item is None:
+            if delta > 0:
+                self._incluir('a', chave, nome.strip(), delta)
+            return
+        item[1] += delta
+        if item[1] <= 0:
+            self._excluir('a', chave)
+
+    def _projeto(self, pid, title, authors_text, peso):
+        self._remover_projeto(pid)
+        if title:
+            self._incluir('p', pid, title, peso or 0)
+        nomes = separar_nomes(authors_text)
+        for nome in nomes:
+            self._citar(nome, +1)
+        self._autores_do_projeto[pid] = nomes
+
+    def _remover_projeto(self, pid):
+        self._excluir('p', pid)
+        for nome in self._autores_do_projeto.pop(pid, ()):
+            self._citar(nome, -1)
+
+    def _usuario(self, uid, nome):
+        antigo = self._nome_do_usuario.pop(uid, None)
+        if antigo:
+            self._citar(antigo, -1)
+        if nome:
+            self._citar(nome, +1)
+            self._nome_do_usuario[uid] = nome
+
+    def construir(self):
+        """Monta um índice novo a partir do banco e troca o atual por ele de uma vez."""
+        with self._lock:
+            self._diario = []
+        try:
+            novo = self._ler_banco()
+            with self._lock:
+                self._chaves, self._inicios, self._itens = novo._chaves, novo._inicios, novo._itens
+                self._autores_do_projeto, self._nome_do_usuario = novo._autores_do_projeto, novo._nome_do_usuario
+                # o que foi commitado enquanto líamos pode não estar no retrato; reaplicar é idempotente
+                self._alterar(self._diario)
+                self.construido_em = time.monotonic()
+        finally:
+            with self._lock:
+                self._diario = None
+
+    @staticmethod
+    def _ler_banco():
+        novo = IndiceSugestoes()
+        projetos = db.session.execute(
+            db.select(Project.id, Project.title, Project.authors_text, Project.favorite_count)
+            .execution_options(yield_per=2000)
+        )
+        for pid, title, authors_text, peso in projetos:
+            chaves_titulo = _chaves(title)
+            if chaves_titulo:
+                novo._itens[('p', pid)] = [title, peso or 0, chaves_titulo]
+            nomes = separar_nomes(authors_text)
+            novo._autores_do_projeto[pid] = nomes
+            for nome in nomes:
+                novo._contar(nome)
+        for uid, nome in db.session.execute(db.select(User.id, User.name).execution_options(yield_per=2000)):
+            novo._nome_do_usuario[uid] = nome
+            novo._contar(nome)
+        # ordenar tudo de uma vez é bem mais rápido que um insort por chave
+        novo._chaves = sorted((chave, tipo, ref) for (tipo, ref), item in novo._itens.items() for chave in item[2])
+        novo._inicios = sorted((item[2][0], tipo, ref) for (tipo, ref), item in novo._itens.items())
+        return novo
+
+    def descartar(self):
+        """Esquece o índice; a próxima consulta o reconstrói (depois de cargas em lote)."""
+        with self._lock:
+            self.construido_em = None
+
+    def _contar(self, nome):
+        chave = normalizar_nome(nome)
+        if chave:
+            item = self._itens.setdefault(('a', chave), [nome.strip(), 0, _chaves(chave)])
+            item[1] += 1
+
+    def aplicar(self, pendentes):
+        with self._lock:
+            if self._diario is not None:
+                self._diario.extend(pendentes)
+            if self.construido_em is None:
+                return  # a primeira consulta já vai ler o estado commitado
+            self._alterar(pendentes)
+
+    def _alterar(self, pendentes):
+        for tipo, ref, valores in pendentes:
+            if tipo == 'p':
+                if valores is None:
+                    self._remover_projeto(ref)
+                else:
+                    self._projeto(ref, *valores)
+            else:
+                self._usuario(ref, valores)
+
+    # === Consulta ===
+    def sugerir(self, q, limite=8):
+        prefixo = normalizar_nome(q)[:TAMANHO_CHAVE]
+        if len(prefixo) < MIN_CARACTERES:
+            return []
+        itens = self._itens
+        achados = {}
+        # começar pelo início do título/nome vale mais que casar no meio
+        for nivel, chaves in ((1, self._inicios), (0, self._chaves)):
+            i = bisect.bisect_left(chaves, (prefixo,))
+            for chave, tipo, ref in chaves[i:i + VARREDURA]:
+                if not chave.startswith(prefixo):
+                    break
+                item = itens.get((tipo, ref))
+                if item is not None and (tipo, ref) not in achados:
+                    achados[(tipo, ref)] = (nivel, item[1], item[0])
+            if len(achados) >= limite:
+                break
+        ordenados = sorted(achados.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[1][2]))
+        return [(tipo, ref, texto) for (tipo, ref), (_, _, texto) in ordenados[:limite]]
+
+
+def get_indice():
+    indice = current_app.extensions['sugestoes']
+    if indice.construido_em is None:
+        with indice._lock:
+            if indice.construido_em is None:
+                indice.construir()
+    elif time.monotonic() - indice.construido_em > current_app.config['SUGESTOES_MAX_IDADE']:
+        _reconstruir_em_segundo_plano(current_app._get_current_object(), indice)
+    return indice
+
+
+def _reconstruir_em_segundo_plano(app, indice):
+    with indice._lock:
+        if indice._reconstruindo:
+            return
+        indice._reconstruindo = True
+
+    def rodar():
+        try:
+            with app.app_context():
+                indice.construir()
+        except Exception:
+            app.logger.exception('Falha ao reconstruir o índice de sugestões')
+        finally:
+            indice._reconstruindo = False
+
+    threading.Thread(target=rodar, name='sugestoes', daemon=True).start()
+
+
+# === Atualização pelos eventos da sessão ===
+def _registrar(session, flush_context):
+    pendentes = session.info.setdefault('sugestoes_pendentes', [])
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Project) and session.is_modified(obj, include_collections=False):
+            pendentes.append(('p', obj.id, (obj.title, obj.authors_text, obj.favorite_count)))
+        elif isinstance(obj, User) and session.is_modified(obj, include_collections=False):
+            pendentes.append(('u', obj.id, obj.name))
+    for obj in session.deleted:
+        if isinstance(obj, Project):
+            pendentes.append(('p', obj.id, None))
+        elif isinstance(obj, User):
+            pendentes.append(('u', obj.id, None))
+
+
+def _aplicar(session):
+    pendentes = session.info.pop('sugestoes_pendentes', None)
+    if pendentes:
+        current_app.extensions['sugestoes'].aplicar(pendentes)
+
+
+def _descartar(session, previous_transaction):
+    if previous_transaction.parent is None:  # rollback de SAVEPOINT não descarta a transação externa
+        session.info.pop('sugestoes_pendentes', None)
+
+
+def init_app(app):
+    app.config.setdefault('SUGESTOES_MAX_IDADE', 600)
+    app.config.setdefault('SUGESTOES_MAX_AGE', 60)  # Cache-Control das respostas
+    app.extensions['sugestoes'] = IndiceSugestoes()
+
+    if not event.contains(db.session, 'after_flush', _registrar):
+        event.listen(db.session, 'after_flush', _registrar)
+        event.listen(db.session, 'after_commit', _aplicar)
+        event.listen(db.session, 'after_soft_rollback', _descartar)
+
+    @app.route('/sugestoes')
+    @limitar('sugestoes')
+    def sugestoes():
+        q = request.args.get('q', '')
+        itens = []
+        for tipo, ref, texto in get_indice().sugerir(q, min(request.args.get('limit', 8, type=int), 20)):
+            if tipo == 'p':
+                itens.append({'tipo': 'projeto', 'texto': texto,
+                              'url': url_for('project_detail', project_id=ref)})
+            else:
+                itens.append({'tipo': 'autor', 'texto': texto, 'url': url_for('index', q=texto)})
+        resp = jsonify(q=q, sugestoes=itens)
+        resp.cache_control.public = True
+        resp.cache_control.max_age = app.config['SUGESTOES_MAX_AGE']
+        return resp
@@ -1,30 +1,119 @@
 # sync_authors.py
+"""Vincula projetos aos usuários citados em ``authors_text``.
+
+Processa os projetos em lotes por id (keyset), resolve os nomes contra um
+mapa {nome normalizado: user_id} carregado uma vez e insere as associações
+novas em ``author_project`` com um INSERT em lote por bloco. O último id
+processado fica salvo em um arquivo de estado, então uma execução
+interrompida continua de onde parou.
+
+Uso:
+    python sync_authors.py [--lote 1000] [--estado .sync_authors.json] [--recomecar]
+"""
+import argparse
+import json
+import os
+import time
+
 from app import create_app
-from models import db, User, Project
-
-app = create_app()
-
-with app.app_context():
-    projetos = Project.query.all()
-    total = 0
-    sem_user = 0
-
-    for p in projetos:
-        if p.authors_text:
-            nomes = [n.strip().lower() for n in p.authors_text.split(',') if n.strip()]
-            associados = []
-            for nome in nomes:
-                user = User.query.filter(db.func.lower(User.name) == nome).first()
-                if user and user not in p.authors:
-                    p.authors.append(user)
-                    associados.append(user.name)
-                    total += 1
-            if associados:
-                print(f"✅ Projeto '{p.title}' vinculado a: {', '.join(associados)}")
-            else:
-                sem_user += 1
-                print(f"⚠️  Nenhum usuário encontrado para '{p.authors_text}' no projeto '{p.title}'")
-    db.session.commit()
-    print(f"\n✅ Sincronização finalizada!")
-    print(f"➡️  {total} associações criadas.")
-    print(f"❌ {sem_user} projetos não encontraram autores correspondentes.")
+from models import db, Project, author_project
+import autores
+import cache
+import stats
+
+
+def carregar_estado(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'ultimo_id': 0, 'associacoes': 0, 'sem_usuario': 0}
+
+
+def salvar_estado(path, estado):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(estado, f)
+    os.replace(tmp, path)
+
+
+def processar_lote(projetos, mapa):
+    """Devolve (linhas novas para author_project, projetos sem nenhum usuário encontrado)."""
+    ids = [pid for pid, _ in projetos]
+    existentes = set(db.session.execute(
+        db.select(author_project.c.user_id, author_project.c.project_id)
+        .where(author_project.c.project_id.in_(ids))
+    ).tuples())
+
+    novos, sem_usuario = [], 0
+    for pid, texto in projetos:
+        encontrados = {mapa[chave] for chave in map(autores.normalizar_nome, autores.separar_nomes(texto))
+                       if chave in mapa}
+        if not encontrados:
+            sem_usuario += 1
+        for user_id in encontrados:
+            if (user_id, pid) not in existentes:
+                novos.append({'user_id': user_id, 'project_id': pid})
+    return novos, sem_usuario
+
+
+def sincronizar(lote=1000, estado_path='.sync_authors.json', recomecar=False):
+    if recomecar and os.path.exists(estado_path):
+        os.remove(estado_path)
+    estado = carregar_estado(estado_path)
+
+    mapa = autores.mapa_de_ids()
+    restantes = db.session.execute(
+        db.select(db.func.count()).select_from(Project)
+        .where(Project.id > estado['ultimo_id'], Project.authors_text.isnot(None))
+    ).scalar()
+    print(f'{len(mapa)} usuários no mapa; {restantes} projetos a processar '
+          f'(a partir do id {estado["ultimo_id"]}).')
+
+    inicio, feitos = time.monotonic(), 0
+    while True:
+        projetos = db.session.execute(
+            db.select(Project.id, Project.authors_text)
+            .where(Project.id > estado['ultimo_id'], Project.authors_text.isnot(None))
+            .order_by(Project.id)
+            .limit(lote)
+        ).all()
+        if not projetos:
+            break
+
+        novos, sem_usuario = processar_lote(projetos, mapa)
+        if novos:
+            db.session.execute(author_project.insert(), novos)
+            stats.autoria_em_lote(novos)
+            cache.marcar('projetos', *{f'projeto:{linha["project_id"]}' for linha in novos})
+        db.session.commit()
+
+        estado['ultimo_id'] = projetos[-1][0]
+        estado['associacoes'] += len(novos)
+        estado['sem_usuario'] += sem_usuario
+        salvar_estado(estado_path, estado)
+
+        feitos += len(projetos)
+        decorrido = time.monotonic() - inicio
+        taxa = feitos / decorrido if decorrido else 0
+        eta = (restantes - feitos) / taxa if taxa else 0
+        print(f'  {feitos}/{restantes} projetos | +{len(novos)} associações | '
+              f'{taxa:.0f} proj/s | faltam ~{eta:.0f}s')
+
+    print('\n✅ Sincronização finalizada!')
+    print(f'➡️  {estado["associacoes"]} associações criadas.')
+    print(f'❌ {estado["sem_usuario"]} projetos não encontraram autores correspondentes.')
+    if os.path.exists(estado_path):
+        os.remove(estado_path)  # terminou: a próxima execução começa do zero
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--lote', type=int, default=1000, help='projetos por lote')
+    parser.add_argument('--estado', default='.sync_authors.json', help='arquivo de checkpoint')
+    parser.add_argument('--recomecar', action='store_true', help='ignora o checkpoint e começa do zero')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        sincronizar(args.lote, args.estado, args.recomecar)
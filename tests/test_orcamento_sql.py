@@ -0,0 +1,91 @@
+# tests/test_orcamento_sql.py
+"""Orçamentos de SQL das rotas principais sobre uma base com várias linhas.
+
+Com ``TESTING`` o estouro do ``@query_budget`` levanta ``QueryBudgetExceeded``;
+basta a rota responder para o orçamento estar valendo. Cada rota é chamada
+duas vezes: a primeira com o usuário logado fora do cache (principal.py).
+"""
+import os
+
+import pytest
+
+ROTAS_ANONIMAS = ['/', '/?q=robotica', '/project/1']
+ROTAS_USUARIO = ['/favoritos', '/meus_projetos']
+ROTAS_ADMIN = ['/admin', '/admin/dashboard']
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    pasta = tmp_path_factory.mktemp('orcamento')
+    from flask_migrate import upgrade
+    from app import create_app
+    from benchmarks import dados
+    from models import db
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('DATABASE_URL', f'sqlite:///{pasta / "teste.db"}')
+        app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, PAGE_CACHE_ENABLED=False,
+                      RATE_LIMIT_ENABLED=False, JOBS_WORKERS=0, PASSWORD_WORKERS=0,
+                      UPLOAD_FOLDER=str(pasta / 'uploads'), DERIVATIVES_FOLDER=str(pasta / 'derivados'))
+    with app.app_context():
+        upgrade(directory=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations'))
+        app.resumo = dados.gerar(30, 120, 10, seed=7)
+    yield app
+    app.extensions['jobs'].parar()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def _logar(app, usuario):
+    from benchmarks import dados
+
+    cliente = app.test_client()
+    resp = cliente.post('/login', data={'email': f'usuario{usuario}@{dados.DOMINIO}', 'password': dados.SENHA})
+    assert resp.status_code == 302
+    return cliente
+
+
+@pytest.mark.parametrize('url', ROTAS_ANONIMAS)
+def test_rotas_anonimas(app, url):
+    cliente = app.test_client()
+    for _ in range(2):
+        assert cliente.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', ROTAS_USUARIO)
+def test_rotas_do_usuario(app, url):
+    cliente = _logar(app, app.resumo['usuario_com_mais_favoritos'])
+    app.extensions['principais'].clear()
+    for _ in range(2):
+        assert cliente.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', ROTAS_ADMIN)
+def test_rotas_de_admin(app, url):
+    cliente = _logar(app, 1)
+    app.extensions['principais'].clear()
+    for _ in range(2):
+        assert cliente.get(url).status_code == 200
+
+
+def test_orcamento_estourado_falha(app):
+    from query_budget import QueryBudgetExceeded
+
+    view = app.view_functions['favoritos']
+    original = view.query_budget
+    view.query_budget = 0
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            _logar(app, app.resumo['usuario_com_mais_favoritos']).get('/favoritos')
+    finally:
+        view.query_budget = original
+
+
+def test_favoritos_depois_de_editar_o_perfil(app):
+    # a edição sobe sessao_versao: a entrada do LRU fica velha e precisa ser relida sem estourar o orçamento
+    cliente = _logar(app, app.resumo['usuario_com_mais_favoritos'])
+    assert cliente.get('/favoritos').status_code == 200
+    assert cliente.post('/perfil', data={'nome': 'Nome Editado'}).status_code == 302
+    app.extensions['cache'].clear()  # o resumo também fora do cache: o pior caso da rota
+    assert cliente.get('/favoritos').status_code == 200
@@ -0,0 +1,155 @@
+# thumbnails.py
+"""Miniaturas (derivados) dos uploads: imagens redimensionadas e prévia da 1ª página de PDFs.
+
+Os derivados ficam em ``DERIVATIVES_FOLDER`` com o nome
+``<sha256 do original>_<tamanho>.<webp|jpg>``; o hash é gravado em
+``Project.preview_hash`` / ``User.foto_hash`` quando a geração termina.
+A geração é uma tarefa da fila (jobs.py), fora da requisição.
+"""
+import hashlib
+import os
+import tempfile
+
+import click
+from flask import current_app, url_for
+from PIL import Image, ImageOps
+from sqlalchemy import update
+
+import cache
+import jobs
+import storage
+from models import db, Project, User
+
+# lado maior, em pixels
+TAMANHOS = {'sm': 160, 'md': 480, 'lg': 1280}
+FORMATOS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+EXT_IMAGEM = {'png', 'jpg', 'jpeg'}
+EXT_PDF = {'pdf'}
+CHUNK = 1024 * 1024
+MODELOS = {'project': Project, 'user': User}
+
+
+def suporta(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    return ext in EXT_IMAGEM or ext in EXT_PDF
+
+
+def nome_derivado(digest, tamanho, fmt):
+    return f'{digest}_{tamanho}.{fmt}'
+
+
+def thumb_url(digest, tamanho='md', fmt='webp', _external=False):
+    return url_for('derivados', filename=nome_derivado(digest, tamanho, fmt), _external=_external)
+
+
+def sha256_arquivo(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloco in iter(lambda: f.read(CHUNK), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _abrir(path):
+    """Abre o original como imagem PIL (PDFs: rasteriza a primeira página)."""
+    if path.rsplit('.', 1)[-1].lower() in EXT_PDF:
+        import pypdfium2 as pdfium  # dependência só do caminho de PDF
+
+        pdf = pdfium.PdfDocument(path)
+        try:
+            page = pdf[0]
+            escala = TAMANHOS['lg'] / max(page.get_width(), 1)
+            return page.render(scale=escala).to_pil()
+        finally:
+            pdf.close()
+    img = Image.open(path)
+    # JPEG pode decodificar já reduzido, bem mais barato que abrir em resolução cheia
+    img.draft('RGB', (TAMANHOS['lg'], TAMANHOS['lg']))
+    ImageOps.exif_transpose(img, in_place=True)
+    return img
+
+
+def gerar_derivados(path, destino, digest=None):
+    """Gera todos os tamanhos/formatos de ``path`` e devolve o sha256 do original."""
+    digest = digest or sha256_arquivo(path)
+    faltando = [(t, f) for t in TAMANHOS for f in FORMATOS
+                if not os.path.exists(os.path.join(destino, nome_derivado(digest, t, f)))]
+    if not faltando:
+        return digest
+
+    os.makedirs(destino, exist_ok=True)
+    with _abrir(path) as original:
+        original = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for tamanho, fmt in faltando:
+            img = original.copy()
+            img.thumbnail((TAMANHOS[tamanho], TAMANHOS[tamanho]), Image.LANCZOS)
+            if fmt == 'jpg' and img.mode != 'RGB':
+                fundo = Image.new('RGB', img.size, (255, 255, 255))
+                fundo.paste(img, mask=img.getchannel('A'))
+                img = fundo
+            final = os.path.join(destino, nome_derivado(digest, tamanho, fmt))
+            # temporário único: tarefas do mesmo conteúdo (uploads deduplicados) podem rodar juntas
+            fd, tmp = tempfile.mkstemp(dir=destino, prefix=os.path.basename(final) + '.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    img.save(out, FORMATOS[fmt], quality=80)
+                os.chmod(tmp, 0o644)  # mkstemp cria 0600; o servidor web também lê os derivados
+                os.replace(tmp, final)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+    return digest
+
+
+@jobs.tarefa('miniaturas')
+def processar(modelo, obj_id, filename):
+    modelo = MODELOS[modelo]
+    path = storage.localizar(filename)
+    if path is None:
+        return  # arquivo já substituído e apagado
+    digest = gerar_derivados(path, current_app.config['DERIVATIVES_FOLDER'], storage.digest_de(filename))
+    coluna, hash_col = ((Project.file_path, Project.preview_hash) if modelo is Project
+                        else (User.foto_perfil, User.foto_hash))
+    # só grava se o arquivo ainda for o mesmo (pode ter sido trocado enquanto gerávamos)
+    db.session.execute(
+        update(modelo).where(modelo.id == obj_id, coluna == filename)
+        .values({hash_col: digest})
+    )
+    if modelo is User:
+        cache.marcar(f'usuario:{obj_id}')  # foto do usuário logado em cache (principal.py)
+    db.session.commit()
+
+
+def agendar(obj, filename):
+    """Enfileira a geração dos derivados de ``filename`` para um Project ou User (antes do commit, com id)."""
+    if not filename or not suporta(filename):
+        return None
+    return jobs.enfileirar('miniaturas', modelo=type(obj).__tablename__, obj_id=obj.id, filename=filename)
+
+
+def init_app(app):
+    app.config.setdefault('DERIVATIVES_FOLDER',
+                          os.path.join(os.path.dirname(app.config['UPLOAD_FOLDER']), 'derivados'))
+    os.makedirs(app.config['DERIVATIVES_FOLDER'], exist_ok=True)
+    app.jinja_env.globals['thumb_url'] = thumb_url
+
+    @app.cli.command('thumbnails')
+    def thumbnails_backfill():
+        """Gera miniaturas dos uploads que ainda não têm derivados."""
+        pendentes = ([(Project, pid, f) for pid, f in db.session.execute(
+                         db.select(Project.id, Project.file_path)
+                         .where(Project.file_path.isnot(None), Project.preview_hash.is_(None)))]
+                     + [(User, uid, f) for uid, f in db.session.execute(
+                         db.select(User.id, User.foto_perfil)
+                         .where(User.foto_perfil.isnot(None), User.foto_hash.is_(None)))])
+        feitos = 0
+        for modelo, obj_id, filename in pendentes:
+            if suporta(filename):
+                try:
+                    processar(modelo.__tablename__, obj_id, filename)
+                    feitos += 1
+                except Exception:
+                    db.session.rollback()
+                    app.logger.exception('Falha ao gerar miniaturas de %s', filename)
+        click.echo(f'{feitos} arquivos processados.')